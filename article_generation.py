@@ -1,16 +1,72 @@
 import os
+import re
 import json
+import time
+import inspect
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from openai import OpenAI
 
+from build_manifest import BUILD_GENERATE, BUILD_MANIFEST_FILENAME, BUILD_RENDER, BUILD_SKIP, BuildManifest
+from fingerprints import hash_bytes, hash_record, load_changed_urls, load_removed_urls
+from price_store import PRICE_STORE_FILENAME, PriceStore, catalog_key
+from catalog_db import CATALOG_DB_FILENAME, CatalogDB
+from catalog_stream import iter_catalog, iter_json_array, iter_watches, parse_shard, shard_watches
+from llm_cache import LLM_CACHE_FILENAME, LLMCache
+from llm_ledger import LEDGER_FILENAME, Ledger
+from profiling import add_profiling_arguments, profiling_session, stage as profile_stage
+from related_watches import RELATED_FILENAME, load_or_build as load_or_build_related
+from renderer import image_src, render_watch_page_string, template_version, write_watch_page
+from translation import TRANSLATION_MEMO_FILENAME, TranslationMemo, translate_descriptions
+
 # --------------------------------------------------------------------------
 # 1) Initialisation du client OpenAI avec la clé en dur (privée et cachée pour des raisons de sécurité )
 # --------------------------------------------------------------------------
 # --------------------------------------------------------------------------
 # 2) Paramètres de chemins
 # --------------------------------------------------------------------------
-JSON_PATH = "/Users/simonazoulay/guide-montres/all_watches.json"
+# Dossier des données : variable d'environnement GUIDE_MONTRES_DIR (comme scraper.py)
+JSON_PATH = os.path.join(os.environ.get("GUIDE_MONTRES_DIR", "/Users/simonazoulay/guide-montres"), "all_watches.json")
+# Changeset écrit par scraper.py (montres ajoutées / modifiées / supprimées)
+CHANGESET_PATH = os.path.join(os.path.dirname(JSON_PATH), "changeset.json")
+# Même catalogue, une fiche par ligne (scraper.py --output jsonl, pipeline.py)
+JSONL_PATH = os.path.join(os.path.dirname(JSON_PATH), "all_watches.jsonl")
+# Historique des prix en colonnes, écrit par scraper.py
+PRICE_STORE_PATH = os.path.join(os.path.dirname(JSON_PATH), PRICE_STORE_FILENAME)
+# Catalogue SQLite indexé, écrit par scraper.py
+CATALOG_DB_PATH = os.path.join(os.path.dirname(JSON_PATH), CATALOG_DB_FILENAME)
 OUTPUT_DIR = "output_pages"
 MIN_WORDS = 3200  # Seuil minimum de mots dans l'article
+MODEL = "o3-mini"  # Modèle utilisé pour tous les appels
+# Cache persistant des réponses du modèle (None : désactivé)
+LLM_CACHE_PATH = os.path.join(os.path.dirname(JSON_PATH), LLM_CACHE_FILENAME)
+# À incrémenter quand le sens des prompts change sans que leur texte change
+# (ex. post-traitement des réponses) : invalide tout le cache
+PROMPT_VERSION = "1"
+# Mémo des traductions de descriptions (requêtes groupées, dédupliquées)
+TRANSLATION_MEMO_PATH = os.path.join(os.path.dirname(JSON_PATH), TRANSLATION_MEMO_FILENAME)
+# Étape de traduction : les montres sont traduites par fenêtres de N (mémoire bornée)
+TRANSLATION_WINDOW = 500
+# Manifeste du build incrémental : entrées et sorties de chaque page (None : désactivé)
+BUILD_MANIFEST_PATH = os.path.join(os.path.dirname(JSON_PATH), BUILD_MANIFEST_FILENAME)
+# Montres similaires liées depuis chaque page (voisins en cache, None : pas de cache)
+RELATED_PATH = os.path.join(os.path.dirname(JSON_PATH), RELATED_FILENAME)
+RELATED_K = 6
+# Journal tokens / coût / latence de chaque appel (None : désactivé)
+LEDGER_PATH = os.path.join(os.path.dirname(JSON_PATH), LEDGER_FILENAME)
+# Complétion des articles trop courts :
+#   "continuation" : le modèle n'écrit que les nouvelles sections <h2>, ajoutées localement,
+#   "rewrite"      : le modèle renvoie tout l'article enrichi (historique, coût quadratique)
+EXTENSION_MODE = "continuation"
+# Contexte envoyé en mode continuation : fin de l'article, pour la fluidité
+CONTINUATION_CONTEXT_CHARS = 2000
+# Mode streaming : le SEO part dès que l'article compte SEO_EARLY_WORDS mots
+# en sections complètes (sans attendre la fin de l'article)
+SEO_EARLY_WORDS = 1500
+# Mode streaming : affichage de la progression tous les N mots
+STREAM_PROGRESS_WORDS = 500
 
 # --------------------------------------------------------------------------
 # 3) Chargement des données JSON
@@ -19,10 +75,16 @@ def load_watches_data(json_path):
     """
     Lit le fichier JSON et retourne la liste de montres (champ "watches").
     On suppose la structure : { "watches": [ {...}, {...}, ... ] }
+    Pour un gros catalogue, préférer iter_watches (catalog_stream.py) : les
+    fiches y sont lues une à une, en mémoire constante.
+    """
+    return list(iter_json_array(json_path))
+
+def catalog_path(source):
+    """
+    Fichier du catalogue de la source "json" ou "jsonl".
     """
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data["watches"]
+    return JSONL_PATH if source == "jsonl" else JSON_PATH
 
 # --------------------------------------------------------------------------
 # Outil pour compter les mots
@@ -36,26 +98,23 @@ def count_words(text):
     return len(text.split())
 
 # --------------------------------------------------------------------------
-# 4) PREMIER APPEL : Générer un article en FR, boucler jusqu'à ce qu'on ait >3200 mots
+# 4) PROMPTS : construits à part pour être partagés par tous les modes
+#    (séquentiel, asynchrone, ...)
 # --------------------------------------------------------------------------
-def generate_article_text(watch_dict):
+def build_article_prompt(watch_dict):
     """
-    Génère un article en français de plus de 3200 mots.
-    1) Premier prompt : on demande un texte HTML interne (sans <html>/<head>/<body>),
-       avec <h2> pour les sections du plan, <h3> et <h4> si besoin.
-    2) On compte les mots. Si < 3200, on refait un prompt pour compléter de façon fluide.
-    3) On répète jusqu'à avoir >= 3200 mots.
+    Premier prompt : article en HTML interne, environ 3500 mots,
+    à partir des données de la montre.
     """
-
-    # Retirer image_url et local_image_path
+    # Retirer image_url, local_image_path et l'URL source
     tmp_dict = dict(watch_dict)
     tmp_dict.pop("image_url", None)
     tmp_dict.pop("local_image_path", None)
+    tmp_dict.pop("url", None)
 
     watch_json_str = json.dumps(tmp_dict, indent=2, ensure_ascii=False)
 
-    # --- Premier prompt : on demande un article en HTML interne, environ 3500 mots ---
-    user_prompt_initial = f"""
+    return f"""
 IMPORTANT : Les données JSON ci-dessous sont en anglais,
 mais tu dois rédiger la totalité de la réponse EN FRANÇAIS.
 
@@ -94,20 +153,12 @@ Consignes de style :
 - Minimum 3200 mots, idéalement 3500.
 """
 
-    response = client.chat.completions.create(
-        model="o3-mini",
-        messages=[{"role": "user", "content": user_prompt_initial}]
-    )
-    article_text = response.choices[0].message.content
-
-    # Vérification du nombre de mots
-    word_count = count_words(article_text)
-    print(f"  > Première génération : {word_count} mots")
-
-    # Tant qu'on n'atteint pas MIN_WORDS, on complète
-    while word_count < MIN_WORDS:
-        shortfall = MIN_WORDS - word_count
-        user_prompt_completion = f"""
+def build_extension_prompt(article_text, word_count):
+    """
+    Prompt de complétion : l'article actuel est trop court de `MIN_WORDS - word_count` mots.
+    """
+    shortfall = MIN_WORDS - word_count
+    return f"""
 Tu as rédigé un article de {word_count} mots,
 mais l'objectif est de dépasser {MIN_WORDS} mots.
 Il manque environ {shortfall} mots.
@@ -124,33 +175,103 @@ Texte actuel :
 {article_text}
 """
 
-        response2 = client.chat.completions.create(
-            model="o3-mini",
-            messages=[{"role": "user", "content": user_prompt_completion}]
-        )
-        new_text = response2.choices[0].message.content
+def extract_outline(article_text):
+    """
+    Titres des sections <h2> de l'article, dans l'ordre (balises internes retirées).
+    """
+    titles = re.findall(r"<h2[^>]*>(.*?)</h2>", article_text, flags=re.IGNORECASE | re.DOTALL)
+    return [" ".join(re.sub(r"<[^>]+>", "", title).split()) for title in titles]
 
-        # On remplace l'article complet par le nouveau (qui inclut déjà l'ancien).
-        article_text = new_text
+def build_continuation_prompt(article_text, word_count):
+    """
+    Prompt de continuation : seul le plan et la fin de l'article sont envoyés,
+    le modèle n'écrit que les sections manquantes (ajoutées par splice_sections).
+    """
+    shortfall = MIN_WORDS - word_count
+    outline = "\n".join(f"- {title}" for title in extract_outline(article_text))
+    tail = article_text[-CONTINUATION_CONTEXT_CHARS:]
+    return f"""
+Tu as rédigé un article de {word_count} mots (EN FRANÇAIS, HTML interne),
+mais l'objectif est de dépasser {MIN_WORDS} mots.
+Il manque environ {shortfall} mots.
+Écris UNIQUEMENT les nouvelles sections à ajouter à la suite de l'article,
+chacune introduite par un <h2> (avec <h3>, <h4> si tu veux),
+sur des thèmes que le plan ci-dessous ne traite pas encore
+(historique, anecdotes, technique, style), sans redites.
+Ne renvoie ni les sections existantes, ni structure <html>/<head>/<body>,
+ni commentaire : seulement le HTML des nouvelles sections.
 
-        word_count = count_words(article_text)
-        print(f"  > Article étendu : {word_count} mots")
+Plan actuel :
+{outline}
 
-    return article_text
+Fin de l'article actuel (pour la continuité) :
 
-# --------------------------------------------------------------------------
-# 5) SECOND APPEL : Générer SEO title, meta description et H1 (en FRANÇAIS)
-# --------------------------------------------------------------------------
-def generate_seo_and_h1(article_text):
+{tail}
+"""
+
+def split_sections(html_text):
     """
-    On fournit à l'IA l'article brut (en français, déjà HTML interne),
-    pour qu'elle génère un JSON avec :
-      - "seo_title" (60-70 caractères, en FR)
-      - "meta_description" (~160 caractères, en FR)
-      - "h1" (titre principal, sans majuscules abusives, en FR)
+    Découpe un fragment HTML en morceaux commençant chacun par un <h2>
+    (le premier morceau peut être une introduction sans <h2>).
+    """
+    return [part for part in re.split(r"(?=<h2[\s>])", html_text, flags=re.IGNORECASE) if part.strip()]
+
+def splice_sections(article_text, new_text):
+    """
+    Ajoute à l'article les sections renvoyées en mode continuation.
+    Les sections dont le titre existe déjà (le modèle a recopié l'article)
+    et les balises ```html éventuelles sont ignorées.
+    """
+    new_text = re.sub(r"^\s*```(?:html)?\s*|\s*```\s*$", "", new_text)
+    known = {title.lower() for title in extract_outline(article_text)}
+    added = []
+    for part in split_sections(new_text):
+        titles = extract_outline(part)
+        if titles and titles[0].lower() in known:
+            continue
+        if titles:
+            known.add(titles[0].lower())
+        added.append(part.strip())
+    if not added:
+        return article_text
+    return article_text.rstrip() + "\n\n" + "\n\n".join(added)
+
+def build_next_extension_prompt(article_text, word_count):
     """
+    Prompt de la prochaine complétion, selon EXTENSION_MODE.
+    """
+    if EXTENSION_MODE == "rewrite":
+        return build_extension_prompt(article_text, word_count)
+    return build_continuation_prompt(article_text, word_count)
+
+def merge_extension(article_text, response_text):
+    """
+    Article après une complétion : la réponse remplace tout l'article en mode
+    "rewrite", ses sections sont ajoutées à la fin en mode "continuation".
+    """
+    if EXTENSION_MODE == "rewrite":
+        return response_text
+    return splice_sections(article_text, response_text)
+
+def extend_article(article_text, response_text, prompt):
+    """
+    merge_extension, mais une complétion (réponse à `prompt`) qui n'apporte
+    aucune nouvelle section est retirée du cache LLM avant l'exception :
+    le run suivant redemande la complétion au lieu de rejouer le même échec.
+    """
+    extended_text = merge_extension(article_text, response_text)
+    if extended_text == article_text:
+        cache = get_llm_cache()
+        if cache is not None:
+            cache.delete(MODEL, PROMPT_VERSION, prompt)
+        raise Exception("La complétion n'a apporté aucune nouvelle section")
+    return extended_text
 
-    user_prompt = f"""
+def build_seo_prompt(article_text):
+    """
+    Prompt SEO : JSON avec "seo_title", "meta_description" et "h1".
+    """
+    return f"""
 Tu viens de rédiger l'article HTML interne (en français) ci-dessous,
 sans SEO ni meta ni H1.
 Génère un JSON VALIDE avec exactement 3 clés :
@@ -164,12 +285,10 @@ Voici l'article :
 {article_text}
 """
 
-    response = client.chat.completions.create(
-        model="o3-mini",
-        messages=[{"role": "user", "content": user_prompt}]
-    )
-    generated_text = response.choices[0].message.content
-
+def parse_seo_response(generated_text):
+    """
+    Parse la réponse JSON du prompt SEO, avec des valeurs de repli si invalide.
+    """
     # Tentative de parsing JSON
     try:
         parsed = json.loads(generated_text)
@@ -185,243 +304,722 @@ Voici l'article :
             "h1": "Titre principal indisponible"
         }
 
+def build_translation_prompt(description):
+    return f"Traduis en français ce texte: {description}"
+
+# --------------------------------------------------------------------------
+# 4 bis) Appel au modèle, derrière le cache persistant, journalisé dans le ledger
+# --------------------------------------------------------------------------
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+_ledger = None
+_translation_memo = None
+
+def get_llm_cache():
+    """
+    Cache des complétions, ouvert au premier appel (None si désactivé).
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None and LLM_CACHE_PATH:
+            _llm_cache = LLMCache(LLM_CACHE_PATH)
+    return _llm_cache
+
+def get_ledger():
+    """
+    Journal des appels, ouvert au premier appel (None si désactivé).
+    """
+    global _ledger
+    with _llm_cache_lock:
+        if _ledger is None and LEDGER_PATH:
+            _ledger = Ledger(LEDGER_PATH)
+    return _ledger
+
+def get_translation_memo():
+    global _translation_memo
+    with _llm_cache_lock:
+        if _translation_memo is None:
+            _translation_memo = TranslationMemo(TRANSLATION_MEMO_PATH)
+    return _translation_memo
+
+def record_call(stage, watch, usage=None, latency=0.0, retries=0, cached=False, first_token_latency=None):
+    """
+    Ajoute un appel au ledger (`usage` : response.usage, absent pour un hit de cache).
+    """
+    ledger = get_ledger()
+    if ledger is None:
+        return
+    ledger.record(stage, MODEL, watch,
+                  prompt_tokens=usage.prompt_tokens if usage else 0,
+                  completion_tokens=usage.completion_tokens if usage else 0,
+                  latency=latency, retries=retries, cached=cached,
+                  first_token_latency=first_token_latency)
+
+def complete(prompt, stage="autre", watch=None):
+    """
+    Texte de la réponse du modèle pour `prompt`. Un prompt déjà envoyé
+    (même modèle, même PROMPT_VERSION) est resservi depuis le cache sans appel.
+    `stage` (article, extension_N, seo, translation) et `watch` identifient
+    l'appel dans le ledger (et, regroupé, dans le profil : llm.article, llm.extension...).
+    """
+    with profile_stage(llm_profile_stage(stage)):
+        cache = get_llm_cache()
+        if cache is not None:
+            cached = cache.get(MODEL, PROMPT_VERSION, prompt)
+            if cached is not None:
+                record_call(stage, watch, cached=True)
+                return cached
+
+        start = time.perf_counter()
+        raw_response = client.chat.completions.with_raw_response.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        response = raw_response.parse()
+        record_call(stage, watch, response.usage, time.perf_counter() - start, raw_response.retries_taken)
+        text = response.choices[0].message.content
+        if cache is not None:
+            cache.put(MODEL, PROMPT_VERSION, prompt, text)
+        return text
+
+def llm_profile_stage(stage):
+    """
+    "extension_2" -> "llm.extension" : une ligne du profil par étape LLM.
+    """
+    return "llm." + stage.split("_")[0]
+
+def complete_stream(prompt, on_delta=None, stage="autre", watch=None):
+    """
+    Comme complete(), mais en streaming : `on_delta(delta, text)` est appelé à
+    chaque fragment reçu (texte cumulé dans `text`). Une réponse en cache est
+    livrée en un seul fragment.
+    """
+    with profile_stage(llm_profile_stage(stage)):
+        cache = get_llm_cache()
+        if cache is not None:
+            cached = cache.get(MODEL, PROMPT_VERSION, prompt)
+            if cached is not None:
+                record_call(stage, watch, cached=True)
+                if on_delta:
+                    on_delta(cached, cached)
+                return cached
+
+        start = time.perf_counter()
+        raw_response = client.chat.completions.with_raw_response.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        text = ""
+        usage = None
+        first_token_latency = None
+        for chunk in raw_response.parse():
+            # Le dernier fragment porte l'usage du flux, sans choices
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first_token_latency is None:
+                first_token_latency = time.perf_counter() - start
+            text += delta
+            if on_delta:
+                on_delta(delta, text)
+        record_call(stage, watch, usage, time.perf_counter() - start, raw_response.retries_taken,
+                    first_token_latency=first_token_latency)
+        if cache is not None:
+            cache.put(MODEL, PROMPT_VERSION, prompt, text)
+        return text
+
+def print_llm_stats():
+    if _llm_cache is not None:
+        stats = _llm_cache.stats()
+        print(f"Cache LLM : {stats['hits']} hit(s), {stats['misses']} miss(es), "
+              f"{stats['entries']} entrée(s) ({stats['bytes'] / (1024 * 1024):.1f} Mo)")
+    if _ledger is not None:
+        print(f"Appels journalisés dans {_ledger.path} (rapport : python llm_ledger.py {_ledger.path})")
+
+# --------------------------------------------------------------------------
+# 4 ter) Étape de traduction des descriptions, séparée du rendu
+# --------------------------------------------------------------------------
+def translate_watch_descriptions(watches):
+    """
+    Traduit les descriptions des montres données : descriptions identiques
+    dédupliquées, plusieurs par requête (JSON indexé), résultats mémorisés.
+    Retourne {description: traduction}.
+    """
+    return translate_descriptions([watch.get("description", "") for watch in watches],
+                                  get_translation_memo(), complete, build_translation_prompt, MODEL)
+
+def with_translations(watches, window=TRANSLATION_WINDOW):
+    """
+    Parcourt les montres par fenêtres de `window` : une étape de traduction
+    par fenêtre, puis (watch, description_fr) pour chaque montre.
+    """
+    def flush(buffer):
+        translations = translate_watch_descriptions(buffer)
+        for item in buffer:
+            description = item.get("description", "")
+            yield item, translations.get(description, description)
+
+    buffer = []
+    for watch in watches:
+        buffer.append(watch)
+        if len(buffer) >= window:
+            yield from flush(buffer)
+            buffer = []
+    if buffer:
+        yield from flush(buffer)
+
+# --------------------------------------------------------------------------
+# 5) PREMIER APPEL : Générer un article en FR, boucler jusqu'à ce qu'on ait >3200 mots
+# --------------------------------------------------------------------------
+def generate_article_text(watch_dict, complete_fn=None, verbose=True):
+    """
+    Génère un article en français de plus de 3200 mots.
+    1) Premier prompt : on demande un texte HTML interne (sans <html>/<head>/<body>),
+       avec <h2> pour les sections du plan, <h3> et <h4> si besoin.
+    2) On compte les mots. Si < 3200, on demande les sections manquantes
+       (EXTENSION_MODE "continuation") ou l'article complet enrichi ("rewrite").
+    3) On répète jusqu'à avoir >= 3200 mots.
+    `complete_fn` (par défaut complete) permet de rejouer la même logique
+    sur une autre source de réponses (ex. mode batch).
+    """
+    complete_fn = complete_fn or complete
+    article_text = complete_fn(build_article_prompt(watch_dict), "article", watch_dict)
+
+    # Vérification du nombre de mots
+    word_count = count_words(article_text)
+    if verbose:
+        print(f"  > Première génération : {word_count} mots")
+
+    # Tant qu'on n'atteint pas MIN_WORDS, on complète
+    extension_round = 0
+    while word_count < MIN_WORDS:
+        extension_round += 1
+        prompt = build_next_extension_prompt(article_text, word_count)
+        new_text = complete_fn(prompt, f"extension_{extension_round}", watch_dict)
+
+        # Nouvelles sections ajoutées à la fin, ou article complet remplacé
+        article_text = extend_article(article_text, new_text, prompt)
+
+        word_count = count_words(article_text)
+        if verbose:
+            print(f"  > Article étendu : {word_count} mots")
+
+    return article_text
+
+# --------------------------------------------------------------------------
+# 5 bis) SECOND APPEL : Générer SEO title, meta description et H1 (en FRANÇAIS)
+# --------------------------------------------------------------------------
+def generate_seo_and_h1(article_text, watch=None, complete_fn=None):
+    """
+    On fournit à l'IA l'article brut (en français, déjà HTML interne),
+    pour qu'elle génère un JSON avec :
+      - "seo_title" (60-70 caractères, en FR)
+      - "meta_description" (~160 caractères, en FR)
+      - "h1" (titre principal, sans majuscules abusives, en FR)
+    """
+    complete_fn = complete_fn or complete
+    return parse_seo_response(complete_fn(build_seo_prompt(article_text), "seo", watch))
+
+# --------------------------------------------------------------------------
+# 5 ter) Mode streaming : article en flux, SEO et traduction lancés en avance
+# --------------------------------------------------------------------------
+class LiveWordCount:
+    """
+    Nombre de mots (au sens de count_words) d'un texte reçu par fragments,
+    sans recompter tout le texte à chaque fragment.
+    """
+
+    def __init__(self, words=0):
+        self.words = words
+        self.in_word = False
+
+    def feed(self, delta):
+        if not delta:
+            return self.words
+        words = len(delta.split())
+        # Un mot coupé entre deux fragments ne compte qu'une fois
+        if self.in_word and not delta[0].isspace():
+            words -= 1
+        self.words += words
+        self.in_word = not delta[-1].isspace()
+        return self.words
+
+def seo_excerpt(article_text, min_words=SEO_EARLY_WORDS):
+    """
+    Début de l'article suffisant pour le SEO : les sections complètes qui
+    précèdent le premier <h2> situé après `min_words` mots, ou None s'il n'y
+    en a pas encore. Ne dépend que du texte (pas du découpage en fragments) :
+    le prompt SEO reste identique d'une exécution à l'autre, donc en cache.
+    """
+    for match in re.finditer(r"<h2[\s>]", article_text, flags=re.IGNORECASE):
+        if match.start() and count_words(article_text[:match.start()]) >= min_words:
+            return article_text[:match.start()].rstrip()
+    return None
+
+def generate_page_parts_streaming(watch):
+    """
+    Version streaming de 7.1 + 7.2 :
+      - l'article arrive en flux avec un compteur de mots en direct,
+      - le SEO part dès que seo_excerpt() trouve assez de sections complètes
+        (au plus tard une fois l'article terminé).
+    Retourne (article_text, meta_data).
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        seo_future = None
+        counter = LiveWordCount()
+        next_progress = STREAM_PROGRESS_WORDS
+
+        def start_seo(article_text):
+            nonlocal seo_future
+            excerpt = seo_excerpt(article_text)
+            if excerpt is not None:
+                print(f"  > SEO lancé sur les {count_words(excerpt)} premiers mots")
+                seo_future = executor.submit(generate_seo_and_h1, excerpt, watch)
+
+        def on_delta(delta, text):
+            nonlocal next_progress
+            words = counter.feed(delta)
+            if words >= next_progress:
+                print(f"  > {words} mots reçus...")
+                next_progress = (words // STREAM_PROGRESS_WORDS + 1) * STREAM_PROGRESS_WORDS
+            # Nouvelle section (éventuellement coupée entre deux fragments) : on tente le SEO
+            if seo_future is None and words >= SEO_EARLY_WORDS and "<h2" in text[-len(delta) - 3:].lower():
+                start_seo(text)
+
+        article_text = complete_stream(build_article_prompt(watch), on_delta, "article", watch)
+        word_count = count_words(article_text)
+        print(f"  > Première génération : {word_count} mots")
+
+        extension_round = 0
+        while word_count < MIN_WORDS:
+            extension_round += 1
+            # En mode "rewrite", le flux renvoie tout l'article : le compte repart de zéro
+            counter = LiveWordCount(0 if EXTENSION_MODE == "rewrite" else word_count)
+            next_progress = (counter.words // STREAM_PROGRESS_WORDS + 1) * STREAM_PROGRESS_WORDS
+            # En mode continuation, le flux ne contient que les nouvelles sections :
+            # le SEO n'est retenté qu'une fois celles-ci ajoutées à l'article
+            prompt = build_next_extension_prompt(article_text, word_count)
+            new_text = complete_stream(prompt, lambda delta, text: on_delta(delta, ""),
+                                       f"extension_{extension_round}", watch)
+            article_text = extend_article(article_text, new_text, prompt)
+            word_count = count_words(article_text)
+            print(f"  > Article étendu : {word_count} mots")
+            if seo_future is None:
+                start_seo(article_text)
+
+        if seo_future is None:
+            seo_future = executor.submit(generate_seo_and_h1, article_text, watch)
+        return article_text, seo_future.result()
+
 # --------------------------------------------------------------------------
 # 6) Génération de la page HTML
 # --------------------------------------------------------------------------
-def generate_watch_page_html(watch, article_text, meta_data):
+def generate_watch_page_html(watch, article_text, meta_data, price_stats=None, description_fr=None):
     """
-    Construit la page HTML finale avec:
+    Construit la page HTML finale (gabarits de renderer.py, valeurs échappées) avec:
      - <title> = meta_data["seo_title"]
      - <meta name="description"> = meta_data["meta_description"]
      - <h1> = meta_data["h1"]
      - article_text => inséré tel quel (HTML interne, avec <h2>, <h3>, etc.)
-     - table récap (traduit "description" si besoin)
+     - table récap, avec la description traduite `description_fr` (fournie par
+       l'étape de traduction ; à défaut, lue dans le mémo, sans appel réseau)
+     - prix le plus récent, fourchette et évolution sur un an (`price_stats`,
+       calculé à la volée si absent)
      - image si présente
+     - liens vers les montres similaires (prepare_related_watches)
     """
-    seo_title = meta_data["seo_title"]
-    meta_desc = meta_data["meta_description"]
-    h1_title = meta_data["h1"]
-
-    # Table récap
-    table_fields = [
-        ("brand", "Marque"),
-        ("family", "Famille"),
-        ("reference", "Référence"),
-        ("name", "Nom"),
-        ("produced", "Date de sortie / Production"),
-        ("limited", "Édition Limitée ?"),
-    ]
-    table_rows = ""
-    for key, label in table_fields:
-        if key in watch:
-            value = watch[key]
-            table_rows += f"""
-            <tr>
-                <th>{label}</th>
-                <td>{value}</td>
-            </tr>
-            """
-
-    # Mouvement
-    if "movement" in watch:
-        movement_info = watch["movement"]
-        caliber = movement_info.get("caliber", "")
-        details = movement_info.get("details", "")
-        table_rows += f"""
-        <tr>
-            <th>Mouvement - Calibre</th>
-            <td>{caliber}</td>
-        </tr>
-        <tr>
-            <th>Détails Mouvement</th>
-            <td>{details}</td>
-        </tr>
-        """
-
-    # Boîtier
-    if "case" in watch:
-        case_info = watch["case"]
-        for case_key in ["material", "glass", "back", "diameter", "height", "lug_width"]:
-            if case_key in case_info:
-                label_fr = case_key.capitalize()
-                val_case = case_info[case_key]
-                table_rows += f"""
-                <tr>
-                    <th>{label_fr}</th>
-                    <td>{val_case}</td>
-                </tr>
-                """
-
-    # Cadran
-    if "dial" in watch:
-        dial_info = watch["dial"]
-        color = dial_info.get("color", "")
-        indexes = dial_info.get("indexes", "")
-        table_rows += f"""
-        <tr>
-            <th>Cadran - Couleur</th>
-            <td>{color}</td>
-        </tr>
-        <tr>
-            <th>Cadran - Indexes</th>
-            <td>{indexes}</td>
-        </tr>
-        """
-
-    # Description brute -> traduction FR
+    with profile_stage("render"):
+        return render_watch_page_string(watch, article_text, meta_data, price_stats,
+                                        resolve_description_fr(watch, description_fr), related_links(watch))
+
+def resolve_description_fr(watch, description_fr=None):
     description = watch.get("description", "")
-    if description:
-        translate_prompt = f"Traduis en français ce texte: {description}"
-        resp_translation = client.chat.completions.create(
-            model="o3-mini",
-            messages=[{"role": "user", "content": translate_prompt}]
-        )
-        description_fr = resp_translation.choices[0].message.content.strip()
-        table_rows += f"""
-        <tr>
-            <th>Description</th>
-            <td>{description_fr}</td>
-        </tr>
-        """
-
-    # Prix éventuel
-    if "prices" in watch:
-        data_points = watch["prices"].get("datasets", [])
-        if data_points and isinstance(data_points, list):
-            new_label = data_points[0].get("label", "")
-            data_list = data_points[0].get("data", [])
-            last_price = None
-            for val in reversed(data_list):
-                if val not in (None, ""):
-                    last_price = val
-                    break
-            if last_price:
-                table_rows += f"""
-                <tr>
-                    <th>Prix (le plus récent)</th>
-                    <td>{last_price} (selon '{new_label}') </td>
-                </tr>
-                """
-
-    # Image
-    image_src = "#"
-    if "image_url" in watch and watch["image_url"]:
-        image_src = watch["image_url"]
-    elif "local_image_path" in watch and watch["local_image_path"]:
-        image_src = watch["local_image_path"]
-
-    # Construction de la page HTML
-    html_code = f"""
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="utf-8"/>
-    <title>{seo_title}</title>
-    <meta name="description" content="{meta_desc}" />
-    <!-- Lien Bootstrap CSS (CDN) -->
-    <link 
-       rel="stylesheet" 
-       href="https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css" 
-       integrity="sha384-LtrjvnR4/J8g5Y2lf8tuvz6FH7Z3XthZaXttZcC6ohXQ/4C+OGpamoFVcZxZGOQu" 
-       crossorigin="anonymous"
-    >
-</head>
-<body>
-
-<nav class="navbar navbar-expand-lg navbar-light bg-light">
-  <a class="navbar-brand" href="#">Guide des montres de luxe</a>
-</nav>
-
-<div class="container mt-4 mb-5">
-    <div class="row">
-        <div class="col-12">
-            <!-- On intègre le H1 généré par la seconde requête -->
-            <h1 class="display-4">{h1_title}</h1>
-            <hr/>
-        </div>
-    </div>
-
-    <div class="row">
-        <div class="col-md-6">
-            <h2>Fiche technique</h2>
-            <table class="table table-bordered">
-                <tbody>
-                    {table_rows}
-                </tbody>
-            </table>
-        </div>
-        <div class="col-md-6">
-            <h2>Visuel</h2>
-            <img 
-              src="{image_src}" 
-              alt="Image de la montre" 
-              class="img-fluid" 
-            />
-        </div>
-    </div>
-
-    <!-- Article HTML interne généré lors du premier appel (avec <h2>/<h3>...) -->
-    <div class="row mt-4">
-        <div class="col-12">
-            {article_text}
-        </div>
-    </div>
-
-</div>
-
-<!-- Script Bootstrap JS (CDN) -->
-<script 
-  src="https://code.jquery.com/jquery-3.5.1.slim.min.js" 
-  integrity="sha384-DfXdz2htPH0lsSSs5nCTpuj/zy4C+OGpamoFVcZxZGOQu" 
-  crossorigin="anonymous">
-</script>
-<script 
-  src="https://cdn.jsdelivr.net/npm/bootstrap@4.5.2/dist/js/bootstrap.bundle.min.js" 
-  integrity="sha384-LtrjvnR4/J8g5Y2lf8tuvz6FH7Z3XthZaXttZcC6ohXQ/4C+OGpamoFVcZxZGOQu" 
-  crossorigin="anonymous">
-</script>
-
-</body>
-</html>
-"""
-    return html_code
+    if description and description_fr is None:
+        return get_translation_memo().get(description) or description
+    return description_fr or ""
+
+def write_page(watch, article_text, meta_data, price_stats=None, description_fr=None):
+    """
+    Écrit la page de la montre dans OUTPUT_DIR, en streaming (sans construire
+    la page en mémoire). Retourne le chemin du fichier.
+    """
+    # Rendu et écriture entrelacés (streaming) : une seule étape dans le profil
+    with profile_stage("render_write"):
+        return write_watch_page(page_filename(watch), watch, article_text, meta_data, price_stats,
+                                resolve_description_fr(watch, description_fr), related_links(watch))
+
+def page_filename(watch):
+    """
+    Chemin du fichier HTML d'une montre (propre, sans caractères spéciaux).
+    """
+    brand = watch.get("brand", "UnknownBrand")
+    name_ = watch.get("name", "UnknownModel")
+    safe_title = f"{brand}_{name_}".replace(" ", "_").replace("/", "_")
+    safe_title = safe_title.replace(":", "").replace("(", "").replace(")", "")
+    return os.path.join(OUTPUT_DIR, f"{safe_title}.html")
+
+# --------------------------------------------------------------------------
+# 6 bis) Build incrémental : manifeste des entrées de chaque page
+# --------------------------------------------------------------------------
+# Fonctions dont le texte fait partie de l'empreinte des prompts
+PROMPT_BUILDERS = [
+    build_article_prompt,
+    build_extension_prompt,
+    build_continuation_prompt,
+    build_next_extension_prompt,
+    build_seo_prompt,
+    parse_seo_response,
+]
+# Champs de la fiche absents des prompts (ils ne comptent que pour le rendu)
+RENDER_ONLY_KEYS = ("image_url", "local_image_path", "url")
+
+_build_manifest = None
+_build_fingerprints = None
+
+def get_build_manifest():
+    """
+    Manifeste du build, ouvert au premier appel (None si désactivé).
+    """
+    global _build_manifest
+    with _llm_cache_lock:
+        if _build_manifest is None and BUILD_MANIFEST_PATH:
+            _build_manifest = BuildManifest(BUILD_MANIFEST_PATH)
+    return _build_manifest
+
+def build_fingerprints():
+    """
+    (empreinte des prompts, version des gabarits HTML), calculées une fois par exécution.
+    Les prompts changent avec le texte des fonctions qui les construisent,
+    PROMPT_VERSION ou MIN_WORDS.
+    """
+    global _build_fingerprints
+    if _build_fingerprints is None:
+        sources = [inspect.getsource(builder) for builder in PROMPT_BUILDERS]
+        _build_fingerprints = (hash_bytes("\0".join([PROMPT_VERSION, str(MIN_WORDS)] + sources)), template_version())
+    return _build_fingerprints
+
+def page_inputs(watch, price_stats=None, description_fr=""):
+    """
+    Empreintes des entrées d'une page : fiche (hors champs du seul rendu),
+    prompts et modèle pour l'étape LLM ; gabarits et données affichées
+    (prix, description traduite, image, montres similaires) pour le rendu.
+    """
+    prompts, template = build_fingerprints()
+    render_data = json.dumps([price_stats, description_fr, image_src(watch), related_links(watch)],
+                             sort_keys=True, default=str)
+    return {
+        "watch": hash_record({k: v for k, v in watch.items() if k not in RENDER_ONLY_KEYS}),
+        "prompts": prompts,
+        "model": MODEL,
+        "template": template,
+        "render": hash_bytes(render_data),
+    }
+
+def plan_page(watch, inputs, force=False):
+    """
+    BUILD_GENERATE, BUILD_RENDER ou BUILD_SKIP d'après le manifeste
+    (toujours BUILD_GENERATE si `force` ou si le manifeste est désactivé).
+    """
+    manifest = get_build_manifest()
+    if manifest is None or force:
+        return BUILD_GENERATE
+    return manifest.plan(catalog_key(watch), page_filename(watch), inputs)
+
+def page_outputs(watch):
+    """
+    (article_text, meta_data) du dernier build de cette page.
+    """
+    return get_build_manifest().outputs(catalog_key(watch))
+
+def record_page(watch, inputs, article_text, meta_data, commit=True):
+    manifest = get_build_manifest()
+    if manifest is not None:
+        with profile_stage("manifest"):
+            manifest.record(catalog_key(watch), page_filename(watch), inputs, article_text, meta_data, commit)
+
+def mark_live_page(watch):
+    """
+    Note dans le manifeste que la montre fait partie de la sélection de ce
+    run (ramasse-miettes des pages, sans ensemble de clés en mémoire).
+    """
+    manifest = get_build_manifest()
+    if manifest is not None:
+        manifest.mark_live(catalog_key(watch))
+
+def collect_removed_pages(live_keys=None, only_changed=False, catalog=None, partial=False):
+    """
+    Supprime les pages des montres retirées du catalogue : toutes celles
+    absentes de catalog.sqlite, ou de la sélection complète (`live_keys`, ou
+    à défaut les montres notées par mark_live_page() ; all_watches.json) ;
+    en mode only_changed, ou si la sélection n'est qu'une partie du
+    catalogue (`partial` : filtres, shard), celles listées comme supprimées
+    dans le changeset.
+    """
+    manifest = get_build_manifest()
+    if manifest is None:
+        return
+    if catalog is not None:
+        removed = manifest.collect_garbage(catalog.iter_urls())
+    elif only_changed or partial:
+        removed = manifest.remove(load_removed_urls(CHANGESET_PATH))
+    else:
+        removed = manifest.collect_garbage(live_keys)
+    if removed:
+        print(f"{removed} page(s) de montres supprimées retirée(s) de {OUTPUT_DIR}")
+
+# --------------------------------------------------------------------------
+# 6 ter) Montres similaires : maillage interne entre les pages
+# --------------------------------------------------------------------------
+_related_index = None
+
+def page_href(watch):
+    """
+    Lien relatif vers la page d'une montre, depuis une autre page de OUTPUT_DIR.
+    """
+    return quote(os.path.basename(page_filename(watch)))
+
+def prepare_related_watches(source="json", price_analytics=None):
+    """
+    Calcule (ou retrouve dans related.sqlite) les RELATED_K montres les plus
+    similaires de chaque montre du catalogue complet (related_watches.py),
+    lues une à une par related_links() lors du rendu. Retourne l'index, ou
+    None sans catalogue.
+    """
+    global _related_index
+    catalog = None
+    if source == "sqlite":
+        catalog = CatalogDB(CATALOG_DB_PATH)
+        watches = catalog.iter_watches
+    elif os.path.exists(catalog_path(source)):
+        path = catalog_path(source)
+        watches = lambda: iter_catalog(path)
+    else:
+        print(f"Pas de catalogue ({catalog_path(source)}) : pages sans montres similaires")
+        return None
+    if price_analytics is None:
+        price_analytics = load_price_analytics(source)
+
+    start = time.monotonic()
+    if _related_index is not None:
+        _related_index.close()
+    try:
+        with profile_stage("related"):
+            _related_index, rebuilt = load_or_build_related(RELATED_PATH, watches, price_analytics, page_href,
+                                                            RELATED_K)
+    finally:
+        if catalog is not None:
+            catalog.close()
+    origin = f"calculées en {time.monotonic() - start:.1f}s" if rebuilt else "en cache"
+    print(f"Montres similaires : {_related_index.count()} montre(s), {RELATED_K} voisines chacune ({origin})")
+    return _related_index
+
+def related_links(watch):
+    """
+    [(lien, libellé)] des montres similaires (vide si l'index n'est pas préparé).
+    """
+    if _related_index is None:
+        return []
+    return _related_index.links(catalog_key(watch))
 
 # --------------------------------------------------------------------------
 # 7) Boucle principale
 # --------------------------------------------------------------------------
-def main():
+def is_partial_selection(brand=None, family=None, reference=None, shard=None, **_):
+    """
+    Vrai si la sélection ne couvre qu'une partie du catalogue (filtres ou
+    shard) : ses absents ne sont pas des montres supprimées.
+    """
+    return bool(brand or family or reference or shard)
+
+def load_price_analytics(source="json"):
+    """
+    Statistiques de prix de tout le catalogue, en une passe vectorisée :
+    prices.npz s'il est au moins aussi récent que le catalogue scrapé
+    (all_watches.json, ou .jsonl), sinon recalculées depuis le catalogue
+    de `source` (historique des prix absent ou périmé).
+    """
+    scraped_path = JSONL_PATH if source == "jsonl" else JSON_PATH
+    if os.path.exists(PRICE_STORE_PATH):
+        if not os.path.exists(scraped_path) or os.path.getmtime(PRICE_STORE_PATH) >= os.path.getmtime(scraped_path):
+            return PriceStore.load(PRICE_STORE_PATH).analytics()
+        print(f"{PRICE_STORE_PATH} plus ancien que {scraped_path} : statistiques de prix recalculées")
+    if source == "sqlite":
+        catalog = CatalogDB(CATALOG_DB_PATH)
+        try:
+            return PriceStore.from_watches(catalog.iter_watches()).analytics()
+        finally:
+            catalog.close()
+    if not os.path.exists(scraped_path):
+        return {}
+    # Passe séparée sur tout le catalogue (seuls les prix sont gardés)
+    return PriceStore.from_watches(iter_catalog(scraped_path)).analytics()
+
+def iter_selection(catalog=None, only_changed=False, source="json", brand=None, changed_since=None,
+                   pending=False, family=None, reference=None, shard=None):
+    """
+    Montres de la sélection, lues au fil de l'eau : requête sur `catalog`
+    (catalog.sqlite ouvert) ou all_watches.json (ou .jsonl) en flux. Chaque
+    appel retourne un nouvel itérateur (une passe de plus sur la sélection).
+    """
+    if catalog is not None:
+        # Seules les lignes utiles sont lues depuis le catalogue SQLite
+        watches_list = catalog.iter_watches(brand=brand, family=family, reference=reference,
+                                            changed_since=changed_since, pending=pending)
+    else:
+        # Fiche par fiche : mémoire constante quelle que soit la taille du catalogue
+        watches_list = iter_watches(catalog_path(source), brand, family, reference)
+        # Mode incrémental : seules les montres ajoutées/modifiées au dernier scraping
+        if only_changed:
+            changed_urls = load_changed_urls(CHANGESET_PATH)
+            watches_list = (watch for watch in watches_list if watch.get("url") in changed_urls)
+    if shard is not None:
+        watches_list = shard_watches(watches_list, shard)
+    return watches_list
+
+def select_watches(only_changed=False, source="json", brand=None, changed_since=None, pending=False,
+                   family=None, reference=None, shard=None):
+    """
+    Choisit les montres à générer et retourne (watches, catalog, price_analytics) :
+      - source "json" / "jsonl" : all_watches.json (ou .jsonl) lu en flux,
+        fiche par fiche (filtres only_changed, brand, family, reference),
+      - source "sqlite" : requête sur catalog.sqlite, seules les lignes utiles
+        sont lues (filtres brand, family, reference, changed_since, pending) ;
+        `catalog` est alors ouvert et doit être fermé par l'appelant.
+    `watches` est un itérateur à parcourir une fois (iter_selection() pour
+    une autre passe). shard = (K, N) : seules les montres de rang K modulo N
+    de la sélection (N générateurs en parallèle).
+    """
+    catalog = CatalogDB(CATALOG_DB_PATH) if source == "sqlite" else None
+    watches_list = iter_selection(catalog, only_changed, source, brand, changed_since, pending,
+                                  family, reference, shard)
+
+    # Statistiques de prix de tout le catalogue, en une passe vectorisée
+    price_analytics = load_price_analytics(source)
+
+    if only_changed and catalog is None:
+        print(f"{len(load_changed_urls(CHANGESET_PATH))} montre(s) ajoutée(s)/modifiée(s) d'après {CHANGESET_PATH}")
+    if shard is not None:
+        print(f"Shard {shard[0]}/{shard[1]} : une montre sur {shard[1]} de la sélection")
+
+    return watches_list, catalog, price_analytics
+
+def main(only_changed=False, source="json", brand=None, changed_since=None, pending=False, use_cache=True,
+         extension_mode=None, stream=False, force=False, family=None, reference=None, shard=None):
+    global LLM_CACHE_PATH, EXTENSION_MODE
+    if not use_cache:
+        LLM_CACHE_PATH = None
+    if extension_mode:
+        EXTENSION_MODE = extension_mode
+
     # Créer le dossier de sortie s'il n'existe pas
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    # Charger la liste de montres
-    watches_list = load_watches_data(JSON_PATH)
+    with profile_stage("load"):
+        watches_list, catalog, price_analytics = select_watches(only_changed, source, brand, changed_since, pending,
+                                                                family, reference, shard)
+    prepare_related_watches(source, price_analytics)
+
+    skipped = 0
+    failures = 0
+    # Traduction des descriptions en amont, par fenêtres (requêtes groupées)
+    for watch, description_fr in with_translations(watches_list):
+        mark_live_page(watch)
+        price_stats = price_analytics.get(catalog_key(watch))
+        inputs = page_inputs(watch, price_stats, description_fr)
+        action = plan_page(watch, inputs, force)
+        if action == BUILD_SKIP:
+            # Page à jour : aucune entrée n'a changé depuis le dernier build
+            skipped += 1
+            if catalog is not None:
+                catalog.mark_generated(watch)
+            continue
 
-    for watch in watches_list:
-        brand = watch.get("brand", "UnknownBrand")
+        watch_brand = watch.get("brand", "UnknownBrand")
         name_ = watch.get("name", "UnknownModel")
-        print(f"\n--- Génération pour : {brand} - {name_} ---")
+        print(f"\n--- Génération pour : {watch_brand} - {name_} ---")
 
-        # 7.1) Premier appel (boucle) : article >= 3200 mots (en FR), HTML interne
-        article_text = generate_article_text(watch)
+        try:
+            if action == BUILD_RENDER:
+                # Seuls le gabarit ou les données affichées ont changé : pas d'appel au modèle
+                print("Rendu seul (article et SEO du build précédent)")
+                article_text, meta_data = page_outputs(watch)
+            elif stream:
+                # 7.1 + 7.2 en streaming, SEO lancé en avance
+                article_text, meta_data = generate_page_parts_streaming(watch)
+            else:
+                # 7.1) Premier appel (boucle) : article >= 3200 mots (en FR), HTML interne
+                article_text = generate_article_text(watch)
 
-        # 7.2) Second appel : SEO, meta, H1 (en FR)
-        meta_data = generate_seo_and_h1(article_text)
+                # 7.2) Second appel : SEO, meta, H1 (en FR)
+                meta_data = generate_seo_and_h1(article_text, watch)
 
-        # 7.3) Génération du HTML final
-        page_html = generate_watch_page_html(watch, article_text, meta_data)
+            # 7.3) Rendu du HTML final, écrit en streaming dans OUTPUT_DIR/<nom propre>.html
+            filename = write_page(watch, article_text, meta_data, price_stats, description_fr)
+            record_page(watch, inputs, article_text, meta_data)
+        except Exception as e:
+            # Une montre en échec n'arrête pas le run : sa page précédente est conservée
+            # et elle sera retentée au prochain run
+            print(f"Échec de la génération pour {watch_brand} - {name_} : {e}")
+            failures += 1
+            continue
 
-        # 7.4) Nom de fichier de sortie (propre, sans caractères spéciaux)
-        safe_title = f"{brand}_{name_}".replace(" ", "_").replace("/", "_")
-        safe_title = safe_title.replace(":", "").replace("(", "").replace(")", "")
-        filename = os.path.join(OUTPUT_DIR, f"{safe_title}.html")
+        print(f"Fichier HTML généré : {filename}")
 
-        # 7.5) Écriture du fichier
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(page_html)
+        if catalog is not None:
+            catalog.mark_generated(watch)
 
-        print(f"Fichier HTML généré : {filename}")
+    if skipped:
+        print(f"\n{skipped} page(s) à jour, non régénérée(s)")
+    if failures:
+        print(f"{failures} montre(s) en échec, à relancer")
+    collect_removed_pages(None, only_changed, catalog, is_partial_selection(brand, family, reference, shard))
+    if catalog is not None:
+        catalog.close()
+    print_llm_stats()
+
+
+def add_selection_arguments(parser):
+    """
+    Options communes à tous les modes de génération (sélection des montres,
+    cache, mode de complétion).
+    """
+    parser.add_argument("--only-changed", action="store_true",
+                        help="ne régénérer que les montres ajoutées/modifiées d'après changeset.json")
+    parser.add_argument("--source", choices=["json", "jsonl", "sqlite"], default="json",
+                        help="json : all_watches.json ; jsonl : all_watches.jsonl (tous deux lus en flux) ; "
+                             "sqlite : requête sur catalog.sqlite")
+    parser.add_argument("--brand", help="une seule marque")
+    parser.add_argument("--family", help="une seule famille")
+    parser.add_argument("--reference", help="une seule référence")
+    parser.add_argument("--shard", type=parse_shard, metavar="K/N",
+                        help="montres de rang K modulo N de la sélection (N générateurs lancés en parallèle)")
+    parser.add_argument("--since", help="(sqlite) fiches modifiées depuis cette date ISO, ex. 2025-01-31")
+    parser.add_argument("--pending", action="store_true",
+                        help="(sqlite) fiches jamais générées ou modifiées depuis la dernière génération")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ne pas lire ni écrire le cache des réponses du modèle")
+    parser.add_argument("--extension-mode", choices=["continuation", "rewrite"],
+                        help="complétion des articles trop courts (défaut : EXTENSION_MODE)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignorer le manifeste du build : tout régénérer (appels au modèle compris)")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Génération des articles et pages HTML des montres.")
+    add_selection_arguments(parser)
+    parser.add_argument("--stream", action="store_true",
+                        help="article en streaming, SEO lancé sans attendre la fin (traductions faites en amont)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    with profiling_session(args):
+        main(only_changed=args.only_changed, source=args.source, brand=args.brand,
+             changed_since=args.since, pending=args.pending, use_cache=not args.no_cache,
+             extension_mode=args.extension_mode, stream=args.stream, force=args.force,
+             family=args.family, reference=args.reference, shard=args.shard)
@@ -0,0 +1,303 @@
+import os
+import time
+import asyncio
+import argparse
+
+from openai import AsyncOpenAI
+
+import article_generation
+from article_generation import (
+    BUILD_RENDER,
+    BUILD_SKIP,
+    MIN_WORDS,
+    MODEL,
+    OUTPUT_DIR,
+    PROMPT_VERSION,
+    TRANSLATION_WINDOW,
+    add_selection_arguments,
+    build_article_prompt,
+    build_next_extension_prompt,
+    build_seo_prompt,
+    build_translation_prompt,
+    collect_removed_pages,
+    count_words,
+    extend_article,
+    get_llm_cache,
+    get_translation_memo,
+    is_partial_selection,
+    mark_live_page,
+    page_inputs,
+    page_outputs,
+    parse_seo_response,
+    plan_page,
+    prepare_related_watches,
+    print_llm_stats,
+    record_call,
+    record_page,
+    select_watches,
+    write_page,
+)
+from price_store import catalog_key
+from translation import translate_descriptions
+
+# Nombre de montres générées en même temps
+DEFAULT_CONCURRENCY = 8
+# Limites du compte (requêtes et tokens par minute), partagées par toutes les montres
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+# Estimation des tokens de sortie par type d'appel (réajustée avec response.usage)
+ARTICLE_OUTPUT_TOKENS = 6000
+SEO_OUTPUT_TOKENS = 300
+
+
+def estimate_prompt_tokens(prompt):
+    # ≈ 4 caractères par token
+    return len(prompt) // 4 + 1
+
+
+class RateLimiter:
+    """
+    Double seau à jetons partagé : requêtes par minute et tokens par minute.
+    Chaque appel réserve une estimation de ses tokens avant de partir, puis
+    `settle` corrige avec la consommation réelle (response.usage).
+    """
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, estimated_tokens):
+        # Un appel plus gros que la limite par minute passera quand le seau sera plein
+        estimated_tokens = min(estimated_tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.requests >= 1 and self.tokens >= estimated_tokens:
+                    self.requests -= 1
+                    self.tokens -= estimated_tokens
+                    return
+                wait = max(
+                    (1 - self.requests) * 60 / self.rpm,
+                    (estimated_tokens - self.tokens) * 60 / self.tpm,
+                    0.01,
+                )
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        self.tokens -= actual_tokens - min(estimated_tokens, self.tpm)
+
+
+async def complete(client, limiter, prompt, output_tokens, stage="autre", watch=None):
+    """
+    Un appel au modèle, sous le contrôle du limiteur RPM/TPM. Les réponses
+    déjà en cache sont resservies sans appel ni consommation du limiteur.
+    Chaque appel est journalisé dans le ledger (`stage`, `watch`). Cache et
+    ledger (SQLite, fichier) sont lus et écrits hors de la boucle.
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, MODEL, PROMPT_VERSION, prompt)
+        if cached is not None:
+            await asyncio.to_thread(record_call, stage, watch, cached=True)
+            return cached
+
+    estimated = estimate_prompt_tokens(prompt) + output_tokens
+    await limiter.acquire(estimated)
+    # La latence journalisée exclut l'attente du limiteur
+    start = time.perf_counter()
+    raw_response = await client.chat.completions.with_raw_response.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    response = raw_response.parse()
+    await asyncio.to_thread(record_call, stage, watch, response.usage, time.perf_counter() - start,
+                            raw_response.retries_taken)
+    actual = response.usage.total_tokens if response.usage else estimated
+    limiter.settle(estimated, actual)
+    text = response.choices[0].message.content
+    if cache is not None:
+        await asyncio.to_thread(cache.put, MODEL, PROMPT_VERSION, prompt, text)
+    return text
+
+
+async def generate_article_text_async(client, limiter, watch, label):
+    """
+    Même logique que generate_article_text : premier jet puis complétions
+    jusqu'à MIN_WORDS.
+    """
+    article_text = await complete(client, limiter, build_article_prompt(watch), ARTICLE_OUTPUT_TOKENS,
+                                  "article", watch)
+    word_count = count_words(article_text)
+    print(f"[{label}] Première génération : {word_count} mots")
+
+    extension_round = 0
+    while word_count < MIN_WORDS:
+        extension_round += 1
+        prompt = build_next_extension_prompt(article_text, word_count)
+        new_text = await complete(client, limiter, prompt, ARTICLE_OUTPUT_TOKENS,
+                                  f"extension_{extension_round}", watch)
+        article_text = extend_article(article_text, new_text, prompt)
+        word_count = count_words(article_text)
+        print(f"[{label}] Article étendu : {word_count} mots")
+    return article_text
+
+
+async def generate_watch_async(client, limiter, watch, price_analytics, description_fr, force=False):
+    """
+    Génère la page d'une montre (description déjà traduite par l'étape de
+    traduction) : article puis SEO, sauf si le manifeste du build la dit à
+    jour (rien à faire) ou à re-rendre seulement. Retourne le fichier écrit,
+    ou None si la page était à jour. Manifeste, rendu et écriture de la
+    page tournent dans des threads : la boucle ne sert que les appels au modèle.
+    """
+    price_stats = price_analytics.get(catalog_key(watch))
+
+    def plan():
+        inputs = page_inputs(watch, price_stats, description_fr)
+        return inputs, plan_page(watch, inputs, force)
+
+    inputs, action = await asyncio.to_thread(plan)
+    if action == BUILD_SKIP:
+        return None
+
+    label = f"{watch.get('brand', 'UnknownBrand')} - {watch.get('name', 'UnknownModel')}"
+    if action == BUILD_RENDER:
+        article_text, meta_data = await asyncio.to_thread(page_outputs, watch)
+    else:
+        article_text = await generate_article_text_async(client, limiter, watch, label)
+        meta_data = parse_seo_response(
+            await complete(client, limiter, build_seo_prompt(article_text), SEO_OUTPUT_TOKENS, "seo", watch)
+        )
+
+    def publish():
+        filename = write_page(watch, article_text, meta_data, price_stats, description_fr)
+        record_page(watch, inputs, article_text, meta_data)
+        return filename
+
+    filename = await asyncio.to_thread(publish)
+    print(f"[{label}] Fichier HTML généré : {filename}")
+    return filename
+
+
+async def translated_watches(client, limiter, watches):
+    """
+    Équivalent asynchrone de with_translations : par fenêtres de
+    TRANSLATION_WINDOW montres, l'étape de traduction groupée tourne dans un
+    thread et ses appels passent par le client asynchrone et le limiteur.
+    """
+    loop = asyncio.get_running_loop()
+
+    def complete_sync(prompt, stage="translation", watch=None):
+        # La traduction attend d'un modèle environ autant de tokens qu'elle en envoie
+        coroutine = complete(client, limiter, prompt, estimate_prompt_tokens(prompt), stage, watch)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def translate(window):
+        return translate_descriptions([watch.get("description", "") for watch in window],
+                                      get_translation_memo(), complete_sync, build_translation_prompt, MODEL)
+
+    window = []
+    watches_iter = iter(watches)
+    while True:
+        watch = next(watches_iter, None)
+        if watch is not None:
+            window.append(watch)
+        if window and (watch is None or len(window) >= TRANSLATION_WINDOW):
+            translations = await asyncio.to_thread(translate, window)
+            for item in window:
+                description = item.get("description", "")
+                yield item, translations.get(description, description)
+            window = []
+        if watch is None:
+            return
+
+
+async def generate_all(watches, price_analytics, concurrency=DEFAULT_CONCURRENCY,
+                       rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, client=None, on_generated=None, force=False):
+    """
+    `concurrency` workers se partagent l'itérateur de montres (mémoire bornée,
+    même sur un catalogue en streaming), traduites au préalable par fenêtres.
+    Une montre en échec n'arrête pas les autres. `on_generated` est aussi
+    appelé pour les pages déjà à jour ; les montres parcourues sont notées
+    dans le manifeste (ramasse-miettes des pages). Retourne (nb de pages
+    générées, liste des (montre, erreur)).
+    """
+    client = client or AsyncOpenAI()
+    limiter = RateLimiter(rpm, tpm)
+    items = translated_watches(client, limiter, watches)
+    items_lock = asyncio.Lock()
+    generated = []
+    failures = []
+
+    async def worker():
+        while True:
+            # Un générateur asynchrone ne peut être avancé que par une coroutine à la fois
+            async with items_lock:
+                item = await anext(items, None)
+            if item is None:
+                return
+            watch, description_fr = item
+            await asyncio.to_thread(mark_live_page, watch)
+            try:
+                filename = await generate_watch_async(client, limiter, watch, price_analytics, description_fr, force)
+            except Exception as e:
+                print(f"Échec de la génération pour {watch.get('brand')} - {watch.get('name')} : {e}")
+                failures.append((watch, e))
+                continue
+            if filename is not None:
+                generated.append(watch)
+            if on_generated:
+                on_generated(watch)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(generated), failures
+
+
+def main(concurrency=DEFAULT_CONCURRENCY, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, use_cache=True,
+         extension_mode=None, force=False, **selection):
+    if not use_cache:
+        article_generation.LLM_CACHE_PATH = None
+    if extension_mode:
+        article_generation.EXTENSION_MODE = extension_mode
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    watches, catalog, price_analytics = select_watches(**selection)
+    prepare_related_watches(selection.get("source", "json"), price_analytics)
+
+    start = time.monotonic()
+    count, failures = asyncio.run(generate_all(
+        watches, price_analytics, concurrency, rpm, tpm,
+        on_generated=catalog.mark_generated if catalog is not None else None,
+        force=force,
+    ))
+    # Les montres en échec restent notées : leur page précédente est conservée
+    collect_removed_pages(None, selection.get("only_changed", False), catalog,
+                          is_partial_selection(**selection))
+    if catalog is not None:
+        catalog.close()
+    print_llm_stats()
+
+    print(f"\n{count} page(s) générée(s) en {time.monotonic() - start:.1f}s, {len(failures)} échec(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération asynchrone des pages, à concurrence bornée.")
+    add_selection_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="montres générées en parallèle")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="requêtes par minute (tous appels confondus)")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM, help="tokens par minute (tous appels confondus)")
+    args = parser.parse_args()
+    main(args.concurrency, args.rpm, args.tpm, use_cache=not args.no_cache,
+         extension_mode=args.extension_mode, force=args.force, only_changed=args.only_changed, source=args.source,
+         brand=args.brand, changed_since=args.since, pending=args.pending, family=args.family,
+         reference=args.reference, shard=args.shard)
@@ -0,0 +1,257 @@
+import os
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from fingerprints import FingerprintStore
+from http_client import host_gate
+from parsers import ParsePool
+from scraper import (
+    BASE_SAVE_DIR,
+    FINGERPRINTS_FILENAME,
+    IMAGES_SUBFOLDER,
+    PARSER_BACKEND,
+    WATCH_URLS,
+    ScrapeResults,
+    build_file_prefix,
+    fetch_prices,
+    fetch_raw_page,
+    load_previous_records,
+    save_image,
+)
+
+# Débit autorisé par hôte (requêtes / seconde) et rafale maximale
+DEFAULT_RATE_PER_HOST = 1.0
+DEFAULT_BURST = 3
+# Nombre maximum de requêtes HTTP en vol, tous hôtes confondus
+DEFAULT_MAX_IN_FLIGHT = 16
+# Attente maximale (secondes) avant d'envoyer au parsing un paquet incomplet
+PARSE_BATCH_DELAY = 0.05
+
+
+class TokenBucket:
+    """
+    Seau à jetons : `rate` jetons sont ajoutés par seconde,
+    jusqu'à `capacity` jetons. Chaque requête consomme un jeton ;
+    pause() vide le seau pour un temps (Retry-After de l'hôte).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.updated_at = max(self.updated_at, self.paused_until)
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # On attend juste le temps qu'il faut pour obtenir le prochain jeton
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """
+    Un seau à jetons par hôte (watchbase.com, cdn.watchbase.com, ...),
+    créé à la volée, combiné à un plafond global de requêtes en vol.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_PER_HOST, burst=DEFAULT_BURST, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def run(self, func, url, *args, **kwargs):
+        """
+        Exécute `func(url, ...)` (fonction bloquante) dans un thread
+        une fois le jeton de l'hôte obtenu ; les nouvelles tentatives de
+        http_client reprennent un jeton au même seau.
+        """
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+        loop = asyncio.get_running_loop()
+
+        def acquire():
+            asyncio.run_coroutine_threadsafe(bucket.acquire(), loop).result()
+
+        def pause(seconds):
+            loop.call_soon_threadsafe(bucket.pause, seconds)
+
+        def call():
+            with host_gate(acquire, pause):
+                return func(url, *args, **kwargs)
+
+        async with self.in_flight:
+            return await asyncio.to_thread(call)
+
+
+class ParseBatcher:
+    """
+    Regroupe les pages téléchargées en paquets pour le pool de parsing : un
+    paquet part dès qu'il atteint `batch_size` pages (chunksize du pool par
+    défaut), ou `delay` secondes après sa première page quand le débit est
+    faible. Chaque page attend son propre résultat.
+    """
+
+    def __init__(self, parse_pool, batch_size=None, delay=PARSE_BATCH_DELAY):
+        self.parse_pool = parse_pool
+        self.batch_size = batch_size or parse_pool.chunksize
+        self.delay = delay
+        self.pages = []
+        self.waiters = []
+        self.timer = None
+
+    async def parse(self, url, html):
+        """
+        (url, watch_data, price_url, erreur) de la page, comme parse_raw_pages.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.pages.append((url, html))
+        self.waiters.append(waiter)
+        if len(self.pages) >= self.batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.delay, self.flush)
+        return await waiter
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pages, waiters = self.pages, self.waiters
+        self.pages, self.waiters = [], []
+        if pages:
+            future = asyncio.wrap_future(self.parse_pool.submit(pages))
+            future.add_done_callback(lambda done: self._dispatch(done, waiters))
+
+    @staticmethod
+    def _dispatch(future, waiters):
+        error = future.exception()
+        results = [None] * len(waiters) if error is not None else future.result()
+        for waiter, result in zip(waiters, results):
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
+
+
+async def scrape_watch(url, limiter, parser, images_folder):
+    """
+    Scrape une montre : la page d'abord (parsée par paquets dans le pool de
+    processus, hors de la boucle et du GIL), puis le JSON des prix et
+    l'image en parallèle.
+    """
+    html = await limiter.run(fetch_raw_page, url)
+    _, watch_data, price_url, error = await parser.parse(url, html)
+    if error is not None:
+        raise Exception(f"Parsing impossible : {error}")
+
+    async def load_prices():
+        if price_url:
+            watch_data["prices"] = await limiter.run(fetch_prices, price_url)
+
+    async def load_image():
+        image_url = watch_data["image_url"]
+        if not image_url:
+            watch_data["local_image_path"] = ""
+            return
+        watch_data["local_image_path"] = await limiter.run(
+            save_image,
+            image_url,
+            images_folder=images_folder,
+            filename_prefix=build_file_prefix(watch_data, url),
+        )
+
+    await asyncio.gather(load_prices(), load_image())
+    return watch_data
+
+
+async def scrape_all(urls, rate=DEFAULT_RATE_PER_HOST, burst=DEFAULT_BURST, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                     parse_workers=None):
+    """
+    Lance le scraping de toutes les URLs en même temps, sous le contrôle
+    du limiteur par hôte. Retourne les montres dans l'ordre de `urls` ;
+    une montre en échec est ignorée sans bloquer les autres.
+    """
+    # Les appels bloquants (requests) tournent dans ce pool de threads
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_in_flight + 1))
+
+    limiter = HostRateLimiter(rate, burst, max_in_flight)
+    images_folder = os.path.join(BASE_SAVE_DIR, IMAGES_SUBFOLDER)
+    os.makedirs(images_folder, exist_ok=True)
+
+    async def scrape_one(url):
+        print(f"Scraping {url} ...")
+        try:
+            return await scrape_watch(url, limiter, parser, images_folder)
+        except Exception as e:
+            print(f"Échec du scraping pour {url} : {e}")
+            return None
+
+    with ParsePool(parse_workers, PARSER_BACKEND) as parse_pool:
+        parser = ParseBatcher(parse_pool)
+        results = await asyncio.gather(*(scrape_one(url) for url in urls))
+    return [watch_data for watch_data in results if watch_data is not None]
+
+
+def main(urls=None, rate=DEFAULT_RATE_PER_HOST, burst=DEFAULT_BURST, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+         parse_workers=None):
+    os.makedirs(BASE_SAVE_DIR, exist_ok=True)
+
+    start = time.monotonic()
+    # URLs données : run partiel, les autres montres du catalogue sont conservées
+    partial = bool(urls)
+    urls = urls or WATCH_URLS
+    previous_records = load_previous_records()
+    all_watches_data = asyncio.run(scrape_all(urls, rate, burst, max_in_flight, parse_workers))
+    print(f"\n{len(all_watches_data)} montres scrapées en {time.monotonic() - start:.1f}s")
+
+    # Mêmes sorties que scraper.py : JSON, catalogue SQLite, historique des prix, changeset
+    results = ScrapeResults(FingerprintStore(os.path.join(BASE_SAVE_DIR, FINGERPRINTS_FILENAME)))
+    scraped = {watch["url"]: watch for watch in all_watches_data}
+    for url in urls:
+        # Une montre en échec garde sa fiche précédente plutôt que de la perdre
+        watch_data = scraped.get(url) or previous_records.get(url)
+        if watch_data is not None:
+            results.add(url, watch_data)
+    if partial:
+        selected = set(urls)
+        results.carry_over({url: record for url, record in previous_records.items() if url not in selected})
+    results.finish(None if partial else urls)
+    print("Terminé !")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraping asynchrone de watchbase avec limitation de débit par hôte.")
+    parser.add_argument("urls", nargs="*", help="URLs à scraper (par défaut : WATCH_URLS)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_HOST, help="requêtes par seconde et par hôte")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="rafale maximale par hôte")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="requêtes simultanées au total")
+    parser.add_argument("--parse-workers", type=int, help="processus de parsing (défaut : nb de CPU)")
+    args = parser.parse_args()
+    main(args.urls, args.rate, args.burst, args.max_in_flight, args.parse_workers)
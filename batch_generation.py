@@ -0,0 +1,472 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+
+from openai import OpenAI
+
+import article_generation
+from article_generation import (
+    BUILD_GENERATE,
+    BUILD_RENDER,
+    BUILD_SKIP,
+    MODEL,
+    OUTPUT_DIR,
+    PROMPT_VERSION,
+    TRANSLATION_WINDOW,
+    add_selection_arguments,
+    build_translation_prompt,
+    collect_removed_pages,
+    generate_article_text,
+    generate_seo_and_h1,
+    get_build_manifest,
+    get_ledger,
+    get_llm_cache,
+    get_translation_memo,
+    is_partial_selection,
+    iter_selection,
+    mark_live_page,
+    page_filename,
+    page_inputs,
+    page_outputs,
+    plan_page,
+    prepare_related_watches,
+    print_llm_stats,
+    related_links,
+    record_page,
+    select_watches,
+)
+from jsonl_store import append_jsonl, iter_jsonl
+from llm_cache import cache_key
+from price_store import catalog_key
+from renderer import render_pages
+from translation import (
+    build_batch_translation_prompt,
+    chunk_descriptions,
+    parse_batch_translation,
+    pending_descriptions,
+)
+
+# Dossier des lots (fichiers de requêtes, état du lot en cours, stand-in local)
+BATCH_DIR = os.path.join(os.path.dirname(article_generation.JSON_PATH), "batches")
+BATCH_STATE_FILENAME = "batch_state.json"
+# Intervalle entre deux interrogations du lot en cours (secondes)
+DEFAULT_POLL_INTERVAL = 60
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Statuts de fin d'un lot (les lots expirés ou annulés gardent leurs résultats partiels)
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class PendingPrompt(Exception):
+    """
+    Levée par cached_only quand une réponse manque : le prompt ira au prochain lot.
+    """
+
+    def __init__(self, stage, prompt, watch):
+        super().__init__(stage)
+        self.stage = stage
+        self.prompt = prompt
+        self.watch = watch
+
+
+def cached_only(prompt, stage="autre", watch=None):
+    """
+    complete_fn qui ne sert que des réponses en cache, sans jamais appeler l'API.
+    """
+    text = get_llm_cache().get(MODEL, PROMPT_VERSION, prompt)
+    if text is None:
+        raise PendingPrompt(stage, prompt, watch)
+    return text
+
+
+def windows(watches, size=TRANSLATION_WINDOW):
+    """
+    Découpe le flux de montres en listes d'au plus `size` montres.
+    """
+    window = []
+    for watch in watches:
+        window.append(watch)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def pending_translations(watches):
+    """
+    Rejoue l'étape de traduction groupée sur le cache, par fenêtres de
+    TRANSLATION_WINDOW montres : les réponses déjà reçues sont rangées dans
+    le mémo, les prompts manquants (requêtes groupées, puis repli
+    description par description) sont produits au fil de l'eau.
+    """
+    memo = get_translation_memo()
+    for window in windows(watches):
+        descriptions = [watch.get("description", "") for watch in window]
+        for chunk in chunk_descriptions(pending_descriptions(descriptions, memo)):
+            try:
+                results = parse_batch_translation(chunk,
+                                                  cached_only(build_batch_translation_prompt(chunk), "translation"))
+            except PendingPrompt as e:
+                yield e
+                continue
+            for description in chunk:
+                if description in results:
+                    continue
+                try:
+                    results[description] = cached_only(build_translation_prompt(description), "translation").strip()
+                except PendingPrompt as e:
+                    yield e
+            memo.put_many(results, MODEL)
+
+
+def pending_prompts(watch):
+    """
+    Rejoue la génération d'une montre sur le cache et retourne le premier
+    prompt de article -> extension_N -> seo qui n'a pas de réponse.
+    Une liste vide signifie que l'article et le SEO sont prêts.
+    """
+    pending = []
+    try:
+        article_text = generate_article_text(watch, complete_fn=cached_only, verbose=False)
+        generate_seo_and_h1(article_text, watch, complete_fn=cached_only)
+    except PendingPrompt as e:
+        pending.append(e)
+    return pending
+
+
+# --------------------------------------------------------------------------
+# Backends : API Batch OpenAI, ou stand-in local à base de fichiers
+# --------------------------------------------------------------------------
+class OpenAIBatchBackend:
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, input_path):
+        with open(input_path, "rb") as f:
+            batch_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=batch_file.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window="24h")
+        return batch.id
+
+    def poll(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalBatchBackend:
+    """
+    Stand-in de l'API Batch : un dossier par lot (input.jsonl, status.json,
+    output.jsonl au même format que l'API). Le lot est exécuté à la première
+    interrogation, requête par requête, avec un client chat.completions
+    ordinaire (ex. le faux serveur de benchmarks/fake_openai_server.py).
+    """
+
+    def __init__(self, root, client):
+        self.root = root
+        self.client = client
+
+    def _path(self, batch_id, name):
+        return os.path.join(self.root, batch_id, name)
+
+    def _set_status(self, batch_id, status):
+        tmp_path = self._path(batch_id, "status.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"status": status}, f)
+        os.replace(tmp_path, self._path(batch_id, "status.json"))
+
+    def submit(self, input_path):
+        batch_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.root, batch_id))
+        shutil.copyfile(input_path, self._path(batch_id, "input.jsonl"))
+        self._set_status(batch_id, "validating")
+        return batch_id
+
+    def poll(self, batch_id):
+        with open(self._path(batch_id, "status.json"), "r", encoding="utf-8") as f:
+            status = json.load(f)["status"]
+        if status in TERMINAL_STATUSES:
+            return status
+
+        self._set_status(batch_id, "in_progress")
+        with open(self._path(batch_id, "output.jsonl"), "w", encoding="utf-8") as out:
+            for request in iter_jsonl(self._path(batch_id, "input.jsonl")):
+                result = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"],
+                          "response": None, "error": None}
+                try:
+                    response = self.client.chat.completions.create(**request["body"])
+                    result["response"] = {"status_code": 200, "body": response.model_dump()}
+                except Exception as e:
+                    result["error"] = {"code": "local_error", "message": str(e)}
+                append_jsonl(out, result)
+        self._set_status(batch_id, "completed")
+        return "completed"
+
+    def results(self, batch_id):
+        yield from iter_jsonl(self._path(batch_id, "output.jsonl"))
+
+
+# --------------------------------------------------------------------------
+# Lots : écriture, suivi, intégration des résultats dans le cache
+# --------------------------------------------------------------------------
+def state_path():
+    return os.path.join(BATCH_DIR, BATCH_STATE_FILENAME)
+
+
+def load_state():
+    if not os.path.exists(state_path()):
+        return None
+    with open(state_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    tmp_path = f"{state_path()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, state_path())
+
+
+def clear_state():
+    if os.path.exists(state_path()):
+        os.remove(state_path())
+
+
+def write_batch_file(pending, round_number):
+    """
+    Écrit les prompts en attente (itérable parcouru une fois) au format de
+    l'API Batch (un prompt identique n'est envoyé qu'une fois). Retourne
+    (chemin, {custom_id: méta}).
+    """
+    input_path = os.path.join(BATCH_DIR, f"batch_requests_{round_number:03d}.jsonl")
+    requests_meta = {}
+    with open(input_path, "w", encoding="utf-8") as f:
+        for item in pending:
+            custom_id = f"{item.stage}-{cache_key(MODEL, PROMPT_VERSION, item.prompt)[:24]}"
+            if custom_id in requests_meta:
+                continue
+            requests_meta[custom_id] = {
+                "stage": item.stage,
+                "prompt": item.prompt,
+                # Les traductions groupées ne concernent pas une montre en particulier
+                "watch": {"url": catalog_key(item.watch), "brand": item.watch.get("brand"),
+                          "reference": item.watch.get("reference")} if item.watch else None,
+            }
+            append_jsonl(f, {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {"model": MODEL, "messages": [{"role": "user", "content": item.prompt}]},
+            })
+    return input_path, requests_meta
+
+
+def ingest_results(backend, state, failed=None):
+    """
+    Range les réponses du lot dans le cache (et le ledger). Retourne le
+    nombre de réponses intégrées ; les clés (cache_key) des prompts en
+    échec sont ajoutées à `failed`.
+    """
+    cache = get_llm_cache()
+    ledger = get_ledger()
+    ingested = 0
+    for result in backend.results(state["batch_id"]):
+        meta = state["requests"].get(result["custom_id"])
+        response = result.get("response")
+        if meta is None or not response or response.get("status_code") != 200:
+            print(f"Requête {result['custom_id']} en échec : {result.get('error')}")
+            if meta is not None and failed is not None:
+                failed.add(cache_key(MODEL, PROMPT_VERSION, meta["prompt"]))
+            continue
+        body = response["body"]
+        cache.put(MODEL, PROMPT_VERSION, meta["prompt"], body["choices"][0]["message"]["content"])
+        if ledger is not None:
+            usage = body.get("usage") or {}
+            ledger.record(meta["stage"], MODEL, meta["watch"],
+                          prompt_tokens=usage.get("prompt_tokens", 0),
+                          completion_tokens=usage.get("completion_tokens", 0), batch=True)
+        ingested += 1
+    return ingested
+
+
+def wait_for_batch(backend, state, poll_interval):
+    while True:
+        status = backend.poll(state["batch_id"])
+        if status in TERMINAL_STATUSES:
+            return status
+        print(f"Lot {state['batch_id']} : {status}, nouvel essai dans {poll_interval}s")
+        time.sleep(poll_interval)
+
+
+def run_batches(watches, backend, poll_interval=DEFAULT_POLL_INTERVAL, needs_generation=None):
+    """
+    Enchaîne les lots jusqu'à ce que toutes les montres aient leurs réponses :
+    lot 1 = articles + traductions, lots suivants = extensions puis SEO
+    (chaque étape dépend de la réponse de la précédente) ; les traductions
+    groupées partent dès le lot 1. Un lot en cours
+    (batch_state.json) est repris au lieu d'être soumis à nouveau.
+    `watches` : fonction qui retourne un nouvel itérateur sur la sélection
+    (une passe par lot, rien n'est gardé en mémoire).
+    `needs_generation(watch)` : vrai si l'article est à (re)générer (défaut :
+    toutes) ; les traductions portent toujours sur toutes les montres.
+    Une requête en échec dans un lot n'est pas resoumise : sa montre (ou
+    sa traduction) est abandonnée pour ce run et retentée au suivant.
+    """
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    state = load_state()
+    round_number = state["round"] if state else 0
+    # Montres abandonnées pour ce run (complétion rejetée)
+    failed = set()
+    # Prompts en échec dans un lot (cache_key)
+    failed_prompts = set()
+
+    def watch_prompts():
+        for watch in watches():
+            key = catalog_key(watch)
+            if key in failed or (needs_generation is not None and not needs_generation(watch)):
+                continue
+            try:
+                yield from pending_prompts(watch)
+            except Exception as e:
+                # Complétion rejetée (retirée du cache) : montre abandonnée pour ce run
+                print(f"Échec de la génération pour {watch.get('brand')} - {watch.get('name')} : {e}")
+                failed.add(key)
+
+    def pending():
+        for items in (pending_translations(watches()), watch_prompts()):
+            for item in items:
+                if cache_key(MODEL, PROMPT_VERSION, item.prompt) not in failed_prompts:
+                    yield item
+
+    while True:
+        if state is not None:
+            print(f"Attente du lot {state['batch_id']} ({len(state['requests'])} requête(s))")
+            status = wait_for_batch(backend, state, poll_interval)
+            errors = len(failed_prompts)
+            ingested = ingest_results(backend, state, failed_prompts)
+            print(f"Lot {state['batch_id']} {status} : {ingested}/{len(state['requests'])} réponse(s) intégrée(s)")
+            clear_state()
+            # Lot sans aucun résultat (ni réponse, ni échec signalé) : rien ne progresserait
+            if ingested == 0 and len(failed_prompts) == errors:
+                raise Exception(f"Le lot {state['batch_id']} n'a produit aucune réponse ({status})")
+
+        input_path, requests_meta = write_batch_file(pending(), round_number + 1)
+        if not requests_meta:
+            os.remove(input_path)
+            return
+        round_number += 1
+        batch_id = backend.submit(input_path)
+        state = {"batch_id": batch_id, "round": round_number, "input_path": input_path, "requests": requests_meta}
+        save_state(state)
+        print(f"Lot {round_number} soumis : {batch_id}, {len(requests_meta)} requête(s) ({input_path})")
+
+
+def page_jobs(watches, price_analytics, force=False, failures=None):
+    """
+    Tâches de rendu (pour renderer.render_pages) des pages que le manifeste
+    du build ne dit pas à jour : article et SEO relus dans le cache (pages
+    à générer) ou dans le manifeste (rendu seul). Les pages sont inscrites
+    au manifeste sans validation (commit après le rendu). Une montre sans
+    réponses complètes est sautée (ajoutée à `failures`). Toutes les montres
+    parcourues sont notées dans le manifeste (ramasse-miettes des pages).
+    """
+    memo = get_translation_memo()
+    for window in windows(watches):
+        translations = memo.get_many([watch.get("description", "") for watch in window])
+        for watch in window:
+            mark_live_page(watch)
+            description = watch.get("description", "")
+            description_fr = translations.get(description, description)
+            price_stats = price_analytics.get(catalog_key(watch))
+            inputs = page_inputs(watch, price_stats, description_fr)
+            action = plan_page(watch, inputs, force)
+            if action == BUILD_SKIP:
+                continue
+            if action == BUILD_RENDER:
+                article_text, meta_data = page_outputs(watch)
+            else:
+                try:
+                    article_text = generate_article_text(watch, complete_fn=cached_only, verbose=False)
+                    meta_data = generate_seo_and_h1(article_text, watch, complete_fn=cached_only)
+                except Exception as e:
+                    # Réponse manquante (requête en échec) ou complétion rejetée : relancée au prochain run
+                    print(f"Échec de la génération pour {watch.get('brand')} - {watch.get('name')} : {e}")
+                    if failures is not None:
+                        failures.append(watch)
+                    continue
+            record_page(watch, inputs, article_text, meta_data, commit=False)
+            yield page_filename(watch), watch, article_text, meta_data, price_stats, description_fr, related_links(watch)
+
+
+def main(backend_name="openai", poll_interval=DEFAULT_POLL_INTERVAL, render_workers=None, force=False,
+         **selection):
+    if not article_generation.LLM_CACHE_PATH:
+        raise Exception("Le mode batch range ses réponses dans le cache LLM : il ne peut pas être désactivé")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    _, catalog, price_analytics = select_watches(**selection)
+    prepare_related_watches(selection.get("source", "json"), price_analytics)
+
+    def selected():
+        # Plusieurs passes sur la sélection (une par lot), relue à chaque fois
+        return iter_selection(catalog, **selection)
+
+    client = OpenAI()
+    if backend_name == "local":
+        backend = LocalBatchBackend(os.path.join(BATCH_DIR, "local"), client)
+    else:
+        backend = OpenAIBatchBackend(client)
+    # Seules les montres dont la fiche, les prompts ou le modèle ont changé passent
+    # par les lots (la description traduite ne compte que pour le rendu)
+    def needs_generation(watch):
+        return plan_page(watch, page_inputs(watch, price_analytics.get(catalog_key(watch))), force) == BUILD_GENERATE
+
+    total = generate = 0
+    for watch in selected():
+        total += 1
+        generate += needs_generation(watch)
+    print(f"{generate} montre(s) à générer sur {total}")
+    run_batches(selected, backend, poll_interval, needs_generation)
+
+    # Toutes les réponses sont en cache : rendu des pages sans appel, sur un pool de processus
+    failures = []
+    count = render_pages(page_jobs(selected(), price_analytics, force, failures), render_workers)
+    print(f"{count} page(s) HTML générée(s) dans {OUTPUT_DIR}, {len(failures)} échec(s)")
+    if get_build_manifest() is not None:
+        get_build_manifest().commit()
+    collect_removed_pages(None, selection.get("only_changed", False), catalog, is_partial_selection(**selection))
+
+    if catalog is not None:
+        failed = {catalog_key(watch) for watch in failures}
+        for watch in selected():
+            if catalog_key(watch) not in failed:
+                catalog.mark_generated(watch)
+        catalog.close()
+    print_llm_stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération en masse via l'API Batch (ou son stand-in local).")
+    add_selection_arguments(parser)
+    parser.add_argument("--backend", choices=["openai", "local"], default="openai",
+                        help="local : lots exécutés depuis des fichiers, via OPENAI_BASE_URL (ex. faux serveur)")
+    parser.add_argument("--poll-interval", type=int, default=DEFAULT_POLL_INTERVAL,
+                        help="secondes entre deux interrogations du lot en cours")
+    parser.add_argument("--render-workers", type=int, help="processus de rendu des pages (défaut : nb de CPU)")
+    args = parser.parse_args()
+    if args.no_cache:
+        parser.error("--no-cache est incompatible avec le mode batch")
+    if args.extension_mode:
+        article_generation.EXTENSION_MODE = args.extension_mode
+    main(args.backend, args.poll_interval, args.render_workers, args.force, only_changed=args.only_changed, source=args.source,
+         brand=args.brand, changed_since=args.since, pending=args.pending, family=args.family,
+         reference=args.reference, shard=args.shard)
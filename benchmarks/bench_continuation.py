@@ -0,0 +1,83 @@
+"""
+Benchmark des modes de complétion des articles trop courts ("rewrite" vs
+"continuation"), contre le faux serveur OpenAI.
+
+Le faux modèle produit au plus `--article-words` mots neufs par réponse :
+plusieurs tours de complétion sont nécessaires pour atteindre MIN_WORDS.
+Mesure, par article : requêtes, tokens d'entrée / de sortie et temps.
+
+Usage : python -m benchmarks.bench_continuation [--articles N] [--article-words 900] [--ms-per-token 1]
+"""
+import glob
+import time
+import argparse
+
+from openai import OpenAI
+
+import article_generation
+from parsers import parse_watch_page
+from benchmarks.make_fixtures import PAGES_DIR
+from benchmarks.fake_openai_server import start_in_thread
+
+EXTENSION_MODES = ["rewrite", "continuation"]
+
+
+def load_watches(count):
+    watches = []
+    for path in sorted(glob.glob(f"{PAGES_DIR}/*.html"))[:count]:
+        with open(path, "r", encoding="utf-8") as f:
+            watch_data, _ = parse_watch_page(f.read(), path)
+        watches.append(watch_data)
+    return watches
+
+
+def bench_mode(mode, server, watches):
+    article_generation.EXTENSION_MODE = mode
+    server.reset_stats()
+    start = time.perf_counter()
+    words = [article_generation.count_words(article_generation.generate_article_text(watch)) for watch in watches]
+    elapsed = time.perf_counter() - start
+    stats = dict(server.stats)
+    return {
+        "requests": stats["requests"] / len(watches),
+        "prompt_tokens": stats["prompt_tokens"] / len(watches),
+        "completion_tokens": stats["completion_tokens"] / len(watches),
+        "seconds": elapsed / len(watches),
+        "words": sum(words) / len(words),
+    }
+
+
+def main(articles=3, article_words=900, ms_per_token=1.0):
+    watches = load_watches(articles)
+    if not watches:
+        raise Exception(f"Aucune page .html dans {PAGES_DIR} (lancer python -m benchmarks.make_fixtures)")
+
+    server, base_url = start_in_thread(article_words=article_words, ms_per_token=ms_per_token)
+    article_generation.client = OpenAI(base_url=base_url, api_key="fake")
+    # Chaque mode doit réellement appeler le modèle
+    article_generation.LLM_CACHE_PATH = None
+
+    print(f"{len(watches)} article(s), {article_words} mots neufs max par réponse, {ms_per_token} ms/token")
+    results = {}
+    try:
+        for mode in EXTENSION_MODES:
+            results[mode] = bench_mode(mode, server, watches)
+    finally:
+        server.shutdown()
+
+    for mode, r in results.items():
+        print(f"  {mode:<12} {r['requests']:4.1f} req  {r['prompt_tokens']:8.0f} tok in  "
+              f"{r['completion_tokens']:7.0f} tok out  {r['seconds']:6.2f} s  {r['words']:6.0f} mots  (par article)")
+    rewrite, continuation = results["rewrite"], results["continuation"]
+    print(f"  gain : tokens x{(rewrite['prompt_tokens'] + rewrite['completion_tokens']) / (continuation['prompt_tokens'] + continuation['completion_tokens']):.1f}, "
+          f"temps x{rewrite['seconds'] / continuation['seconds']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rewrite vs continuation des articles.")
+    parser.add_argument("--articles", type=int, default=3, help="nombre d'articles générés par mode")
+    parser.add_argument("--article-words", type=int, default=900, help="mots neufs max par réponse du faux modèle")
+    parser.add_argument("--ms-per-token", type=float, default=1.0, help="latence du faux modèle par token produit")
+    args = parser.parse_args()
+    main(args.articles, args.article_words, args.ms_per_token)
@@ -0,0 +1,66 @@
+"""
+Benchmark des backends de parsing sur des pages watchbase sauvegardées.
+
+Vérifie d'abord que tous les backends produisent exactement les mêmes
+dicts, puis mesure le débit (pages/s) de chacun.
+
+Usage : python -m benchmarks.bench_parser [--pages-dir DIR] [--repeat N]
+"""
+import os
+import glob
+import time
+import argparse
+
+from parsers import PARSER_BACKENDS
+from benchmarks.make_fixtures import PAGES_DIR
+
+
+def load_pages(pages_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((path, f.read()))
+    return pages
+
+
+def check_identical(pages):
+    """
+    Lève une exception si un backend produit un résultat différent du backend bs4.
+    """
+    for path, html in pages:
+        reference = PARSER_BACKENDS["bs4"](html, path)
+        for name, parse in PARSER_BACKENDS.items():
+            if parse(html, path) != reference:
+                raise Exception(f"Le backend {name} diffère de bs4 sur {path}")
+
+
+def bench_backend(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path, html in pages:
+            parse(html, path)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed
+
+
+def main(pages_dir=PAGES_DIR, repeat=20):
+    pages = load_pages(pages_dir)
+    if not pages:
+        raise Exception(f"Aucune page .html dans {pages_dir} (lancer python -m benchmarks.make_fixtures)")
+
+    check_identical(pages)
+    print(f"{len(pages)} pages, {repeat} passes : résultats identiques pour {', '.join(PARSER_BACKENDS)}")
+
+    results = {name: bench_backend(parse, pages, repeat) for name, parse in PARSER_BACKENDS.items()}
+    for name, pages_per_sec in results.items():
+        speedup = pages_per_sec / results["bs4"]
+        print(f"  {name:<6} {pages_per_sec:8.1f} pages/s  (x{speedup:.1f} vs bs4)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des backends de parsing watchbase.")
+    parser.add_argument("--pages-dir", default=PAGES_DIR, help="dossier de pages .html sauvegardées")
+    parser.add_argument("--repeat", type=int, default=20, help="nombre de passes sur le corpus")
+    args = parser.parse_args()
+    main(args.pages_dir, args.repeat)
@@ -0,0 +1,137 @@
+"""
+Benchmark de bout en bout du pipeline (pipeline.py), entièrement hors ligne.
+
+Pour chaque taille de catalogue, démarre le faux serveur watchbase et le
+faux serveur OpenAI, puis lance le pipeline dans un processus à part
+(GUIDE_MONTRES_DIR et dossier de sortie temporaires, OPENAI_BASE_URL vers
+le faux modèle) : un premier run à froid (scraping, génération, rendu,
+index), puis un second run sans aucun changement (tout est à jour).
+Mesure la durée totale, la première page, l'occupation de chaque étape,
+les requêtes HTTP et les tokens du faux modèle.
+
+Usage : python -m benchmarks.bench_pipeline [--sizes 10,100,1000] [--llm-latency 0.5] [--http-latency 0.05]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.make_fixtures import REPO_DIR
+from benchmarks import fake_openai_server, fake_watchbase_server
+
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_ARTICLE_WORDS = 3500
+
+
+def run_child(urls_path, result_path, scrape_workers, generate_workers, render_workers):
+    """
+    Côté processus du pipeline : deux runs sur les URLs de `urls_path`,
+    mesures écrites en JSON dans `result_path`.
+    """
+    from openai import OpenAI
+
+    import article_generation
+    import pipeline
+
+    article_generation.client = OpenAI()
+    with open(urls_path, "r", encoding="utf-8") as f:
+        urls = f.read().split()
+
+    results = {}
+    for run in ("cold", "warm"):
+        stages, elapsed, timings = pipeline.run_pipeline(urls, scrape_workers, generate_workers, render_workers,
+                                                         scrape_interval=0.0)
+        results[run] = {
+            "seconds": elapsed,
+            "first_page_seconds": timings["first_page"],
+            "skipped": timings["skipped"],
+            "stages": {
+                stage.name: {"workers": stage.workers, "items": stage.items, "failures": stage.failures,
+                             "busy_seconds": stage.busy / stage.workers}
+                for stage in stages
+            },
+        }
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def bench_size(size, llm_latency, ms_per_token, article_words, http_latency, workers):
+    watchbase, watchbase_url = fake_watchbase_server.start_in_thread(latency=http_latency)
+    llm, llm_url = fake_openai_server.start_in_thread(latency=llm_latency, article_words=article_words,
+                                                      ms_per_token=ms_per_token)
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        urls_path = os.path.join(work_dir, "urls.txt")
+        result_path = os.path.join(work_dir, "result.json")
+        with open(urls_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(fake_watchbase_server.catalog_urls(watchbase_url, size)))
+        data_dir = os.path.join(work_dir, "data")
+        os.makedirs(data_dir)
+        env = dict(os.environ, PYTHONPATH=REPO_DIR, GUIDE_MONTRES_DIR=data_dir,
+                   OPENAI_BASE_URL=llm_url, OPENAI_API_KEY="fake", NO_PROXY="127.0.0.1")
+        command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", urls_path, result_path,
+                   "--workers", ",".join(str(w) for w in workers)]
+        start = time.perf_counter()
+        # Le pipeline écrit output_pages/ dans le dossier courant
+        completed = subprocess.run(command, cwd=work_dir, env=env, stdout=subprocess.DEVNULL)
+        wall = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise Exception(f"Le pipeline a échoué pour {size} montre(s) (code {completed.returncode})")
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        pages = len([name for name in os.listdir(os.path.join(work_dir, "output_pages")) if name.endswith(".html")])
+    finally:
+        watchbase.shutdown()
+        llm.shutdown()
+        shutil.rmtree(work_dir)
+
+    result["process_seconds"] = wall
+    result["watches_per_sec"] = size / result["cold"]["seconds"]
+    result["output_html_files"] = pages
+    result["http"] = dict(watchbase.stats)
+    result["llm"] = dict(llm.stats)
+    return result
+
+
+def main(sizes=DEFAULT_SIZES, llm_latency=0.0, ms_per_token=0.0, article_words=DEFAULT_ARTICLE_WORDS,
+         http_latency=0.0, workers=(4, 8, 2)):
+    print(f"Pipeline hors ligne : latence modèle {llm_latency}s + {ms_per_token} ms/token, "
+          f"latence watchbase {http_latency}s, workers scraping/génération/rendu {'/'.join(map(str, workers))}")
+    results = {}
+    for size in sizes:
+        result = bench_size(size, llm_latency, ms_per_token, article_words, http_latency, workers)
+        results[str(size)] = result
+        cold, warm = result["cold"], result["warm"]
+        slowest = max(cold["stages"].items(), key=lambda item: item[1]["busy_seconds"])[0]
+        print(f"  {size:>7} montres  {cold['seconds']:8.1f}s à froid ({result['watches_per_sec']:7.1f} montres/s, "
+              f"1re page {cold['first_page_seconds'] or 0:.1f}s, goulot : {slowest})  "
+              f"{warm['seconds']:7.1f}s sans changement  "
+              f"{result['llm']['requests']} req. modèle, {result['http']['watch']} pages watchbase")
+    return results
+
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(",") if size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de bout en bout du pipeline, hors ligne.")
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+                        help="tailles de catalogue, séparées par des virgules (ex. 10,100,1000,100000)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="secondes par réponse du faux modèle")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="latence du faux modèle par token produit")
+    parser.add_argument("--article-words", type=int, default=DEFAULT_ARTICLE_WORDS,
+                        help="mots neufs max par réponse du faux modèle")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="secondes par réponse watchbase")
+    parser.add_argument("--workers", type=parse_sizes, default=[4, 8, 2],
+                        help="workers scraping,génération,rendu")
+    parser.add_argument("--child", nargs=2, metavar=("URLS", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child, *args.workers)
+    else:
+        main(args.sizes, args.llm_latency, args.ms_per_token, args.article_words, args.http_latency, args.workers)
@@ -0,0 +1,138 @@
+"""
+Benchmark du rendu des pages HTML (renderer.py) : seul le rendu est chronométré.
+
+Une première passe BUILD_GENERATE génère, contre le faux serveur OpenAI,
+l'article et le SEO de chaque page watchbase sauvegardée et les inscrit au
+manifeste du build (dossier temporaire). Les N pages rendues reprennent
+ces sorties enregistrées (page_outputs), comme une passe BUILD_RENDER,
+rendues en chaîne, en flux sur un processus et sur le pool de processus.
+
+Usage : python -m benchmarks.bench_render [--pages N] [--workers W] [--article-words 3200]
+"""
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+
+from openai import OpenAI
+
+import article_generation
+from parsers import parse_watch_page
+from renderer import render_pages, render_watch_page_string
+from benchmarks.make_fixtures import PAGES_DIR
+from benchmarks.fake_openai_server import start_in_thread
+
+# Globales d'article_generation redirigées le temps du benchmark
+PATCHED_GLOBALS = ["client", "LLM_CACHE_PATH", "LEDGER_PATH", "BUILD_MANIFEST_PATH",
+                   "_llm_cache", "_ledger", "_build_manifest"]
+
+
+def load_watches(pages_dir):
+    watches = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            watch_data, _ = parse_watch_page(f.read(), path)
+        watches.append(watch_data)
+    return watches
+
+
+def generate_pass(watches):
+    """
+    Passe BUILD_GENERATE : article et SEO de chaque montre par le modèle,
+    inscrits au manifeste du build.
+    """
+    for watch in watches:
+        article_text = article_generation.generate_article_text(watch, verbose=False)
+        meta_data = article_generation.generate_seo_and_h1(article_text, watch)
+        inputs = article_generation.page_inputs(watch, None, watch.get("description", ""))
+        article_generation.record_page(watch, inputs, article_text, meta_data)
+
+
+def make_jobs(watches, count, output_dir):
+    """
+    Tuples (path, watch, article_text, meta_data, price_stats, description_fr)
+    pour render_pages, article et SEO relus dans le manifeste (passe BUILD_RENDER).
+    """
+    outputs = [article_generation.page_outputs(watch) for watch in watches]
+    jobs = []
+    for i in range(count):
+        watch = watches[i % len(watches)]
+        article_text, meta_data = outputs[i % len(watches)]
+        jobs.append((os.path.join(output_dir, f"page_{i:05d}.html"), watch,
+                     article_text, meta_data, None, watch.get("description", "")))
+    return jobs
+
+
+def build_outputs(watches, build_dir, article_words):
+    """
+    Passe BUILD_GENERATE contre le faux serveur OpenAI, manifeste, journal
+    et cache dans `build_dir` ; retourne les globales d'article_generation
+    à restaurer.
+    """
+    saved = {name: getattr(article_generation, name, None) for name in PATCHED_GLOBALS}
+    server, base_url = start_in_thread(article_words=article_words)
+    try:
+        article_generation.client = OpenAI(base_url=base_url, api_key="fake")
+        article_generation.LLM_CACHE_PATH = None
+        article_generation.LEDGER_PATH = os.path.join(build_dir, article_generation.LEDGER_FILENAME)
+        article_generation.BUILD_MANIFEST_PATH = os.path.join(build_dir, article_generation.BUILD_MANIFEST_FILENAME)
+        article_generation._llm_cache = article_generation._ledger = article_generation._build_manifest = None
+        generate_pass(watches)
+    finally:
+        server.shutdown()
+    return saved
+
+
+def bench(label, run, count):
+    start = time.perf_counter()
+    run()
+    pages_per_sec = count / (time.perf_counter() - start)
+    print(f"  {label:<24} {pages_per_sec:8.1f} pages/s")
+    return pages_per_sec
+
+
+def main(pages_dir=PAGES_DIR, pages=2000, workers=None, article_words=3200):
+    watches = load_watches(pages_dir)
+    if not watches:
+        raise Exception(f"Aucune page .html dans {pages_dir} (lancer python -m benchmarks.make_fixtures)")
+
+    build_dir = tempfile.mkdtemp(prefix="bench_render_build_")
+    output_dir = tempfile.mkdtemp(prefix="bench_render_")
+    saved = None
+    try:
+        saved = build_outputs(watches, build_dir, article_words)
+        jobs = make_jobs(watches, pages, output_dir)
+        workers = workers or os.cpu_count() or 1
+        words = sum(article_generation.count_words(job[2]) for job in jobs) // len(jobs)
+        print(f"{pages} pages ({len(watches)} articles générés, {words} mots en moyenne), {workers} processus")
+        results = {
+            "string": bench("chaîne (en mémoire)", lambda: [render_watch_page_string(*job[1:]) for job in jobs], pages),
+            "stream": bench("fichiers, 1 processus", lambda: render_pages(jobs, workers=1), pages),
+            "pool": bench(f"fichiers, {workers} processus", lambda: render_pages(jobs, workers=workers), pages),
+        }
+        written = len(glob.glob(os.path.join(output_dir, "*.html")))
+        if written != pages:
+            raise Exception(f"{written} page(s) écrite(s) au lieu de {pages}")
+    finally:
+        if saved is not None:
+            for name in ("_ledger", "_build_manifest"):
+                store = getattr(article_generation, name)
+                if store is not None:
+                    store.close()
+            for name, value in saved.items():
+                setattr(article_generation, name, value)
+        shutil.rmtree(build_dir)
+        shutil.rmtree(output_dir)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des pages HTML.")
+    parser.add_argument("--pages-dir", default=PAGES_DIR, help="dossier de pages .html sauvegardées")
+    parser.add_argument("--pages", type=int, default=2000, help="nombre de pages rendues")
+    parser.add_argument("--workers", type=int, help="processus du pool (défaut : nb de CPU)")
+    parser.add_argument("--article-words", type=int, default=3200, help="mots max par réponse du faux modèle")
+    args = parser.parse_args()
+    main(args.pages_dir, args.pages, args.workers, args.article_words)
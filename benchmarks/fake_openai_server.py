@@ -0,0 +1,184 @@
+"""
+Faux serveur compatible OpenAI (POST /v1/chat/completions), déterministe.
+
+Réponses selon le prompt :
+  - prompt SEO ("JSON VALIDE")         -> JSON seo_title / meta_description / h1,
+  - traduction ("Traduis en français") -> texte préfixé "[FR]",
+  - traduction groupée ("Textes :" + JSON) -> même JSON, valeurs préfixées "[FR]",
+  - complétion "rewrite" ("Texte actuel :") -> l'article reçu + `article_words` mots,
+  - sinon (article, continuation)      -> `article_words` mots de nouvelles sections <h2>.
+Comme un vrai modèle, une réponse ne dépasse pas `article_words` mots de
+contenu neuf. `usage` est rempli (≈ 4 caractères par token) et chaque réponse
+attend `latency` secondes + `ms_per_token` par token produit. Avec
+"stream": true, la réponse est envoyée en SSE par fragments de
+STREAM_CHUNK_CHARS caractères, au rythme de `ms_per_token`. Les totaux
+sont cumulés dans server.stats.
+
+Usage : python -m benchmarks.fake_openai_server --port 8000 --latency 2
+        puis OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=fake ...
+"""
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LATENCY = 0.0
+DEFAULT_ARTICLE_WORDS = 3500
+# Taille des fragments en mode streaming (≈ 4 tokens)
+STREAM_CHUNK_CHARS = 16
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def fake_article(words, seed=""):
+    """
+    Article HTML déterministe d'environ `words` mots, découpé en sections <h2>
+    (titres propres à `seed`, pour que des continuations successives diffèrent).
+    """
+    sections = []
+    section_words = 250
+    for i in range(max(1, words // section_words)):
+        paragraph = " ".join(f"mot{(i * section_words + j) % 97}" for j in range(section_words - 4))
+        sections.append(f"<h2>Section {i + 1} {seed}</h2>\n<p>{paragraph}</p>")
+    return "\n".join(sections)
+
+
+def fake_completion(prompt, article_words):
+    seed = format(zlib.crc32(prompt.encode("utf-8")), "08x")
+    if "Texte actuel :" in prompt:
+        current = prompt.split("Texte actuel :", 1)[1].strip()
+        return current + "\n" + fake_article(article_words, seed)
+    if prompt.startswith("Traduis en français") and "Textes :" in prompt:
+        items = json.loads(prompt.split("Textes :", 1)[1])
+        return json.dumps({key: "[FR] " + text for key, text in items.items()}, ensure_ascii=False)
+    if "JSON VALIDE" in prompt:
+        return json.dumps({
+            "seo_title": "Titre SEO de démonstration pour une montre de luxe iconique",
+            "meta_description": "Meta description de démonstration. " * 4,
+            "h1": "Une montre de luxe iconique",
+        }, ensure_ascii=False)
+    if prompt.startswith("Traduis en français"):
+        return "[FR] " + prompt.split(":", 1)[-1].strip()
+    return fake_article(article_words, seed)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    # Paramètres injectés par make_server
+    latency = DEFAULT_LATENCY
+    ms_per_token = 0.0
+    article_words = DEFAULT_ARTICLE_WORDS
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+        content = fake_completion(prompt, self.article_words)
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.server.record(usage)
+        if payload.get("stream"):
+            self.send_stream(payload, content, usage)
+            return
+        time.sleep(self.latency + self.ms_per_token * usage["completion_tokens"] / 1000)
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, payload, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        time.sleep(self.latency)
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            piece = content[i:i + STREAM_CHUNK_CHARS]
+            time.sleep(self.ms_per_token * estimate_tokens(piece) / 1000)
+            self.send_chunk(payload, [{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        # Dernier fragment : l'usage, sans choices (stream_options.include_usage)
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            self.send_chunk(payload, [], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def send_chunk(self, payload, choices, usage=None):
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": choices,
+            "usage": usage,
+        }
+        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, usage):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+
+
+def make_server(port=0, latency=DEFAULT_LATENCY, article_words=DEFAULT_ARTICLE_WORDS, ms_per_token=0.0):
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,),
+                   {"latency": latency, "article_words": article_words, "ms_per_token": ms_per_token})
+    return FakeOpenAIServer(("127.0.0.1", port), handler)
+
+
+def start_in_thread(port=0, latency=DEFAULT_LATENCY, article_words=DEFAULT_ARTICLE_WORDS, ms_per_token=0.0):
+    """
+    Démarre le serveur en tâche de fond ; retourne (server, base_url).
+    Arrêt : server.shutdown().
+    """
+    server = make_server(port, latency, article_words, ms_per_token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur OpenAI pour tests et benchmarks.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="secondes par réponse")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="latence supplémentaire par token produit")
+    parser.add_argument("--article-words", type=int, default=DEFAULT_ARTICLE_WORDS, help="mots neufs par réponse")
+    args = parser.parse_args()
+    server = make_server(args.port, args.latency, args.article_words, args.ms_per_token)
+    print(f"Faux serveur OpenAI sur http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,174 @@
+"""
+Faux serveur watchbase, hors ligne, à partir des fixtures (pages + JSON des prix).
+
+Sert un catalogue synthétique d'autant de montres que voulu :
+  - GET /watch/<i>   -> page de la fixture i % nb de fixtures ; au-delà de la
+                        première passe, nom et référence suffixés par le numéro
+                        (une page et un fichier de sortie distincts par montre),
+  - GET /prices/<i>  -> JSON Chart.js de la fixture, prix décalés selon i,
+  - GET /images/<f>  -> image déterministe (IMAGE_BYTES octets) propre à f.
+Les URLs de prix et d'image des pages pointent vers le serveur. Chaque
+réponse attend `latency` secondes ; les totaux sont cumulés dans server.stats.
+
+Usage : python -m benchmarks.fake_watchbase_server --port 8001 --latency 0.05
+        puis python pipeline.py $(python -m benchmarks.fake_watchbase_server --urls 100)
+"""
+import os
+import re
+import glob
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.make_fixtures import PAGES_DIR, PRICES_BASE_URL, PRICES_DIR
+
+DEFAULT_LATENCY = 0.0
+# Taille des images servies (ordre de grandeur d'une image watchbase « lg »)
+IMAGE_BYTES = 64 * 1024
+
+IMAGE_URL_PATTERN = re.compile(r'(<div class="watch-main-image"><img src=")[^"]*(")')
+FIELD_PATTERN = "(<th>{label}</th>\\s*<td>)([^<]*)(</td>)"
+
+
+def load_fixtures(pages_dir=PAGES_DIR, prices_dir=PRICES_DIR):
+    """
+    [(slug, html, prix JSON)] des fixtures, dans l'ordre des noms de fichiers.
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        slug = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        with open(os.path.join(prices_dir, f"{slug}.json"), "r", encoding="utf-8") as f:
+            prices = json.load(f)
+        fixtures.append((slug, html, prices))
+    if not fixtures:
+        raise Exception(f"Aucune fixture dans {pages_dir} (lancer python -m benchmarks.make_fixtures)")
+    return fixtures
+
+
+def _suffix_field(html, label, suffix):
+    return re.sub(FIELD_PATTERN.format(label=label), lambda m: f"{m.group(1)}{m.group(2)}{suffix}{m.group(3)}",
+                  html, count=1)
+
+
+def catalog_page(fixtures, i, base_url):
+    """
+    HTML de la montre n° i du catalogue synthétique.
+    """
+    slug, html, _ = fixtures[i % len(fixtures)]
+    if i >= len(fixtures):
+        html = _suffix_field(html, "Reference:", f"-{i}")
+        html = _suffix_field(html, "Name:", f" N{i}")
+    html = html.replace(f"{PRICES_BASE_URL}/{slug}", f"{base_url}/prices/{i}")
+    return IMAGE_URL_PATTERN.sub(lambda m: f"{m.group(1)}{base_url}/images/{slug}-{i}.png{m.group(2)}", html, count=1)
+
+
+def catalog_prices(fixtures, i):
+    """
+    Historique des prix de la montre n° i : celui de la fixture, décalé de i %.
+    """
+    prices = json.loads(json.dumps(fixtures[i % len(fixtures)][2]))
+    for dataset in prices.get("datasets", []):
+        dataset["data"] = [value if value is None else str(round(float(value) * (1 + (i % 100) / 100)))
+                           for value in dataset["data"]]
+    return prices
+
+
+def fake_image(name):
+    seed = zlib.crc32(name.encode("utf-8")).to_bytes(4, "big")
+    return (seed * (IMAGE_BYTES // 4 + 1))[:IMAGE_BYTES]
+
+
+class FakeWatchbaseHandler(BaseHTTPRequestHandler):
+    # Paramètres injectés par make_server
+    latency = DEFAULT_LATENCY
+    fixtures = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        base_url = f"http://{self.headers.get('Host')}"
+        try:
+            if len(parts) == 2 and parts[0] == "watch":
+                body = catalog_page(self.fixtures, int(parts[1]), base_url).encode("utf-8")
+                content_type = "text/html; charset=utf-8"
+            elif len(parts) == 2 and parts[0] == "prices":
+                body = json.dumps(catalog_prices(self.fixtures, int(parts[1]))).encode("utf-8")
+                content_type = "application/json"
+            elif len(parts) == 2 and parts[0] == "images":
+                body = fake_image(parts[1])
+                content_type = "image/png"
+            else:
+                self.send_error(404)
+                return
+        except ValueError:
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        self.server.record(parts[0], len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeWatchbaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"watch": 0, "prices": 0, "images": 0, "bytes": 0}
+
+    def record(self, kind, size):
+        with self._stats_lock:
+            self.stats[kind] += 1
+            self.stats["bytes"] += size
+
+
+def catalog_urls(base_url, count):
+    """
+    URLs des `count` premières montres du catalogue synthétique.
+    """
+    return [f"{base_url}/watch/{i}" for i in range(count)]
+
+
+def make_server(port=0, latency=DEFAULT_LATENCY, pages_dir=PAGES_DIR, prices_dir=PRICES_DIR):
+    handler = type("ConfiguredFakeWatchbaseHandler", (FakeWatchbaseHandler,),
+                   {"latency": latency, "fixtures": load_fixtures(pages_dir, prices_dir)})
+    return FakeWatchbaseServer(("127.0.0.1", port), handler)
+
+
+def start_in_thread(port=0, latency=DEFAULT_LATENCY):
+    """
+    Démarre le serveur en tâche de fond ; retourne (server, base_url).
+    Arrêt : server.shutdown().
+    """
+    server = make_server(port, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur watchbase pour tests et benchmarks.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="secondes par réponse")
+    parser.add_argument("--urls", type=int, metavar="N", help="afficher les URLs des N premières montres et quitter")
+    args = parser.parse_args()
+    base_url = f"http://127.0.0.1:{args.port}"
+    if args.urls:
+        print("\n".join(catalog_urls(base_url, args.urls)))
+    else:
+        server = make_server(args.port, args.latency)
+        print(f"Faux serveur watchbase sur {base_url} ({len(server.RequestHandlerClass.fixtures)} fixtures)")
+        server.serve_forever()
@@ -0,0 +1,136 @@
+"""
+Reconstruit des pages watchbase hors ligne à partir de all_watches.json.
+
+Faute d'accès réseau dans l'environnement de bench, les pages sont
+reconstituées avec le balisage que parse_watch attend (tables .info-table,
+div.watch-description, div.watch-main-image, canvas#pricechart), entourées
+d'un en-tête, d'une navigation et de listes de liens pour approcher le poids
+d'une vraie page. Le JSON des prix est recopié tel quel.
+
+Usage : python -m benchmarks.make_fixtures
+"""
+import os
+import json
+import html
+
+from scraper import WATCH_URLS
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmarks", "fixtures")
+PAGES_DIR = os.path.join(FIXTURES_DIR, "pages")
+PRICES_DIR = os.path.join(FIXTURES_DIR, "prices")
+
+# Host des URLs de prix dans les pages reconstruites (remplacé par le faux serveur)
+PRICES_BASE_URL = "https://watchbase.com/watch/prices"
+
+CASE_LABELS = {
+    "material": "Material:",
+    "glass": "Glass:",
+    "back": "Back:",
+    "diameter": "Diameter:",
+    "height": "Height:",
+    "lug_width": "Lug Width:",
+}
+DIAL_LABELS = {"color": "Color:", "indexes": "Indexes:"}
+
+
+def fixture_slug(url):
+    """
+    'https://watchbase.com/rolex/day-date/128348rbr-0026' -> 'rolex_day-date_128348rbr-0026'
+    """
+    return "_".join(url.rstrip("/").split("/")[-3:])
+
+
+def _row(label, value_html):
+    return f"<tr>\n  <th>{label}</th>\n  <td>{value_html}</td>\n</tr>\n"
+
+
+def render_fixture_page(watch, slug, watches):
+    e = html.escape
+    general_rows = "".join([
+        _row("Brand:", f'<a href="/{slug.split("_")[0]}">{e(watch["brand"])}</a>'),
+        _row("Family:", f'<a href="/{"/".join(slug.split("_")[:2])}">{e(watch["family"])}</a>'),
+        _row("Reference:", e(watch["reference"])),
+        _row("Name:", e(watch["name"])),
+        _row("Movement:", f'<a href="/caliber/x">{e(watch["movement"]["caliber"])}</a>'
+                          f'\n    <div class="small">{e(watch["movement"]["details"])}</div>'),
+        _row("Produced:", e(watch["produced"])),
+        _row("Limited:", e(watch["limited"])),
+    ])
+    case_rows = "".join(_row(CASE_LABELS[k], e(v)) for k, v in watch["case"].items())
+    dial_rows = "".join(_row(DIAL_LABELS[k], e(v)) for k, v in watch["dial"].items())
+
+    # Navigation et modèles « similaires » pour donner du volume à la page
+    nav_links = "".join(
+        f'<li class="nav-item"><a class="nav-link" href="/brand-{i}">Brand {i}</a></li>\n' for i in range(150)
+    )
+    related = "".join(
+        f'<div class="col-md-3 watch-block"><a href="/related/{i}">'
+        f'<img src="https://cdn.watchbase.com/watch/md/related-{i}.jpg" alt="{e(w["name"])}"/>'
+        f'<span class="ref">{e(w["reference"])}</span><span>{e(w["name"])}</span></a></div>\n'
+        for i, w in enumerate(watches * 8)
+    )
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8"/>
+<title>{e(watch["brand"])} {e(watch["family"])} {e(watch["reference"])} | WatchBase</title>
+<meta name="description" content="{e(watch["description"][:150])}"/>
+<style>.info-table th {{ width: 35%; }} .watch-block {{ margin-bottom: 1em; }}</style>
+<script>window.dataLayer = window.dataLayer || []; function gtag(){{dataLayer.push(arguments);}}</script>
+</head>
+<body>
+<nav class="navbar"><ul class="navbar-nav">
+{nav_links}</ul></nav>
+<div class="container">
+<ol class="breadcrumb"><li><a href="/">Home</a></li><li>{e(watch["brand"])}</li><li>{e(watch["family"])}</li></ol>
+<div class="row">
+<div class="col-md-6">
+<div class="watch-main-image"><img src="{e(watch["image_url"])}" alt="{e(watch["name"])}"/></div>
+</div>
+<div class="col-md-6">
+<table class="info-table">
+{general_rows}</table>
+<h2>Case</h2>
+<table class="info-table">
+{case_rows}</table>
+<h2>Dial</h2>
+<table class="info-table">
+{dial_rows}</table>
+</div>
+</div>
+<div class="watch-description">
+<h2>Description</h2>
+<p>{e(watch["description"])}</p>
+</div>
+<h2>Price history</h2>
+<canvas id="pricechart" data-url="{PRICES_BASE_URL}/{slug}" width="600" height="300"></canvas>
+<h2>Related watches</h2>
+<div class="row">
+{related}</div>
+</div>
+<footer><p>&copy; WatchBase</p><!-- fixture reconstruite --></footer>
+<script>var chart = null; /* Chart.js */</script>
+</body>
+</html>
+"""
+
+
+def main():
+    with open(os.path.join(REPO_DIR, "all_watches.json"), "r", encoding="utf-8") as f:
+        watches = json.load(f)["watches"]
+
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    os.makedirs(PRICES_DIR, exist_ok=True)
+    for url, watch in zip(WATCH_URLS, watches):
+        slug = fixture_slug(url)
+        with open(os.path.join(PAGES_DIR, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(render_fixture_page(watch, slug, watches))
+        with open(os.path.join(PRICES_DIR, f"{slug}.json"), "w", encoding="utf-8") as f:
+            json.dump(watch["prices"], f, ensure_ascii=False)
+        print(f"Fixture écrite : {slug}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Lance toute la suite de benchmarks hors ligne et enregistre les résultats en JSON.
+
+  - parsing : pages/s par backend (bench_parser),
+  - rendu : pages/s en chaîne, en flux et sur le pool (bench_render),
+  - pipeline : durée de bout en bout par taille de catalogue (bench_pipeline).
+Les résultats (avec le commit git, la version de Python et la machine) sont
+écrits dans benchmarks/results/<date>.json ; --compare affiche l'écart de
+chaque mesure avec un fichier de résultats précédent.
+
+Usage : python -m benchmarks.run_benchmarks [--quick] [--sizes 10,100,1000,10000,100000]
+                                            [--compare benchmarks/results/<date>.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+from benchmarks import bench_parser, bench_pipeline, bench_render
+from benchmarks.make_fixtures import REPO_DIR
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+SUITES = ["parser", "render", "pipeline"]
+
+# Tailles réduites pour une vérification rapide (--quick)
+QUICK = {"parser_repeat": 5, "render_pages": 200, "sizes": [10, 100]}
+FULL = {"parser_repeat": 20, "render_pages": 2000, "sizes": bench_pipeline.DEFAULT_SIZES}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(results, prefix=""):
+    """
+    {"a": {"b": 1.0}} -> {"a.b": 1.0}, mesures numériques seulement.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous_path, benchmarks):
+    """
+    Affiche, pour chaque mesure commune, l'ancienne valeur, la nouvelle et leur rapport.
+    """
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old, new = flatten(previous["benchmarks"]), flatten(benchmarks)
+    print(f"\nComparaison avec {previous_path} (commit {previous['environment'].get('git_commit') or '?'}) :")
+    for name in sorted(old.keys() & new.keys()):
+        ratio = f"x{new[name] / old[name]:.2f}" if old[name] else "-"
+        print(f"  {name:<60} {old[name]:>12.3f} -> {new[name]:>12.3f}  {ratio}")
+
+
+def main(suites=SUITES, quick=False, sizes=None, output=None, previous=None, **pipeline_options):
+    settings = QUICK if quick else FULL
+    benchmarks = {}
+    if "parser" in suites:
+        print("== Parsing ==")
+        benchmarks["parser"] = {"pages_per_sec": bench_parser.main(repeat=settings["parser_repeat"])}
+    if "render" in suites:
+        print("\n== Rendu ==")
+        benchmarks["render"] = {"pages_per_sec": bench_render.main(pages=settings["render_pages"])}
+    if "pipeline" in suites:
+        print("\n== Pipeline ==")
+        benchmarks["pipeline"] = bench_pipeline.main(sizes or settings["sizes"], **pipeline_options)
+
+    report = {"environment": environment(), "quick": quick, "benchmarks": benchmarks}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nRésultats écrits dans {output}")
+
+    if previous:
+        compare(previous, benchmarks)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks hors ligne (parsing, rendu, pipeline).")
+    parser.add_argument("--suites", type=lambda text: text.split(","), default=SUITES,
+                        help=f"benchmarks à lancer, séparés par des virgules ({','.join(SUITES)})")
+    parser.add_argument("--quick", action="store_true", help="tailles réduites (vérification rapide)")
+    parser.add_argument("--sizes", type=bench_pipeline.parse_sizes,
+                        help="tailles de catalogue du pipeline (ex. 10,100,1000,10000,100000)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="secondes par réponse du faux modèle")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="latence du faux modèle par token produit")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="secondes par réponse watchbase")
+    parser.add_argument("--output", help="fichier de résultats (défaut : benchmarks/results/<date>.json)")
+    parser.add_argument("--compare", help="résultats précédents à comparer")
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        sys.exit(f"Benchmark(s) inconnu(s) : {', '.join(sorted(unknown))}")
+    main(args.suites, args.quick, args.sizes, args.output, args.compare, llm_latency=args.llm_latency,
+         ms_per_token=args.ms_per_token, http_latency=args.http_latency)
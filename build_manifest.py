@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+# Manifeste de construction du site (à côté de all_watches.json)
+BUILD_MANIFEST_FILENAME = "build_manifest.sqlite"
+
+# Entrées de l'étape LLM (article + SEO) et de l'étape de rendu
+LLM_INPUTS = ("watch", "prompts", "model")
+RENDER_INPUTS = ("template", "render")
+
+# Actions possibles pour une page
+BUILD_SKIP = "skip"          # page à jour
+BUILD_RENDER = "render"      # rendu seul, à partir des sorties du modèle enregistrées
+BUILD_GENERATE = "generate"  # appels au modèle puis rendu
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    inputs_json TEXT NOT NULL,
+    article_text TEXT NOT NULL,
+    meta_json TEXT NOT NULL,
+    built_at REAL NOT NULL
+);
+-- Clés des montres vues pendant ce run (propre à la connexion), pour le ramasse-miettes
+CREATE TEMP TABLE IF NOT EXISTS live_keys (
+    key TEXT PRIMARY KEY
+);
+"""
+
+
+class BuildManifest:
+    """
+    Manifeste des pages générées : pour chaque montre (clé catalog_key),
+    le fichier produit, les empreintes des entrées qui l'ont produit
+    (fiche, prompts, modèle, gabarit HTML, données du rendu) et les sorties
+    du modèle (article, SEO). Un build ne relance que les étapes dont les
+    entrées ont changé, et supprime les pages des montres disparues.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _get(self, key):
+        with self._lock:
+            return self.conn.execute("SELECT path, inputs_json, article_text, meta_json FROM pages WHERE key = ?",
+                                     (key,)).fetchone()
+
+    def plan(self, key, path, inputs):
+        """
+        Action nécessaire pour que la page `path` corresponde à `inputs` :
+        BUILD_GENERATE si une entrée de l'étape LLM a changé (ou page inconnue),
+        BUILD_RENDER si seules les entrées du rendu ont changé ou si le fichier
+        manque, BUILD_SKIP sinon.
+        """
+        row = self._get(key)
+        if row is None:
+            return BUILD_GENERATE
+        previous = json.loads(row[1])
+        if any(previous.get(name) != inputs.get(name) for name in LLM_INPUTS):
+            return BUILD_GENERATE
+        if row[0] != path or not os.path.exists(path):
+            return BUILD_RENDER
+        if any(previous.get(name) != inputs.get(name) for name in RENDER_INPUTS):
+            return BUILD_RENDER
+        return BUILD_SKIP
+
+    def outputs(self, key):
+        """
+        (article_text, meta_data) enregistrés pour cette page.
+        """
+        row = self._get(key)
+        if row is None:
+            raise Exception(f"Aucune page enregistrée dans le manifeste pour {key}")
+        return row[2], json.loads(row[3])
+
+    def record(self, key, path, inputs, article_text, meta_data, commit=True):
+        """
+        Enregistre une page construite. Si la page a changé de fichier
+        (marque ou nom modifiés), l'ancien fichier est supprimé.
+        `commit=False` : à valider plus tard avec commit() (rendu par lots).
+        """
+        row = self._get(key)
+        if row is not None and row[0] != path and os.path.exists(row[0]):
+            os.remove(row[0])
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (key, path, inputs_json, article_text, meta_json, built_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, path, json.dumps(inputs, sort_keys=True), article_text,
+                 json.dumps(meta_data, ensure_ascii=False), time.time())
+            )
+            if commit:
+                self.conn.commit()
+
+    def iter_pages(self):
+        """
+        (clé, fichier, meta_data) de toutes les pages enregistrées.
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT key, path, meta_json FROM pages ORDER BY key").fetchall()
+        for key, path, meta_json in rows:
+            yield key, path, json.loads(meta_json)
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def remove(self, keys):
+        """
+        Supprime les pages (fichier et entrée) des montres données.
+        Retourne le nombre de pages supprimées.
+        """
+        removed = 0
+        with self._lock:
+            with self.conn:
+                for key in keys:
+                    row = self.conn.execute("SELECT path FROM pages WHERE key = ?", (key,)).fetchone()
+                    if row is None:
+                        continue
+                    if os.path.exists(row[0]):
+                        os.remove(row[0])
+                    self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                    removed += 1
+        return removed
+
+    def mark_live(self, key):
+        """
+        Note qu'une montre du catalogue a été vue pendant ce run (sans
+        validation : écrit avec le prochain commit, en table temporaire).
+        """
+        with self._lock:
+            self.conn.execute("INSERT OR IGNORE INTO live_keys (key) VALUES (?)", (key,))
+
+    def collect_garbage(self, live_keys=None):
+        """
+        Supprime les pages des montres absentes de `live_keys` (catalogue
+        complet, parcouru en flux) ou, à défaut, de celles notées par
+        mark_live() : la jointure se fait dans SQLite, sans ensemble de clés
+        en mémoire.
+        """
+        with self._lock:
+            with self.conn:
+                if live_keys is not None:
+                    self.conn.execute("DELETE FROM live_keys")
+                    self.conn.executemany("INSERT OR IGNORE INTO live_keys (key) VALUES (?)",
+                                          ((key,) for key in live_keys))
+                doomed = [row[0] for row in self.conn.execute(
+                    "SELECT key FROM pages WHERE key NOT IN (SELECT key FROM live_keys)")]
+                # Marques valables pour un seul ramasse-miettes
+                self.conn.execute("DELETE FROM live_keys")
+        return self.remove(doomed)
+
+    def stats(self):
+        with self._lock:
+            return {"pages": self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]}
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspection du manifeste de construction des pages.")
+    parser.add_argument("path", nargs="?", default=BUILD_MANIFEST_FILENAME)
+    parser.add_argument("--forget", nargs="+", metavar="KEY",
+                        help="supprimer ces pages (fichier et entrée) : elles seront régénérées")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        raise SystemExit(f"Manifeste introuvable : {args.path}")
+    manifest = BuildManifest(args.path)
+    if args.forget:
+        print(f"{manifest.remove(args.forget)} page(s) supprimée(s)")
+    print(f"{manifest.stats()['pages']} page(s) dans le manifeste")
+    manifest.close()
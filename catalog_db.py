@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import datetime
+
+from fingerprints import hash_record
+from price_store import catalog_key, extract_series
+
+# Catalogue SQLite (à côté de all_watches.json)
+CATALOG_DB_FILENAME = "catalog.sqlite"
+
+# Colonnes des tables filles, dans l'ordre des clés des fiches JSON
+CASE_COLUMNS = ["material", "glass", "back", "diameter", "height", "lug_width"]
+DIAL_COLUMNS = ["color", "indexes"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    brand TEXT,
+    family TEXT,
+    reference TEXT,
+    name TEXT,
+    produced TEXT,
+    limited TEXT,
+    description TEXT,
+    image_url TEXT,
+    local_image_path TEXT,
+    prices_json TEXT,
+    record_hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    generated_hash TEXT,
+    generated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS watches_brand ON watches (brand);
+CREATE INDEX IF NOT EXISTS watches_family ON watches (brand, family);
+CREATE INDEX IF NOT EXISTS watches_reference ON watches (reference);
+CREATE INDEX IF NOT EXISTS watches_updated_at ON watches (updated_at);
+
+CREATE TABLE IF NOT EXISTS movements (
+    watch_id INTEGER PRIMARY KEY REFERENCES watches (id) ON DELETE CASCADE,
+    caliber TEXT,
+    details TEXT
+);
+CREATE TABLE IF NOT EXISTS cases (
+    watch_id INTEGER PRIMARY KEY REFERENCES watches (id) ON DELETE CASCADE,
+    material TEXT, glass TEXT, back TEXT, diameter TEXT, height TEXT, lug_width TEXT
+);
+CREATE TABLE IF NOT EXISTS dials (
+    watch_id INTEGER PRIMARY KEY REFERENCES watches (id) ON DELETE CASCADE,
+    color TEXT,
+    indexes TEXT
+);
+CREATE TABLE IF NOT EXISTS prices (
+    watch_id INTEGER NOT NULL REFERENCES watches (id) ON DELETE CASCADE,
+    label TEXT,
+    date TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prices_watch ON prices (watch_id, date);
+"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class CatalogDB:
+    """
+    Catalogue des montres en SQLite : une ligne par montre (clé = URL source),
+    tables movements / cases / dials / prices, index sur marque, famille,
+    référence et date de mise à jour. Le générateur n'en lit que les lignes
+    dont il a besoin, en streaming.
+    """
+
+    def __init__(self, path, check_same_thread=True):
+        self.path = path
+        # check_same_thread=False : connexion partagée entre threads, appels sérialisés par l'appelant
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=check_same_thread)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    # ----------------------------------------------------------------------
+    # Écriture (scraper)
+    # ----------------------------------------------------------------------
+    def upsert_watch(self, watch):
+        """
+        Insère ou met à jour une fiche. `updated_at` ne bouge que si le
+        contenu de la fiche a changé. Retourne l'id de la montre.
+        """
+        url = catalog_key(watch)
+        record_hash = hash_record(watch)
+        row = self.conn.execute("SELECT id, record_hash FROM watches WHERE url = ?", (url,)).fetchone()
+        if row and row["record_hash"] == record_hash:
+            # Seul le chemin local de l'image peut différer (non pris en compte dans le hash)
+            self.conn.execute("UPDATE watches SET local_image_path = ? WHERE id = ?",
+                              (watch.get("local_image_path", ""), row["id"]))
+            self.conn.commit()
+            return row["id"]
+
+        values = (
+            watch.get("brand", ""), watch.get("family", ""), watch.get("reference", ""),
+            watch.get("name", ""), watch.get("produced", ""), watch.get("limited", ""),
+            watch.get("description", ""), watch.get("image_url", ""), watch.get("local_image_path", ""),
+            json.dumps(watch.get("prices", []), ensure_ascii=False), record_hash, _now(),
+        )
+        with self.conn:
+            if row:
+                watch_id = row["id"]
+                self.conn.execute("""
+                    UPDATE watches SET brand = ?, family = ?, reference = ?, name = ?, produced = ?,
+                        limited = ?, description = ?, image_url = ?, local_image_path = ?,
+                        prices_json = ?, record_hash = ?, updated_at = ?
+                    WHERE id = ?
+                """, values + (watch_id,))
+                for table in ("movements", "cases", "dials", "prices"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE watch_id = ?", (watch_id,))
+            else:
+                watch_id = self.conn.execute("""
+                    INSERT INTO watches (brand, family, reference, name, produced, limited, description,
+                        image_url, local_image_path, prices_json, record_hash, updated_at, url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, values + (url,)).lastrowid
+
+            movement = watch.get("movement", {})
+            self.conn.execute("INSERT INTO movements (watch_id, caliber, details) VALUES (?, ?, ?)",
+                              (watch_id, movement.get("caliber", ""), movement.get("details", "")))
+            case_info = watch.get("case", {})
+            self.conn.execute(f"INSERT INTO cases (watch_id, {', '.join(CASE_COLUMNS)}) VALUES (?{', ?' * len(CASE_COLUMNS)})",
+                              (watch_id, *(case_info.get(column) for column in CASE_COLUMNS)))
+            dial_info = watch.get("dial", {})
+            self.conn.execute(f"INSERT INTO dials (watch_id, {', '.join(DIAL_COLUMNS)}) VALUES (?{', ?' * len(DIAL_COLUMNS)})",
+                              (watch_id, *(dial_info.get(column) for column in DIAL_COLUMNS)))
+            dates, values_, label = extract_series(watch.get("prices"))
+            self.conn.executemany("INSERT INTO prices (watch_id, label, date, price) VALUES (?, ?, ?, ?)",
+                                  [(watch_id, label, str(date), float(price)) for date, price in zip(dates, values_)])
+        return watch_id
+
+    def delete_watches(self, urls):
+        """
+        Supprime les montres données (et, en cascade, leurs lignes filles).
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM watches WHERE url = ?", [(url,) for url in urls])
+
+    def mark_generated(self, watch):
+        """
+        Note que la page de cette version de la fiche a été générée.
+        """
+        with self.conn:
+            self.conn.execute("UPDATE watches SET generated_hash = record_hash, generated_at = ? WHERE url = ?",
+                              (_now(), catalog_key(watch)))
+
+    # ----------------------------------------------------------------------
+    # Lecture (générateur)
+    # ----------------------------------------------------------------------
+    def iter_watches(self, brand=None, family=None, reference=None, changed_since=None, pending=False):
+        """
+        Parcourt les fiches (au format JSON historique) une par une, filtrées par
+        marque, famille, référence, date de modification (ISO, ex. "2025-01-31")
+        ou « à générer » (jamais générée ou modifiée depuis la dernière génération).
+        """
+        clauses, params = [], []
+        if brand:
+            clauses.append("w.brand = ?")
+            params.append(brand)
+        if family:
+            clauses.append("w.family = ?")
+            params.append(family)
+        if reference:
+            clauses.append("w.reference = ?")
+            params.append(reference)
+        if changed_since:
+            clauses.append("w.updated_at >= ?")
+            params.append(changed_since)
+        if pending:
+            clauses.append("(w.generated_hash IS NULL OR w.generated_hash != w.record_hash)")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        cursor = self.conn.execute(f"""
+            SELECT w.*, m.caliber, m.details,
+                   {', '.join(f'c.{column} AS case_{column}' for column in CASE_COLUMNS)},
+                   {', '.join(f'd.{column} AS dial_{column}' for column in DIAL_COLUMNS)}
+            FROM watches w
+            LEFT JOIN movements m ON m.watch_id = w.id
+            LEFT JOIN cases c ON c.watch_id = w.id
+            LEFT JOIN dials d ON d.watch_id = w.id
+            {where}
+            ORDER BY w.id
+        """, params)
+        for row in cursor:
+            yield self._row_to_watch(row)
+
+    def urls(self):
+        """
+        Ensemble des clés (URL source) de toutes les montres du catalogue.
+        """
+        return {row["url"] for row in self.conn.execute("SELECT url FROM watches")}
+
+    def iter_urls(self):
+        """
+        Clés (URL source) des montres du catalogue, lues au fil de l'eau.
+        """
+        for row in self.conn.execute("SELECT url FROM watches"):
+            yield row["url"]
+
+    @staticmethod
+    def _row_to_watch(row):
+        watch = {
+            "brand": row["brand"],
+            "family": row["family"],
+            "reference": row["reference"],
+            "name": row["name"],
+            "movement": {"caliber": row["caliber"] or "", "details": row["details"] or ""},
+            "produced": row["produced"],
+            "limited": row["limited"],
+            "case": {c: row[f"case_{c}"] for c in CASE_COLUMNS if row[f"case_{c}"] is not None},
+            "dial": {c: row[f"dial_{c}"] for c in DIAL_COLUMNS if row[f"dial_{c}"] is not None},
+            "description": row["description"],
+            "image_url": row["image_url"],
+            "prices": json.loads(row["prices_json"]) if row["prices_json"] else [],
+        }
+        # Les anciens exports sans URL sont indexés par "marque|référence"
+        if "://" in row["url"]:
+            watch["url"] = row["url"]
+        watch["local_image_path"] = row["local_image_path"]
+        return watch
+
+    def close(self):
+        self.conn.close()
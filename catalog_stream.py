@@ -0,0 +1,189 @@
+import re
+import json
+import argparse
+
+from jsonl_store import iter_jsonl
+
+# Caractères lus à la fois dans le fichier JSON (une fiche plus longue est
+# simplement lue en plusieurs blocs)
+READ_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Fin de bloc qui peut encore appartenir au nombre décodé ("12345.", "2.5e")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+
+class _JSONStreamReader:
+    """
+    Lecture d'un document JSON valeur par valeur, par blocs de `chunk_size`
+    caractères : seuls le bloc courant et la valeur en cours de décodage
+    sont en mémoire.
+    """
+
+    def __init__(self, f, path, chunk_size=READ_CHUNK_SIZE):
+        self.f = f
+        self.path = path
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # La partie déjà décodée du bloc précédent est libérée
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Prochain caractère significatif (espaces sautés), "" en fin de fichier.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise Exception(f"JSON invalide dans {self.path} : « {char} » attendu, "
+                            f"« {found or 'fin du fichier'} » trouvé")
+        self.pos += 1
+
+    def decode(self):
+        """
+        Décode la valeur suivante (complétée bloc par bloc si besoin).
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre en fin de bloc peut continuer dans le bloc suivant : tant
+            # qu'aucun délimiteur ne le suit, le décodage reprend sur un bloc de plus
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if is_number and not self.eof and _NUMBER_TAIL.match(self.buffer, end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(json_path, key="watches", chunk_size=READ_CHUNK_SIZE):
+    """
+    Parcourt un à un les éléments du tableau `key` de l'objet JSON racine
+    ({ "watches": [ {...}, {...}, ... ] }), sans charger le fichier : la
+    mémoire reste celle d'une fiche et d'un bloc de lecture. Les autres clés
+    de l'objet racine sont lues puis ignorées.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        reader = _JSONStreamReader(f, json_path, chunk_size)
+        reader.expect("{")
+        if reader.peek() != "}":
+            while True:
+                name = reader.decode()
+                reader.expect(":")
+                if name == key:
+                    reader.expect("[")
+                    if reader.peek() == "]":
+                        return
+                    while True:
+                        yield reader.decode()
+                        if reader.peek() == "]":
+                            return
+                        reader.expect(",")
+                reader.decode()
+                if reader.peek() == "}":
+                    break
+                reader.expect(",")
+        raise Exception(f"Clé \"{key}\" absente de {json_path}")
+
+
+def iter_catalog(path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Fiches du catalogue une par une : JSONL (une fiche par ligne) si `path`
+    finit par .jsonl, sinon JSON { "watches": [...] } lu en flux.
+    """
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    return iter_json_array(path, chunk_size=chunk_size)
+
+
+def filter_watches(watches, brand=None, family=None, reference=None):
+    """
+    Ne garde que les fiches de cette marque, famille et/ou référence
+    (égalité exacte, comme CatalogDB.iter_watches).
+    """
+    for watch in watches:
+        if brand and watch.get("brand") != brand:
+            continue
+        if family and watch.get("family") != family:
+            continue
+        if reference and watch.get("reference") != reference:
+            continue
+        yield watch
+
+
+def shard_watches(watches, shard):
+    """
+    shard = (index, nombre) : ne garde que les fiches de rang ≡ index modulo
+    nombre dans `watches`. Les `nombre` shards d'une même sélection se
+    partagent toutes ses fiches, chacune dans un seul shard.
+    """
+    if shard is None:
+        yield from watches
+        return
+    index, count = shard
+    for position, watch in enumerate(watches):
+        if position % count == index:
+            yield watch
+
+
+def iter_watches(path, brand=None, family=None, reference=None, shard=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Fiches du catalogue `path` (JSON ou JSONL), filtrées puis réparties en
+    shards, lues au fil de l'eau : mémoire constante quelle que soit la
+    taille du catalogue.
+    """
+    watches = filter_watches(iter_catalog(path, chunk_size), brand, family, reference)
+    return shard_watches(watches, shard)
+
+
+def parse_shard(text):
+    """
+    "K/N" -> (K, N), 0 <= K < N (type argparse de --shard).
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard invalide : {text} (attendu K/N, ex. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard invalide : {text} (0 <= K < N)")
+    return index, count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parcours en flux d'un catalogue all_watches.json / .jsonl.")
+    parser.add_argument("path")
+    parser.add_argument("--brand")
+    parser.add_argument("--family")
+    parser.add_argument("--reference")
+    parser.add_argument("--shard", type=parse_shard, metavar="K/N")
+    parser.add_argument("--urls", action="store_true", help="afficher l'URL de chaque fiche")
+    args = parser.parse_args()
+
+    count = 0
+    for watch in iter_watches(args.path, args.brand, args.family, args.reference, args.shard):
+        count += 1
+        if args.urls:
+            print(watch.get("url", ""))
+    print(f"{count} fiche(s)")
@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import datetime
+
+# Champs ignorés dans l'empreinte d'une fiche (chemins locaux, dépendants de la machine)
+VOLATILE_RECORD_KEYS = ("local_image_path",)
+
+
+def hash_bytes(data):
+    """
+    Empreinte SHA-256 (hex) d'un contenu texte ou binaire.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_record(watch_data):
+    """
+    Empreinte d'une fiche montre parsée : JSON canonique (clés triées),
+    sans les champs volatils.
+    """
+    stable = {k: v for k, v in watch_data.items() if k not in VOLATILE_RECORD_KEYS}
+    return hash_bytes(json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+
+
+def new_changeset():
+    return {"added": [], "changed": [], "removed": [], "unchanged": []}
+
+
+class FingerprintStore:
+    """
+    Empreintes persistantes par URL de montre :
+      { url: {"page": h, "prices": h, "image": h, "record": h,
+              "price_url": ..., "reference": ...} }
+    Permet de savoir, d'un run à l'autre, ce qui a réellement changé.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("urls", {})
+
+    def get(self, url, kind):
+        return self.entries.get(url, {}).get(kind)
+
+    def set(self, url, kind, value):
+        self.entries.setdefault(url, {})[kind] = value
+
+    def update(self, url, kind, data):
+        """
+        Enregistre l'empreinte de `data` pour (url, kind).
+        Retourne True si elle diffère de celle du run précédent.
+        """
+        digest = hash_bytes(data)
+        entry = self.entries.setdefault(url, {})
+        changed = entry.get(kind) != digest
+        entry[kind] = digest
+        return changed
+
+    def classify(self, url, watch_data):
+        """
+        Compare la fiche à l'empreinte du run précédent, met le store à jour
+        et retourne "added", "changed" ou "unchanged".
+        """
+        entry = self.entries.setdefault(url, {})
+        digest = hash_record(watch_data)
+        if "record" not in entry:
+            status = "added"
+        elif entry["record"] != digest:
+            status = "changed"
+        else:
+            status = "unchanged"
+        entry["record"] = digest
+        entry["reference"] = watch_data.get("reference", "")
+        return status
+
+    def pop_removed(self, all_urls):
+        """
+        Retire du store les URLs absentes du catalogue `all_urls`
+        et les retourne sous forme d'items de changeset.
+        """
+        catalog = set(all_urls)
+        removed = []
+        for url in list(self.entries):
+            if url not in catalog:
+                entry = self.entries.pop(url)
+                removed.append({"url": url, "reference": entry.get("reference", "")})
+        return removed
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"urls": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def write_changeset(changeset, path):
+    """
+    Écrit le changeset du run (horodaté) au format JSON.
+    """
+    data = dict(changeset)
+    data["generated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def load_changed_urls(path):
+    """
+    Retourne l'ensemble des URLs ajoutées ou modifiées d'après un changeset.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        changeset = json.load(f)
+    return {item["url"] for item in changeset["added"] + changeset["changed"]}
+
+
+def load_removed_urls(path):
+    """
+    Retourne l'ensemble des URLs supprimées d'après un changeset (vide s'il
+    n'y a pas encore de changeset).
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        changeset = json.load(f)
+    return {item["url"] for item in changeset["removed"]}
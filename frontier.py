@@ -0,0 +1,399 @@
+import os
+import time
+import zlib
+import socket
+import sqlite3
+import argparse
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from bs4 import BeautifulSoup
+
+from fingerprints import FingerprintStore
+from jsonl_store import append_jsonl, iter_jsonl
+from scraper import (
+    BASE_SAVE_DIR,
+    FINGERPRINTS_FILENAME,
+    IMAGES_SUBFOLDER,
+    ScrapeResults,
+    build_file_prefix,
+    fetch_page,
+    load_previous_records,
+    parse_watch,
+    save_image,
+)
+
+# Frontière persistante (SQLite, sur disque : mémoire bornée quelle que soit sa taille)
+FRONTIER_DB_FILENAME = "frontier.sqlite"
+# Fiches trouvées par chaque shard, fusionnées ensuite dans all_watches.json (merge_shard_outputs)
+SHARD_OUTPUT_PATTERN = "discovered_watches.shard{shard}of{num_shards}.jsonl"
+WATCHBASE_HOST = "watchbase.com"
+
+# Pages de départ par défaut : pages marque de watchbase
+DEFAULT_SEEDS = [
+    "https://watchbase.com/a-lange-sohne",
+    "https://watchbase.com/audemars-piguet",
+    "https://watchbase.com/bulgari",
+    "https://watchbase.com/cartier",
+    "https://watchbase.com/panerai",
+    "https://watchbase.com/rolex",
+]
+
+# Premiers segments de chemin qui ne sont pas des marques
+NON_CATALOG_SEGMENTS = {
+    "caliber", "calibers", "watch", "search", "login", "register", "news",
+    "about", "contact", "api", "img", "images", "css", "js", "brands", "user",
+}
+
+# Priorités (les plus petites passent en premier) : les références avant les
+# listings, pour que des fiches sortent dès le début du crawl
+PRIORITY_REFERENCE = 0
+PRIORITY_FAMILY = 10
+PRIORITY_BRAND = 20
+
+# Nombre maximal de tentatives avant d'abandonner une URL
+MAX_ATTEMPTS = 3
+# Une URL « in_progress » depuis plus longtemps que ça est considérée abandonnée
+STALE_CLAIM_SECONDS = 15 * 60
+
+
+def normalize_url(url):
+    """
+    Forme canonique pour la déduplication : hôte en minuscules,
+    sans fragment ni slash final.
+    """
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme or "https", parsed.netloc.lower(), path, "", parsed.query, ""))
+
+
+def classify_url(url):
+    """
+    Retourne "brand", "family" ou "reference" selon la profondeur du chemin
+    watchbase (/marque, /marque/famille, /marque/famille/reference),
+    ou None si l'URL ne fait pas partie du catalogue.
+    """
+    parsed = urlparse(url)
+    if parsed.netloc.lower() not in (WATCHBASE_HOST, "www." + WATCHBASE_HOST):
+        return None
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    if not segments or segments[0] in NON_CATALOG_SEGMENTS:
+        return None
+    if len(segments) == 1:
+        return "brand"
+    if len(segments) == 2:
+        return "family"
+    if len(segments) == 3 and not parsed.query:
+        return "reference"
+    return None
+
+
+def shard_of(url, num_shards):
+    """
+    Shard stable d'une URL (crc32) : identique sur toutes les machines.
+    """
+    return zlib.crc32(url.encode("utf-8")) % num_shards
+
+
+def extract_links(html, base_url):
+    """
+    Extrait les liens catalogue (marques, familles, références, pagination)
+    d'une page listing watchbase. Retourne une liste de (url, kind).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    links = {}
+    for a_tag in soup.find_all("a", href=True):
+        url = normalize_url(urljoin(base_url, a_tag["href"]))
+        kind = classify_url(url)
+        if kind:
+            links[url] = kind
+    return list(links.items())
+
+
+class Frontier:
+    """
+    File d'attente de crawl persistante et dédupliquée :
+      - une ligne par URL (clé primaire => aucun doublon, même à des centaines
+        de milliers d'URLs, sans rien garder en mémoire),
+      - priorité, profondeur, nombre de tentatives,
+      - état : pending -> in_progress -> done / failed (l'ensemble « done »
+        est l'ensemble des URLs visitées),
+      - shard = crc32(url) % N, fixé à l'insertion.
+    Les N shards sont des processus d'une même machine qui partagent ce
+    fichier, sur un disque local : la réservation d'une URL est alors
+    atomique, aucune URL n'est récupérée deux fois. Le mode WAL et les
+    verrous de SQLite ne sont pas fiables sur un système de fichiers réseau,
+    et des frontières séparées (une par machine) recrawleraient chacune tout
+    le catalogue : la frontière refuse donc d'être ouverte depuis une autre
+    machine que celle qui l'a créée.
+    """
+
+    def __init__(self, db_path, num_shards=1):
+        self.db_path = db_path
+        self.num_shards = num_shards
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                depth INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                visited_at REAL
+            )
+        """)
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS frontier_next
+            ON frontier (shard, state, priority, depth)
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # Le shard est calculé à l'insertion : N ne doit plus changer ensuite
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('num_shards', ?)", (str(num_shards),))
+        stored = int(self.conn.execute("SELECT value FROM meta WHERE key = 'num_shards'").fetchone()[0])
+        if stored != num_shards:
+            raise ValueError(f"La frontière {db_path} a été créée pour {stored} shards, pas {num_shards}")
+
+        # Une seule machine (voir la docstring de la classe)
+        host = socket.gethostname()
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('host', ?)", (host,))
+        owner = self.conn.execute("SELECT value FROM meta WHERE key = 'host'").fetchone()[0]
+        if owner != host:
+            raise Exception(f"La frontière {db_path} appartient à la machine {owner} : les shards doivent "
+                            f"tourner sur la même machine, frontière sur un disque local (ici : {host})")
+
+    @classmethod
+    def open_existing(cls, db_path):
+        """
+        Ouvre une frontière déjà créée, avec son nombre de shards.
+        """
+        if not os.path.exists(db_path):
+            raise Exception(f"Frontière introuvable : {db_path}")
+        conn = sqlite3.connect(db_path, timeout=60)
+        try:
+            num_shards = int(conn.execute("SELECT value FROM meta WHERE key = 'num_shards'").fetchone()[0])
+        finally:
+            conn.close()
+        return cls(db_path, num_shards)
+
+    def add(self, urls_with_kind, depth=0):
+        """
+        Ajoute des (url, kind) ; les URLs déjà connues (visitées ou non) sont ignorées.
+        Retourne le nombre d'URLs réellement nouvelles.
+        """
+        priorities = {"reference": PRIORITY_REFERENCE, "family": PRIORITY_FAMILY, "brand": PRIORITY_BRAND}
+        rows = [
+            (url, kind, priorities[kind], depth, shard_of(url, self.num_shards))
+            for url, kind in urls_with_kind
+        ]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, kind, priority, depth, shard) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        return self.conn.total_changes - before
+
+    def requeue_stale(self):
+        """
+        Remet en attente les URLs réservées par un worker qui a planté.
+        """
+        self.conn.execute(
+            "UPDATE frontier SET state = 'pending' WHERE state = 'in_progress' AND claimed_at < ?",
+            (time.time() - STALE_CLAIM_SECONDS,),
+        )
+
+    def claim(self, shard=0, batch_size=10):
+        """
+        Réserve atomiquement les `batch_size` URLs les plus prioritaires du shard.
+        Retourne une liste de (url, kind, depth).
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                """
+                SELECT url, kind, depth FROM frontier
+                WHERE shard = ? AND state = 'pending'
+                ORDER BY priority, depth
+                LIMIT ?
+                """,
+                (shard, batch_size),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE frontier SET state = 'in_progress', claimed_at = ?, attempts = attempts + 1 WHERE url = ?",
+                [(time.time(), url) for url, _, _ in rows],
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def mark_done(self, url):
+        self.conn.execute(
+            "UPDATE frontier SET state = 'done', visited_at = ? WHERE url = ?",
+            (time.time(), url),
+        )
+
+    def mark_failed(self, url):
+        # On retente plus tard tant que MAX_ATTEMPTS n'est pas atteint
+        self.conn.execute(
+            "UPDATE frontier SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END WHERE url = ?",
+            (MAX_ATTEMPTS, url),
+        )
+
+    def stats(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+
+    def is_exhausted(self):
+        """
+        Vrai si plus aucune URL n'est en attente ni en cours (crawl terminé).
+        """
+        stats = self.stats()
+        return not stats.get("pending") and not stats.get("in_progress")
+
+    def reference_urls(self, state=None):
+        """
+        URLs des fiches (références) de la frontière, éventuellement dans cet état.
+        """
+        if state is None:
+            rows = self.conn.execute("SELECT url FROM frontier WHERE kind = 'reference'")
+        else:
+            rows = self.conn.execute("SELECT url FROM frontier WHERE kind = 'reference' AND state = ?", (state,))
+        return [url for (url,) in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def shard_output_path(shard, num_shards):
+    return os.path.join(BASE_SAVE_DIR, SHARD_OUTPUT_PATTERN.format(shard=shard, num_shards=num_shards))
+
+
+def iter_latest_records(paths):
+    """
+    Fiches des JSONL `paths`, une seule par URL : sa dernière version (une
+    URL reprise après un plantage peut avoir été écrite deux fois). Deux
+    passes en streaming : seules les positions des fiches sont en mémoire.
+    """
+    last_position = {}
+    for file_index, path in enumerate(paths):
+        for line_number, record in enumerate(iter_jsonl(path)):
+            last_position[record.get("url")] = (file_index, line_number)
+    for file_index, path in enumerate(paths):
+        for line_number, record in enumerate(iter_jsonl(path)):
+            if last_position.get(record.get("url")) == (file_index, line_number):
+                yield record
+
+
+def merge_shard_outputs():
+    """
+    Fusionne les fiches de tous les shards dans les sorties de scraper.py
+    (all_watches.jsonl / .json, catalog.sqlite, prices.npz, changeset.json,
+    voir ScrapeResults), lues ensuite par la génération. Les fiches en échec
+    gardent leur version précédente. Les montres supprimées ne sont calculées
+    que si le crawl est terminé (sinon, les URLs pas encore visitées
+    passeraient pour supprimées).
+    """
+    frontier = Frontier.open_existing(os.path.join(BASE_SAVE_DIR, FRONTIER_DB_FILENAME))
+    try:
+        num_shards = frontier.num_shards
+        exhausted = frontier.is_exhausted()
+        all_urls = frontier.reference_urls() if exhausted else None
+        failed_urls = frontier.reference_urls("failed")
+    finally:
+        frontier.close()
+    paths = [path for path in (shard_output_path(shard, num_shards) for shard in range(num_shards))
+             if os.path.exists(path)]
+    missing = num_shards - len(paths)
+    if missing:
+        print(f"{missing} shard(s) sans fiche ({SHARD_OUTPUT_PATTERN.format(shard='*', num_shards=num_shards)})")
+
+    previous_records = load_previous_records()
+    results = ScrapeResults(FingerprintStore(os.path.join(BASE_SAVE_DIR, FINGERPRINTS_FILENAME)), jsonl=True)
+    try:
+        found = set()
+        for watch_data in iter_latest_records(paths):
+            found.add(watch_data["url"])
+            results.add(watch_data["url"], watch_data)
+        # On conserve la fiche précédente plutôt que de la perdre
+        for url in failed_urls:
+            if url not in found and url in previous_records:
+                results.add(url, previous_records[url])
+    finally:
+        results.close()
+    if not exhausted:
+        print("Crawl non terminé : aucune montre considérée supprimée")
+    results.finish(all_urls)
+
+
+def crawl(seeds=None, shard=0, num_shards=1, max_pages=None, delay=2, batch_size=10):
+    """
+    Boucle de crawl d'un worker :
+      - listings (marque/famille) => extraction de nouveaux liens dans la frontière,
+      - références => parse_watch + image, fiche ajoutée au JSONL du shard.
+    Avec un seul shard, les fiches sont fusionnées dans all_watches.json &
+    co. en fin de crawl ; avec N shards, lancer `frontier.py --merge` une
+    fois tous les shards terminés.
+    """
+    os.makedirs(BASE_SAVE_DIR, exist_ok=True)
+    images_folder = os.path.join(BASE_SAVE_DIR, IMAGES_SUBFOLDER)
+    frontier = Frontier(os.path.join(BASE_SAVE_DIR, FRONTIER_DB_FILENAME), num_shards)
+    frontier.requeue_stale()
+    frontier.add([(normalize_url(url), classify_url(normalize_url(url)) or "brand")
+                  for url in (seeds or DEFAULT_SEEDS)])
+
+    output_path = shard_output_path(shard, num_shards)
+    fetched = 0
+    with open(output_path, "a", encoding="utf-8") as out:
+        while max_pages is None or fetched < max_pages:
+            batch = frontier.claim(shard, batch_size)
+            if not batch:
+                break
+            for url, kind, depth in batch:
+                print(f"[{kind}] {url}")
+                try:
+                    if kind == "reference":
+                        watch_data = parse_watch(url)
+                        watch_data["local_image_path"] = save_image(
+                            image_url=watch_data["image_url"],
+                            images_folder=images_folder,
+                            filename_prefix=build_file_prefix(watch_data, url),
+                        )
+                        append_jsonl(out, watch_data)
+                    else:
+                        new_count = frontier.add(extract_links(fetch_page(url), url), depth + 1)
+                        print(f"  > {new_count} nouvelle(s) URL(s)")
+                    frontier.mark_done(url)
+                except Exception as e:
+                    print(f"Échec pour {url} : {e}")
+                    frontier.mark_failed(url)
+                fetched += 1
+                time.sleep(delay)
+
+    print(f"\n{fetched} page(s) traitée(s) par le shard {shard}/{num_shards}, état : {frontier.stats()}")
+    frontier.close()
+    if num_shards == 1:
+        merge_shard_outputs()
+    else:
+        print("Une fois tous les shards terminés : python frontier.py --merge")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Découverte du catalogue watchbase via une frontière de crawl.")
+    parser.add_argument("seeds", nargs="*", help="pages de départ (par défaut : DEFAULT_SEEDS)")
+    parser.add_argument("--shard", default="0/1",
+                        help="shard de ce worker, au format i/N (ex : 2/8) ; tous les shards sur la même machine")
+    parser.add_argument("--max-pages", type=int, default=None, help="arrêter après N pages")
+    parser.add_argument("--delay", type=float, default=2, help="pause entre deux requêtes (s)")
+    parser.add_argument("--merge", action="store_true",
+                        help="fusionner les fiches de tous les shards dans all_watches.json & co., puis quitter")
+    args = parser.parse_args()
+    if args.merge:
+        merge_shard_outputs()
+    else:
+        shard_index, num_shards = (int(part) for part in args.shard.split("/"))
+        crawl(args.seeds, shard_index, num_shards, args.max_pages, args.delay)
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Délais (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (5, 30)
+# Nombre de nouvelles tentatives après un échec transitoire
+DEFAULT_MAX_RETRIES = 4
+# Backoff exponentiel : 1s, 2s, 4s, ... (plafonné), tiré au hasard entre 0 et cette valeur
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Codes HTTP qui méritent une nouvelle tentative
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Taille du pool de connexions keep-alive par hôte
+DEFAULT_POOL_SIZE = 32
+
+
+# Limiteur de débit des nouvelles tentatives du thread courant (voir host_gate)
+_host_gate = threading.local()
+
+
+@contextmanager
+def host_gate(acquire, pause=None):
+    """
+    Pendant le bloc, chaque nouvelle tentative de HttpClient.request faite
+    dans ce thread reprend d'abord un jeton (`acquire()`, bloquant) au
+    limiteur de l'hôte ; un Retry-After le suspend (`pause(secondes)`)
+    pour toutes les requêtes vers cet hôte.
+    """
+    previous = getattr(_host_gate, "value", None)
+    _host_gate.value = (acquire, pause)
+    try:
+        yield
+    finally:
+        _host_gate.value = previous
+
+
+def retry_after_seconds(resp):
+    """
+    Délai demandé par l'en-tête Retry-After (secondes ou date HTTP), None sinon.
+    """
+    retry_after = resp.headers.get("Retry-After", "").strip()
+    if retry_after.isdigit():
+        return float(retry_after)
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _atomic_write(path, data):
+    """
+    Écrit `data` (bytes) dans un fichier temporaire puis le renomme,
+    pour ne jamais laisser de fichier à moitié écrit.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class HttpClient:
+    """
+    Client HTTP partagé par tout le scraper :
+      - une seule `requests.Session` (connexions keep-alive réutilisées),
+      - timeout systématique,
+      - nouvelles tentatives avec backoff exponentiel « jittered » sur 429/5xx
+        et sur les erreurs réseau,
+      - revalidation conditionnelle : ETag / Last-Modified sont mémorisés sur
+        disque (dans `cache_dir`) avec le corps de la réponse, puis renvoyés en
+        If-None-Match / If-Modified-Since. Une réponse 304 est servie depuis
+        le cache, sans retélécharger la page.
+    """
+
+    def __init__(self, headers=None, cache_dir=None, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, pool_size=DEFAULT_POOL_SIZE):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    # ----------------------------------------------------------------------
+    # Cache des validateurs (un fichier .json + un fichier .body par URL)
+    # ----------------------------------------------------------------------
+    def _cache_paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _load_cached(self, url):
+        if not self.cache_dir:
+            return None, None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _store_cached(self, url, resp):
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not self.cache_dir or not (etag or last_modified):
+            return
+        meta_path, body_path = self._cache_paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": resp.headers.get("Content-Type"),
+            "encoding": resp.encoding,
+        }
+        # Le corps d'abord : un .json présent garantit un .body complet
+        _atomic_write(body_path, resp.content)
+        _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    # ----------------------------------------------------------------------
+    # Requêtes
+    # ----------------------------------------------------------------------
+    def _backoff_delay(self, attempt, resp=None):
+        # Respecte Retry-After (secondes ou date HTTP) si le serveur le fournit
+        retry_after = retry_after_seconds(resp) if resp is not None else None
+        if retry_after is not None:
+            return min(BACKOFF_MAX, retry_after)
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    @staticmethod
+    def _wait_retry(delay, retry_after=None):
+        """
+        Attend avant une nouvelle tentative, puis reprend un jeton au
+        limiteur de l'hôte s'il y en a un (host_gate).
+        """
+        acquire, pause = getattr(_host_gate, "value", None) or (None, None)
+        if retry_after is not None and pause is not None:
+            pause(delay)
+        time.sleep(delay)
+        if acquire is not None:
+            acquire()
+
+    def request(self, url, headers=None, **kwargs):
+        """
+        GET avec timeout et nouvelles tentatives (chacune repasse par le
+        limiteur de l'hôte, voir host_gate). Retourne la dernière
+        réponse obtenue (éventuellement non-200) ; relève l'exception réseau
+        si toutes les tentatives ont échoué.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.session.get(url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"  > Erreur réseau sur {url} ({e}), nouvel essai dans {delay:.1f}s")
+                self._wait_retry(delay)
+                continue
+
+            if resp.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return resp
+            delay = self._backoff_delay(attempt, resp)
+            print(f"  > HTTP {resp.status_code} sur {url}, nouvel essai dans {delay:.1f}s")
+            retry_after = retry_after_seconds(resp)
+            resp.close()
+            self._wait_retry(delay, retry_after)
+
+    def get(self, url, revalidate=True, **kwargs):
+        """
+        GET d'une ressource. Avec `revalidate`, envoie les validateurs connus ;
+        une 304 est transformée en réponse 200 construite depuis le cache
+        (attribut `from_cache` à True).
+        """
+        meta, body = self._load_cached(url) if revalidate else (None, None)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = self.request(url, headers=headers or None, **kwargs)
+        resp.from_cache = False
+
+        if resp.status_code == 304 and meta:
+            resp.status_code = 200
+            resp._content = body
+            resp.encoding = meta.get("encoding")
+            resp.from_cache = True
+        elif resp.status_code == 200 and revalidate and not kwargs.get("stream"):
+            self._store_cached(url, resp)
+        return resp
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import tempfile
+from urllib.parse import urlparse
+
+# Taille des morceaux lus sur le réseau (mémoire constante quelle que soit l'image)
+CHUNK_SIZE = 64 * 1024
+# Manifest append-only : une ligne {"watch", "image_url", "sha256", "path"} par association
+MANIFEST_FILENAME = "images_manifest.jsonl"
+# Sous-dossier des fichiers temporaires (même disque que la destination : renommage atomique)
+TMP_SUBFOLDER = ".tmp"
+
+
+def image_extension(image_url):
+    """
+    Extension du fichier d'après l'URL (.jpg par défaut), limitée à
+    des caractères sûrs pour un nom de fichier.
+    """
+    _, ext = os.path.splitext(os.path.basename(urlparse(image_url).path))
+    ext = ext.lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,5}", ext):
+        # Si l'URL n'a pas d'extension exploitable, on force .jpg
+        ext = ".jpg"
+    return ext
+
+
+class ImageStore:
+    """
+    Stockage des images adressé par contenu :
+      - téléchargement en streaming vers un fichier temporaire, SHA-256
+        calculé au fil de l'eau, puis renommage atomique,
+      - chemin = <images_folder>/<2 premiers caractères>/<sha256><ext> :
+        une image partagée par plusieurs références n'est stockée qu'une fois,
+      - manifest montre -> image (hash, URL d'origine) relu au démarrage.
+    """
+
+    def __init__(self, images_folder):
+        self.images_folder = images_folder
+        self.manifest_path = os.path.join(images_folder, MANIFEST_FILENAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # ligne tronquée par un crash
+                    self.entries[entry["watch"]] = entry
+
+    def blob_path(self, sha256, ext):
+        return os.path.join(self.images_folder, sha256[:2], f"{sha256}{ext}")
+
+    def lookup(self, watch_key):
+        return self.entries.get(watch_key)
+
+    def _record(self, watch_key, image_url, sha256, path):
+        entry = {"watch": watch_key, "image_url": image_url, "sha256": sha256, "path": path}
+        with self._lock:
+            self.entries[watch_key] = entry
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def download(self, http_client, image_url):
+        """
+        Télécharge l'image en streaming et la range à son adresse de contenu.
+        Retourne (sha256, chemin local). Lève une exception si HTTP != 200.
+        """
+        tmp_dir = os.path.join(self.images_folder, TMP_SUBFOLDER)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        resp = http_client.get(image_url, revalidate=False, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise Exception(f"HTTP {resp.status_code}")
+            digest = hashlib.sha256()
+            fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                sha256 = digest.hexdigest()
+                path = self.blob_path(sha256, image_extension(image_url))
+                if os.path.exists(path):
+                    # Contenu déjà connu : rien à écrire
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        finally:
+            resp.close()
+        return sha256, path
+
+    def save(self, http_client, image_url, watch_key):
+        """
+        Associe l'image `image_url` à la montre `watch_key` et retourne
+        l'entrée du manifest. Aucun téléchargement si la montre pointe déjà
+        vers cette URL et que le fichier est présent.
+        """
+        entry = self.lookup(watch_key)
+        if entry and entry["image_url"] == image_url and os.path.exists(entry["path"]):
+            return entry
+        sha256, path = self.download(http_client, image_url)
+        return self._record(watch_key, image_url, sha256, path)
+
+    def compact(self):
+        """
+        Réécrit le manifest avec une seule ligne (la dernière) par montre.
+        """
+        tmp_path = f"{self.manifest_path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,98 @@
+import os
+import json
+import textwrap
+
+
+def append_jsonl(f, record):
+    """
+    Ajoute une fiche sur une ligne JSON compacte et force l'écriture sur
+    disque : un crash ne peut plus faire perdre que la ligne en cours.
+    """
+    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def repair_jsonl(jsonl_path):
+    """
+    Tronque une éventuelle dernière ligne incomplète (crash pendant l'écriture)
+    pour que les ajouts suivants repartent sur une ligne propre.
+    """
+    if not os.path.exists(jsonl_path):
+        return
+    with open(jsonl_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # On remonte jusqu'au dernier saut de ligne
+        position = size - 1
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        f.truncate(position)
+        print(f"Ligne incomplète supprimée en fin de {jsonl_path}")
+
+
+def iter_jsonl(jsonl_path):
+    """
+    Parcourt un fichier JSONL fiche par fiche (mémoire constante).
+    Les lignes vides ou corrompues sont ignorées.
+    """
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Ligne JSONL illisible ignorée dans {jsonl_path}")
+
+
+def load_done_urls(jsonl_path):
+    """
+    Répare le fichier si besoin puis retourne l'ensemble des URLs déjà
+    présentes : ce sont les montres à sauter lors d'une reprise.
+    """
+    if not os.path.exists(jsonl_path):
+        return set()
+    repair_jsonl(jsonl_path)
+    return {record["url"] for record in iter_jsonl(jsonl_path) if record.get("url")}
+
+
+def export_jsonl_to_json(jsonl_path, json_path):
+    """
+    Convertit le JSONL en enveloppe {"watches": [...]} (même mise en forme
+    que json.dump(..., indent=4)), en streaming : une fiche à la fois.
+    Si une URL apparaît plusieurs fois, c'est sa dernière version qui est gardée.
+    Retourne le nombre de fiches exportées.
+    """
+    # Première passe : position de la dernière occurrence de chaque URL
+    last_line_for_url = {}
+    for line_number, record in enumerate(iter_jsonl(jsonl_path)):
+        last_line_for_url[record.get("url") or line_number] = line_number
+    kept_lines = set(last_line_for_url.values())
+
+    tmp_path = f"{json_path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        out.write('{\n    "watches": [')
+        for line_number, record in enumerate(iter_jsonl(jsonl_path)):
+            if line_number not in kept_lines:
+                continue
+            out.write(",\n" if count else "\n")
+            out.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=4), " " * 8))
+            count += 1
+        out.write("\n    ]\n}" if count else "]\n}")
+    os.replace(tmp_path, json_path)
+    return count
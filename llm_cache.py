@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+# Cache des réponses du modèle (à côté de all_watches.json)
+LLM_CACHE_FILENAME = "llm_cache.sqlite"
+# Éviction : entrées non relues depuis MAX_AGE_DAYS, puis les moins récemment
+# utilisées jusqu'à repasser sous MAX_BYTES
+DEFAULT_MAX_AGE_DAYS = 180
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Une éviction toutes les EVICT_EVERY écritures
+EVICT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used_at);
+"""
+
+
+def normalize_prompt(prompt):
+    """
+    Forme canonique d'un prompt : fins de ligne Unix, espaces de fin de
+    ligne et lignes vides en bord supprimés (l'indentation des f-strings
+    ne change pas la clé).
+    """
+    text = prompt.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    return text.strip()
+
+
+def cache_key(model, prompt_version, prompt):
+    payload = "\0".join([model, prompt_version, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache persistant des complétions, adressé par contenu :
+    clé = sha256(modèle, version des prompts, prompt normalisé).
+    Un prompt déjà payé n'est jamais renvoyé à l'API ; seuls les prompts
+    nouveaux ou modifiés partent. Compteurs hits / misses pour la session.
+    """
+
+    def __init__(self, path, max_age_days=DEFAULT_MAX_AGE_DAYS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # Partagé entre threads (pipeline) et coroutines : accès sérialisés
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, model, prompt_version, prompt):
+        """
+        Réponse en cache pour ce prompt, ou None.
+        """
+        key = cache_key(model, prompt_version, prompt)
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute("UPDATE completions SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                                  (time.time(), key))
+        return row[0]
+
+    def put(self, model, prompt_version, prompt, response):
+        key = cache_key(model, prompt_version, prompt)
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO completions
+                        (key, model, prompt_version, response, size, created_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (key, model, prompt_version, response, len(response.encode("utf-8")), now, now))
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict()
+
+    def delete(self, model, prompt_version, prompt):
+        """
+        Retire la réponse de ce prompt (réponse rejetée : jamais resservie).
+        """
+        key = cache_key(model, prompt_version, prompt)
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+
+    def evict(self):
+        """
+        Supprime les entrées trop anciennes puis, si le cache dépasse
+        max_bytes, les moins récemment utilisées. Retourne le nombre d'entrées supprimées.
+        """
+        with self._lock:
+            return self._evict()
+
+    def _evict(self):
+        removed = 0
+        with self.conn:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self.conn.execute("DELETE FROM completions WHERE last_used_at < ?", (cutoff,)).rowcount
+            if self.max_bytes:
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    rows = self.conn.execute("SELECT key, size FROM completions ORDER BY last_used_at")
+                    doomed = []
+                    for key, size in rows:
+                        if excess <= 0:
+                            break
+                        doomed.append((key,))
+                        excess -= size
+                    self.conn.executemany("DELETE FROM completions WHERE key = ?", doomed)
+                    removed += len(doomed)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspection et éviction du cache des réponses du modèle.")
+    parser.add_argument("path", nargs="?", default=LLM_CACHE_FILENAME)
+    parser.add_argument("--evict", action="store_true", help="appliquer l'éviction (âge puis taille)")
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        raise SystemExit(f"Cache introuvable : {args.path}")
+    cache = LLMCache(args.path, args.max_age_days, int(args.max_mb * 1024 * 1024))
+    if args.evict:
+        print(f"{cache.evict()} entrée(s) supprimée(s)")
+    stats = cache.stats()
+    print(f"{stats['entries']} entrée(s), {stats['bytes'] / (1024 * 1024):.1f} Mo")
+    cache.close()
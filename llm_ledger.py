@@ -0,0 +1,181 @@
+import os
+import time
+import argparse
+import datetime
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from jsonl_store import append_jsonl, iter_jsonl, repair_jsonl
+from price_store import catalog_key
+
+# Journal des appels au modèle (à côté de all_watches.json)
+LEDGER_FILENAME = "llm_ledger.jsonl"
+# Remise de l'API Batch sur les tarifs ci-dessous
+BATCH_DISCOUNT = 0.5
+# Tarifs en USD par million de tokens (entrée, sortie)
+MODEL_PRICES = {
+    "o3-mini": (1.10, 4.40),
+    "o1": (15.00, 60.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+def call_cost(model, prompt_tokens, completion_tokens, batch=False):
+    """
+    Coût en USD d'un appel, ou None si le tarif du modèle est inconnu.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    cost = (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+class Ledger:
+    """
+    Journal append-only (JSONL) des appels au modèle : une ligne par appel
+    avec étape (article, extension_N, seo, translation), montre, modèle,
+    tokens (response.usage), latence, nombre de retries, hit de cache et
+    passage par l'API Batch.
+    Toutes les lignes d'une exécution partagent le même `run`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run = datetime.datetime.now().isoformat(timespec="seconds")
+        repair_jsonl(path)
+        self._lock = threading.Lock()
+        self.f = open(path, "a", encoding="utf-8")
+
+    def record(self, stage, model, watch=None, prompt_tokens=0, completion_tokens=0, latency=0.0,
+               retries=0, cached=False, first_token_latency=None, batch=False):
+        record = {
+            "ts": time.time(),
+            "run": self.run,
+            "stage": stage,
+            "model": model,
+            "watch": catalog_key(watch) if watch else None,
+            "brand": watch.get("brand") if watch else None,
+            "reference": watch.get("reference") if watch else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": round(latency, 4),
+            "retries": retries,
+            "cached": cached,
+        }
+        if first_token_latency is not None:
+            record["first_token_latency"] = round(first_token_latency, 4)
+        if batch:
+            record["batch"] = True
+        with self._lock:
+            append_jsonl(self.f, record)
+
+    def close(self):
+        self.f.close()
+
+
+# --------------------------------------------------------------------------
+# Rapport
+# --------------------------------------------------------------------------
+def stage_family(stage):
+    # extension_1, extension_2, ... -> extension
+    return stage.split("_", 1)[0] if stage.startswith("extension_") else stage
+
+
+def build_report(records):
+    """
+    Agrège le journal : latences p50/p95 par étape (hors cache), tokens et
+    coût par page, coût par marque, distribution du nombre de tours
+    d'extension par article.
+    """
+    latencies = defaultdict(list)
+    calls = defaultdict(lambda: {"calls": 0, "cached": 0, "prompt_tokens": 0, "completion_tokens": 0})
+    pages = defaultdict(lambda: {"tokens": 0, "cost": 0.0, "extensions": 0, "article": False})
+    brand_cost = defaultdict(float)
+    unknown_models = set()
+
+    for record in records:
+        family = stage_family(record["stage"])
+        stage_calls = calls[family]
+        stage_calls["calls"] += 1
+        if record.get("cached"):
+            stage_calls["cached"] += 1
+        elif not record.get("batch"):
+            # La latence d'un appel batch n'a pas de sens (lot de plusieurs heures)
+            latencies[family].append(record["latency"])
+        stage_calls["prompt_tokens"] += record["prompt_tokens"]
+        stage_calls["completion_tokens"] += record["completion_tokens"]
+
+        cost = call_cost(record["model"], record["prompt_tokens"], record["completion_tokens"],
+                         record.get("batch", False))
+        if cost is None:
+            unknown_models.add(record["model"])
+            cost = 0.0
+        brand_cost[record.get("brand") or "?"] += cost
+
+        if record.get("watch"):
+            page = pages[(record["run"], record["watch"])]
+            page["tokens"] += record["prompt_tokens"] + record["completion_tokens"]
+            page["cost"] += cost
+            if family == "article":
+                page["article"] = True
+            elif family == "extension":
+                page["extensions"] = max(page["extensions"], int(record["stage"].split("_", 1)[1]))
+
+    articles = [page for page in pages.values() if page["article"]]
+    rounds = defaultdict(int)
+    for page in articles:
+        rounds[page["extensions"]] += 1
+
+    return {
+        "stages": {
+            family: dict(stage_calls,
+                         p50_latency=float(np.percentile(latencies[family], 50)) if latencies[family] else None,
+                         p95_latency=float(np.percentile(latencies[family], 95)) if latencies[family] else None)
+            for family, stage_calls in calls.items()
+        },
+        "pages": len(articles),
+        "tokens_per_page": sum(page["tokens"] for page in articles) / len(articles) if articles else None,
+        "cost_per_page": sum(page["cost"] for page in articles) / len(articles) if articles else None,
+        "cost_per_brand": dict(sorted(brand_cost.items(), key=lambda item: -item[1])),
+        "extension_rounds": dict(sorted(rounds.items())),
+        "unknown_models": sorted(unknown_models),
+    }
+
+
+def print_report(report):
+    print(f"{'étape':<12} {'appels':>7} {'cache':>6} {'p50 (s)':>8} {'p95 (s)':>8} {'tok in':>10} {'tok out':>10}")
+    for family, stats in report["stages"].items():
+        p50 = f"{stats['p50_latency']:.2f}" if stats["p50_latency"] is not None else "-"
+        p95 = f"{stats['p95_latency']:.2f}" if stats["p95_latency"] is not None else "-"
+        print(f"{family:<12} {stats['calls']:>7} {stats['cached']:>6} {p50:>8} {p95:>8} "
+              f"{stats['prompt_tokens']:>10} {stats['completion_tokens']:>10}")
+
+    print(f"\n{report['pages']} page(s)")
+    if report["pages"]:
+        print(f"Tokens par page : {report['tokens_per_page']:.0f}")
+        print(f"Coût par page : {report['cost_per_page']:.4f} $")
+        print("Tours d'extension par article : "
+              + ", ".join(f"{n} tour(s) : {count}" for n, count in report["extension_rounds"].items()))
+    print("\nCoût par marque :")
+    for brand, cost in report["cost_per_brand"].items():
+        print(f"  {brand:<30} {cost:10.4f} $")
+    if report["unknown_models"]:
+        print(f"\nTarif inconnu (compté 0 $) : {', '.join(report['unknown_models'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rapport tokens / coût / latence des appels au modèle.")
+    parser.add_argument("path", nargs="?", default=LEDGER_FILENAME)
+    parser.add_argument("--run", help="limiter le rapport à une exécution (champ run)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        raise SystemExit(f"Journal introuvable : {args.path}")
+    records = iter_jsonl(args.path)
+    if args.run:
+        records = (record for record in records if record["run"] == args.run)
+    print_report(build_report(records))
@@ -0,0 +1,114 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+# Archive des pages watchbase brutes (à côté de all_watches.json)
+PAGE_ARCHIVE_FILENAME = "raw_pages.sqlite"
+# Compression zlib des pages (les pages watchbase se compressent ~10x)
+COMPRESSION_LEVEL = 6
+# Pages lues à la fois par iter_pages (mémoire bornée sur de gros corpus)
+ITER_BATCH_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    html BLOB NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class PageArchive:
+    """
+    Dernière version téléchargée de chaque page watchbase (octets bruts,
+    compressés). Permet de reparser tout le corpus après un changement de
+    sélecteurs, sans retélécharger.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def put(self, url, html):
+        """
+        Archive la page `html` (bytes) ; rien n'est réécrit si elle n'a pas changé.
+        """
+        digest = hashlib.sha256(html).hexdigest()
+        with self._lock:
+            row = self.conn.execute("SELECT sha256 FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is not None and row[0] == digest:
+                return
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, sha256, html, fetched_at) VALUES (?, ?, ?, ?)",
+                    (url, digest, zlib.compress(html, COMPRESSION_LEVEL), time.time())
+                )
+
+    def get(self, url):
+        """
+        Octets de la page archivée, ou None.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT html FROM pages WHERE url = ?", (url,)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def iter_pages(self, urls=None):
+        """
+        (url, octets) de toutes les pages archivées (ou de celles de `urls`),
+        lues par paquets de ITER_BATCH_SIZE.
+        """
+        if urls is not None:
+            for url in urls:
+                html = self.get(url)
+                if html is not None:
+                    yield url, html
+            return
+        last_url = ""
+        while True:
+            with self._lock:
+                rows = self.conn.execute("SELECT url, html FROM pages WHERE url > ? ORDER BY url LIMIT ?",
+                                         (last_url, ITER_BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            for url, html in rows:
+                yield url, zlib.decompress(html)
+            last_url = rows[-1][0]
+
+    def remove(self, urls):
+        with self._lock:
+            with self.conn:
+                self.conn.executemany("DELETE FROM pages WHERE url = ?", ((url,) for url in urls))
+
+    def stats(self):
+        with self._lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(html)), 0) FROM pages").fetchone()
+        return {"pages": count, "bytes": size}
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspection de l'archive des pages watchbase brutes.")
+    parser.add_argument("path", nargs="?", default=PAGE_ARCHIVE_FILENAME)
+    parser.add_argument("--show", metavar="URL", help="afficher la page archivée de cette URL")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        raise SystemExit(f"Archive introuvable : {args.path}")
+    archive = PageArchive(args.path)
+    if args.show:
+        html = archive.get(args.show)
+        print(html.decode("utf-8", errors="replace") if html is not None else f"Page non archivée : {args.show}")
+    else:
+        stats = archive.stats()
+        print(f"{stats['pages']} page(s) archivée(s), {stats['bytes'] / (1024 * 1024):.1f} Mo compressés")
+    archive.close()
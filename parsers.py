@@ -0,0 +1,356 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+# lxml est optionnel : sans lui, on retombe sur BeautifulSoup
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# --------------------------------------------------------------------------
+# Correspondance déclarative libellé -> champ pour les trois tables d'info
+# --------------------------------------------------------------------------
+# Table 0 : infos générales (brand, family, reference, etc.)
+# Toutes ces clés sont présentes dans la fiche, "" par défaut.
+GENERAL_FIELDS = {
+    "brand:": "brand",
+    "family:": "family",
+    "reference:": "reference",
+    "name:": "name",
+    "produced:": "produced",
+    "limited:": "limited",
+}
+# Cas particulier de la table 0 : le mouvement (lien = calibre, div = détails)
+MOVEMENT_LABEL = "movement:"
+
+# Table 1 : Case (seules les clés trouvées sont présentes)
+CASE_FIELDS = {
+    "material:": "material",
+    "glass:": "glass",
+    "back:": "back",
+    "diameter:": "diameter",
+    "height:": "height",
+    "lug width:": "lug_width",
+}
+
+# Table 2 : Dial (seules les clés trouvées sont présentes)
+DIAL_FIELDS = {
+    "color:": "color",
+    "indexes:": "indexes",
+}
+
+# Balises dont BeautifulSoup n'inclut pas le texte dans get_text()
+_SKIPPED_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _build_watch_data(general, movement, case_info, dial_info, description, image_url, price_url):
+    """
+    Assemble la fiche dans l'ordre historique des clés, quel que soit le backend.
+    """
+    watch_data = {}
+    for field in ("brand", "family", "reference", "name"):
+        watch_data[field] = general.get(field, "")
+    watch_data["movement"] = {
+        "caliber": movement.get("caliber", ""),
+        "details": movement.get("details", ""),
+    }
+    watch_data["produced"] = general.get("produced", "")
+    watch_data["limited"] = general.get("limited", "")
+    watch_data["case"] = case_info
+    watch_data["dial"] = dial_info
+    watch_data["description"] = description
+    watch_data["image_url"] = image_url
+    watch_data["prices"] = []
+    return watch_data, price_url
+
+
+# --------------------------------------------------------------------------
+# Backend BeautifulSoup (html.parser) : implémentation historique, toujours disponible
+# --------------------------------------------------------------------------
+def parse_with_bs4(html, url):
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Récupération des tables principales
+    tables = soup.find_all("table", class_="info-table")
+    if not tables:
+        raise Exception(f"Impossible de trouver les tables d'info pour la page {url}")
+
+    general = {}
+    movement = {}
+    tables_info = [general, {}, {}]
+    for table, mapping, info, separator in zip(tables, (GENERAL_FIELDS, CASE_FIELDS, DIAL_FIELDS),
+                                               tables_info, (" ", "", "")):
+        for row in table.find_all("tr"):
+            th = row.find("th")
+            td = row.find("td")
+            if not th or not td:
+                continue
+            label = th.get_text(strip=True).lower()
+            if label in mapping:
+                info[mapping[label]] = td.get_text(separator, strip=True)
+            elif label == MOVEMENT_LABEL and info is general:
+                link = td.find("a")
+                div = td.find("div")
+                if link:
+                    movement["caliber"] = link.get_text(strip=True)
+                if div:
+                    movement["details"] = div.get_text(strip=True)
+
+    # Description
+    description_text = ""
+    description_div = soup.find("div", class_="watch-description")
+    if description_div:
+        p_tag = description_div.find("p")
+        if p_tag:
+            description_text = p_tag.get_text(strip=True)
+
+    # Image principale
+    image_url = ""
+    main_image_div = soup.find("div", class_="watch-main-image")
+    if main_image_div:
+        img_tag = main_image_div.find("img")
+        if img_tag and img_tag.get("src"):
+            image_url = img_tag["src"]
+
+    # URL du JSON d'historique des prix
+    price_url = ""
+    pricechart_canvas = soup.find("canvas", {"id": "pricechart"})
+    if pricechart_canvas and pricechart_canvas.get("data-url"):
+        price_url = pricechart_canvas["data-url"]
+
+    return _build_watch_data(general, movement, tables_info[1], tables_info[2],
+                             description_text, image_url, price_url)
+
+
+# --------------------------------------------------------------------------
+# Backend lxml : un seul parcours de l'arbre (en C), extraction pilotée par les tables
+# --------------------------------------------------------------------------
+def _lxml_text(element, separator=""):
+    """
+    Équivalent de BeautifulSoup `get_text(separator, strip=True)` :
+    morceaux de texte strippés, vides ignorés, hors commentaires et scripts.
+    """
+    parts = []
+
+    def walk(node):
+        if isinstance(node.tag, str) and node.tag not in _SKIPPED_TEXT_TAGS:
+            if node.text:
+                parts.append(node.text)
+            for child in node:
+                walk(child)
+                if child.tail:
+                    parts.append(child.tail)
+
+    walk(element)
+    return separator.join(part.strip() for part in parts if part.strip())
+
+
+if lxml is not None:
+    _LXML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def _first(element, tag):
+    """Premier descendant `tag` (comme BeautifulSoup `find`), ou None."""
+    return next(element.iter(tag), None)
+
+
+def _has_class(element, class_name):
+    return class_name in (element.get("class") or "").split()
+
+
+def parse_with_lxml(html, url):
+    # On passe des octets UTF-8 avec un parser explicite : lxml refuse les
+    # chaînes contenant une déclaration d'encodage et devinerait mal sinon
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    root = lxml.html.document_fromstring(html, parser=_LXML_PARSER)
+
+    tables = []
+    description_div = None
+    main_image_div = None
+    pricechart_canvas = None
+    # Parcours unique : on repère au passage tout ce dont on a besoin
+    for element in root.iter("table", "div", "canvas"):
+        if element.tag == "table":
+            if _has_class(element, "info-table"):
+                tables.append(element)
+        elif element.tag == "div":
+            if description_div is None and _has_class(element, "watch-description"):
+                description_div = element
+            elif main_image_div is None and _has_class(element, "watch-main-image"):
+                main_image_div = element
+        elif pricechart_canvas is None and element.get("id") == "pricechart":
+            pricechart_canvas = element
+
+    if not tables:
+        raise Exception(f"Impossible de trouver les tables d'info pour la page {url}")
+
+    general = {}
+    movement = {}
+    tables_info = [general, {}, {}]
+    for table, mapping, info, separator in zip(tables, (GENERAL_FIELDS, CASE_FIELDS, DIAL_FIELDS),
+                                               tables_info, (" ", "", "")):
+        for row in table.iter("tr"):
+            th = _first(row, "th")
+            td = _first(row, "td")
+            if th is None or td is None:
+                continue
+            label = _lxml_text(th).lower()
+            if label in mapping:
+                info[mapping[label]] = _lxml_text(td, separator)
+            elif label == MOVEMENT_LABEL and info is general:
+                link = _first(td, "a")
+                div = _first(td, "div")
+                if link is not None:
+                    movement["caliber"] = _lxml_text(link)
+                if div is not None:
+                    movement["details"] = _lxml_text(div)
+
+    description_text = ""
+    if description_div is not None:
+        p_tag = _first(description_div, "p")
+        if p_tag is not None:
+            description_text = _lxml_text(p_tag)
+
+    image_url = ""
+    if main_image_div is not None:
+        img_tag = _first(main_image_div, "img")
+        if img_tag is not None and img_tag.get("src"):
+            image_url = img_tag.get("src")
+
+    price_url = ""
+    if pricechart_canvas is not None and pricechart_canvas.get("data-url"):
+        price_url = pricechart_canvas.get("data-url")
+
+    return _build_watch_data(general, movement, tables_info[1], tables_info[2],
+                             description_text, image_url, price_url)
+
+
+# --------------------------------------------------------------------------
+# Sélection du backend
+# --------------------------------------------------------------------------
+PARSER_BACKENDS = {"bs4": parse_with_bs4}
+if lxml is not None:
+    PARSER_BACKENDS["lxml"] = parse_with_lxml
+
+# "auto" : lxml si installé, sinon BeautifulSoup
+DEFAULT_BACKEND = "auto"
+
+
+def parse_watch_page(html, url, backend=DEFAULT_BACKEND):
+    """
+    Analyse le HTML d'une page watchbase avec le backend demandé et retourne
+    (watch_data, price_url). Tous les backends produisent le même dict.
+    """
+    if backend == "auto":
+        backend = "lxml" if "lxml" in PARSER_BACKENDS else "bs4"
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Backend de parsing inconnu ou non installé : {backend}")
+    return PARSER_BACKENDS[backend](html, url)
+
+
+# --------------------------------------------------------------------------
+# Parsing en masse sur un pool de processus
+# --------------------------------------------------------------------------
+# Pages envoyées à la fois à un processus (amortit le coût des échanges)
+PARSE_CHUNK_SIZE = 16
+
+
+def decode_html(html):
+    """
+    Texte d'une page archivée (octets UTF-8) ; un texte est rendu tel quel.
+    """
+    if isinstance(html, bytes):
+        return html.decode("utf-8", errors="replace")
+    return html
+
+
+def parse_raw_pages(pages, backend=DEFAULT_BACKEND):
+    """
+    Fonction pure sur des pages déjà téléchargées : [(url, html)] ->
+    [(url, watch_data, price_url, erreur)]. Une page illisible donne
+    watch_data None et le message d'erreur, sans interrompre les autres.
+    """
+    results = []
+    for url, html in pages:
+        try:
+            watch_data, price_url = parse_watch_page(decode_html(html), url, backend)
+        except Exception as e:
+            results.append((url, None, "", str(e)))
+            continue
+        watch_data["url"] = url
+        results.append((url, watch_data, price_url, None))
+    return results
+
+
+class ParsePool:
+    """
+    Pool de processus pour le parsing (construction d'arbres HTML, liée au
+    CPU) : les threads qui téléchargent n'attendent plus le GIL. Les pages
+    sont envoyées par paquets ; `workers=1` parse dans le processus courant.
+    Processus lancés en "spawn" : le pool sert depuis des programmes dont
+    les threads tournent déjà (pas de fork d'un processus multithreadé).
+    """
+
+    def __init__(self, workers=None, backend=DEFAULT_BACKEND, chunksize=PARSE_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.chunksize = chunksize
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, pages):
+        """
+        Future du résultat de parse_raw_pages(pages).
+        """
+        if self.executor is not None:
+            return self.executor.submit(parse_raw_pages, pages, self.backend)
+        future = Future()
+        future.set_result(parse_raw_pages(pages, self.backend))
+        return future
+
+    def parse_batch(self, pages):
+        """
+        Parse un lot de pages, réparti sur tous les processus ; résultats dans l'ordre.
+        """
+        pages = list(pages)
+        size = min(self.chunksize, max(1, -(-len(pages) // self.workers)))
+        futures = [self.submit(pages[i:i + size]) for i in range(0, len(pages), size)]
+        return [result for future in futures for result in future.result()]
+
+    def imap(self, pages):
+        """
+        Parse un flux de pages (ex. toute l'archive), consommé au fur et à
+        mesure (au plus 2 paquets en attente par processus) ; résultats dans l'ordre.
+        """
+        pending = deque()
+        chunk = []
+        for page in pages:
+            chunk.append(page)
+            if len(chunk) < self.chunksize:
+                continue
+            pending.append(self.submit(chunk))
+            chunk = []
+            while len(pending) >= self.workers * 2:
+                yield from pending.popleft().result()
+        if chunk:
+            pending.append(self.submit(chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
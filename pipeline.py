@@ -0,0 +1,410 @@
+import os
+import time
+import queue
+import argparse
+import threading
+
+from openai import OpenAI
+
+import article_generation
+from article_generation import (
+    BUILD_RENDER,
+    BUILD_SKIP,
+    OUTPUT_DIR,
+    collect_removed_pages,
+    generate_article_text,
+    generate_seo_and_h1,
+    page_inputs,
+    page_outputs,
+    plan_page,
+    prepare_related_watches,
+    print_llm_stats,
+    record_page,
+    translate_watch_descriptions,
+    write_page,
+)
+from fingerprints import FingerprintStore
+from http_client import host_gate
+from jsonl_store import iter_jsonl
+from parsers import ParsePool
+from price_store import PriceStore, catalog_key
+from profiling import add_profiling_arguments, profiling_session, stage as profile_stage
+from scraper import (
+    BASE_SAVE_DIR,
+    FINGERPRINTS_FILENAME,
+    IMAGES_SUBFOLDER,
+    PARSER_BACKEND,
+    WATCH_URLS,
+    ScrapeResults,
+    complete_watch,
+    fetch_watch_page,
+    load_previous_records,
+    reuse_previous_record,
+)
+from search_index import build_search_index
+
+# Workers par étape : le scraping est limité par la politesse envers watchbase,
+# la génération par la latence du modèle, le rendu et le parsing par le CPU
+# (parsing : processus, nb de CPU par défaut)
+DEFAULT_SCRAPE_WORKERS = 4
+DEFAULT_GENERATE_WORKERS = 8
+DEFAULT_RENDER_WORKERS = 2
+# Montres en attente au plus entre deux étapes (mémoire bornée, backpressure)
+DEFAULT_QUEUE_SIZE = 16
+# Intervalle minimal entre deux pages watchbase demandées, tous workers confondus
+# (la pause de 2 s de scraper.py)
+DEFAULT_SCRAPE_INTERVAL = 2.0
+# Étape d'enregistrement / traduction : au plus N montres regroupées, sans attendre
+# d'en avoir plus (une requête de traduction groupée par paquet)
+RECORD_BATCH_SIZE = 20
+# Étape de parsing : au plus N pages téléchargées envoyées ensemble au pool de processus
+PARSE_BATCH_SIZE = 32
+
+# Fin de flux, transmise d'étape en étape
+_DONE = object()
+
+
+def watch_label(item):
+    """
+    « Marque - Nom » d'une fiche, ou de la fiche en tête d'un tuple d'étape.
+    """
+    watch = item[0] if isinstance(item, tuple) else item
+    return f"{watch.get('brand', 'UnknownBrand')} - {watch.get('name', 'UnknownModel')}"
+
+
+def url_label(item):
+    """
+    URL en tête d'un tuple d'étape (téléchargement, parsing, prix et images).
+    """
+    return item[0]
+
+
+class Throttle:
+    """
+    Espace d'au moins `interval` secondes les appels à wait(), tous threads
+    confondus ; pause() repousse le prochain appel (Retry-After).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+class Stage:
+    """
+    Étape du pipeline : `workers` threads lisent la file d'entrée et appellent
+    `func(item, emit)` (ou `func(items, emit)` si batch_size > 1 : jusqu'à
+    batch_size éléments déjà disponibles). `emit` ajoute un élément à la file
+    de l'étape suivante et bloque quand elle est pleine (backpressure).
+    Une erreur sur un élément est affichée (avec `label(item)`) et n'arrête pas l'étape.
+    Un paquet en échec est rejoué élément par élément : seul l'élément fautif
+    est perdu. Une fonction par paquet ne fait donc ses effets (emit compris)
+    qu'après ses étapes communes à tout le paquet.
+    """
+
+    def __init__(self, name, func, workers, inbox, outbox=None, batch_size=1, label=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.label = label or str
+        self.items = 0
+        self.failures = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._running = workers
+        self.threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def emit(self, item):
+        if self.outbox is not None:
+            self.outbox.put(item)
+
+    def _next_items(self):
+        item = self.inbox.get()
+        if item is _DONE:
+            return None
+        items = [item]
+        while len(items) < self.batch_size:
+            try:
+                item = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                # Remis en file pour que ce worker (et les autres) s'arrêtent après ce paquet
+                self.inbox.put(_DONE)
+                break
+            items.append(item)
+        return items
+
+    def _fail(self, item, e):
+        print(f"[{self.name}] Échec pour {self.label(item)} : {e}")
+        with self._lock:
+            self.failures += 1
+
+    def _call_one(self, item):
+        try:
+            self.func([item], self.emit)
+        except Exception as e:
+            self._fail(item, e)
+
+    def _run(self):
+        while True:
+            items = self._next_items()
+            if items is None:
+                break
+            start = time.monotonic()
+            try:
+                self.func(items if self.batch_size > 1 else items[0], self.emit)
+            except Exception as e:
+                if len(items) > 1:
+                    print(f"[{self.name}] Échec du paquet de {len(items)} élément(s) : {e}, reprise un par un")
+                    for item in items:
+                        self._call_one(item)
+                else:
+                    self._fail(items[0], e)
+            with self._lock:
+                self.items += len(items)
+                self.busy += time.monotonic() - start
+        # Les autres workers doivent voir la fin de flux ; le dernier la transmet à l'étape suivante
+        self.inbox.put(_DONE)
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last:
+            self.emit(_DONE)
+
+
+def run_pipeline(urls, scrape_workers=DEFAULT_SCRAPE_WORKERS, generate_workers=DEFAULT_GENERATE_WORKERS,
+                 render_workers=DEFAULT_RENDER_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 scrape_interval=DEFAULT_SCRAPE_INTERVAL, force=False, parse_workers=None, partial=False):
+    """
+    Téléchargement -> parsing -> prix et images -> enregistrement + traduction
+    -> génération -> rendu, chaque étape avec ses workers (le parsing sur un
+    pool de `parse_workers` processus), reliées par des files bornées : la première
+    page est écrite dès que la première montre a traversé le pipeline, et
+    la durée totale tend vers celle de l'étape la plus lente.
+    Écrit aussi, comme scraper.py (ScrapeResults), all_watches.jsonl /
+    all_watches.json, le changeset, l'historique des prix et le catalogue
+    SQLite, puis met à jour l'index de recherche. `partial` : `urls` n'est
+    qu'une partie du catalogue, les autres montres (fiches, pages,
+    empreintes) sont conservées.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    images_folder = os.path.join(BASE_SAVE_DIR, IMAGES_SUBFOLDER)
+    os.makedirs(images_folder, exist_ok=True)
+
+    # Chaque URL ne passe que dans un worker : les empreintes d'URLs distinctes
+    # ne se marchent pas dessus
+    store = FingerprintStore(os.path.join(BASE_SAVE_DIR, FINGERPRINTS_FILENAME))
+    previous_records = load_previous_records()
+    # JSONL, catalogue SQLite (partagé avec la génération et le rendu, sous results.lock) et changeset
+    results = ScrapeResults(store, jsonl=True)
+    throttle = Throttle(scrape_interval)
+    parse_pool = ParsePool(parse_workers, PARSER_BACKEND)
+    # Montres similaires d'après le catalogue du run précédent (les nouvelles montres
+    # sont liées au run suivant)
+    prepare_related_watches("json")
+    start = time.monotonic()
+    timings = {"first_page": None, "skipped": 0}
+
+    def keep_previous(url, emit):
+        # Échec du téléchargement ou du parsing : on conserve la fiche précédente
+        # plutôt que de la perdre (telle quelle, sans prix ni image)
+        if url in previous_records:
+            emit((url, previous_records[url], "", False))
+
+    def fetch(url, emit):
+        throttle.wait()
+        print(f"Scraping {url} ...")
+        try:
+            # Les nouvelles tentatives de http_client repassent par le même espacement
+            with host_gate(throttle.wait, throttle.pause):
+                html, page_changed = fetch_watch_page(url, store)
+        except Exception as e:
+            print(f"Échec du scraping pour {url} : {e}")
+            html, page_changed = None, False
+        emit((url, html, page_changed))
+
+    def parse(pages, emit):
+        # Pages inchangées : fiche précédente, sans parsing ; les autres partent
+        # ensemble au pool de processus. Rien n'est émis avant la fin du parsing
+        # (paquet rejouable page par page en cas d'échec)
+        parsed, to_parse = [], []
+        for url, html, page_changed in pages:
+            if html is None:
+                keep_previous(url, parsed.append)
+            elif not page_changed and url in previous_records:
+                parsed.append((url, *reuse_previous_record(url, store, previous_records[url]), True))
+            else:
+                to_parse.append((url, html))
+        if to_parse:
+            with profile_stage("parse", pages=len(to_parse)):
+                results = parse_pool.parse_batch(to_parse)
+            for url, watch_data, price_url, error in results:
+                if error is not None:
+                    print(f"Échec du parsing pour {url} : {error}")
+                    keep_previous(url, parsed.append)
+                    continue
+                store.set(url, "price_url", price_url)
+                parsed.append((url, watch_data, price_url, True))
+        for item in parsed:
+            emit(item)
+
+    def enrich(item, emit):
+        url, watch_data, price_url, fresh = item
+        if fresh:
+            watch_data = complete_watch(url, watch_data, price_url, store, images_folder)
+        emit(watch_data)
+
+    def record(watches, emit):
+        # Un seul worker : le JSONL, le catalogue et le changeset sont écrits dans l'ordre d'arrivée.
+        # Traduction d'abord : si elle échoue, rien n'est encore écrit et le paquet
+        # est rejoué montre par montre
+        translations = translate_watch_descriptions(watches)
+        for watch_data in watches:
+            results.add(watch_data["url"], watch_data)
+            description = watch_data.get("description", "")
+            emit((watch_data, translations.get(description, description)))
+
+    def generate(item, emit):
+        watch, description_fr = item
+        price_stats = PriceStore.from_watches([watch]).analytics()[catalog_key(watch)]
+        inputs = page_inputs(watch, price_stats, description_fr)
+        action = plan_page(watch, inputs, force)
+        if action == BUILD_SKIP:
+            with results.lock:
+                timings["skipped"] += 1
+                results.catalog.mark_generated(watch)
+            return
+        if action == BUILD_RENDER:
+            article_text, meta_data = page_outputs(watch)
+        else:
+            article_text = generate_article_text(watch, verbose=False)
+            meta_data = generate_seo_and_h1(article_text, watch)
+        emit((watch, description_fr, price_stats, inputs, article_text, meta_data))
+
+    def render(item, emit):
+        watch, description_fr, price_stats, inputs, article_text, meta_data = item
+        filename = write_page(watch, article_text, meta_data, price_stats, description_fr)
+        record_page(watch, inputs, article_text, meta_data)
+        with results.lock:
+            results.catalog.mark_generated(watch)
+        if timings["first_page"] is None:
+            timings["first_page"] = time.monotonic() - start
+        print(f"Fichier HTML généré : {filename}")
+
+    url_queue = queue.Queue()
+    parse_queue = queue.Queue(maxsize=queue_size)
+    enrich_queue = queue.Queue(maxsize=queue_size)
+    record_queue = queue.Queue(maxsize=queue_size)
+    generate_queue = queue.Queue(maxsize=queue_size)
+    render_queue = queue.Queue(maxsize=queue_size)
+    stages = [
+        Stage("téléchargement", fetch, scrape_workers, url_queue, parse_queue),
+        Stage("parsing", parse, 1, parse_queue, enrich_queue, batch_size=PARSE_BATCH_SIZE, label=url_label),
+        Stage("prix et images", enrich, scrape_workers, enrich_queue, record_queue, label=url_label),
+        Stage("enregistrement", record, 1, record_queue, generate_queue, batch_size=RECORD_BATCH_SIZE,
+              label=watch_label),
+        Stage("génération", generate, generate_workers, generate_queue, render_queue, label=watch_label),
+        Stage("rendu", render, render_workers, render_queue, label=watch_label),
+    ]
+    for url in urls:
+        url_queue.put(url)
+    url_queue.put(_DONE)
+
+    try:
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+        if partial:
+            selected = set(urls)
+            results.carry_over({url: record for url, record in previous_records.items() if url not in selected})
+    finally:
+        results.close()
+        parse_pool.close()
+
+    # Fin du scraping : mêmes sorties que scraper.py (mode jsonl)
+    results.finish(None if partial else urls)
+    collect_removed_pages(set(urls), partial=partial)
+    build_search_index(iter_jsonl(results.jsonl_path))
+
+    return stages, time.monotonic() - start, timings
+
+
+def print_pipeline_stats(stages, elapsed, timings):
+    print(f"\n{'étape':<16} {'workers':>7} {'montres':>8} {'échecs':>7} {'occupation (s)':>15}")
+    for stage in stages:
+        print(f"{stage.name:<16} {stage.workers:>7} {stage.items:>8} {stage.failures:>7} "
+              f"{stage.busy / stage.workers:>15.1f}")
+    slowest = max(stages, key=lambda stage: stage.busy / stage.workers)
+    first_page = f"{timings['first_page']:.1f}s" if timings["first_page"] is not None else "-"
+    print(f"Première page après {first_page}, total {elapsed:.1f}s "
+          f"(étape la plus lente : {slowest.name}, {slowest.busy / slowest.workers:.1f}s par worker)")
+    if timings["skipped"]:
+        print(f"{timings['skipped']} page(s) à jour, non régénérée(s)")
+
+
+def main(urls=None, scrape_workers=DEFAULT_SCRAPE_WORKERS, generate_workers=DEFAULT_GENERATE_WORKERS,
+         render_workers=DEFAULT_RENDER_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+         scrape_interval=DEFAULT_SCRAPE_INTERVAL, use_cache=True, extension_mode=None, force=False,
+         parse_workers=None):
+    if not use_cache:
+        article_generation.LLM_CACHE_PATH = None
+    if extension_mode:
+        article_generation.EXTENSION_MODE = extension_mode
+    article_generation.client = OpenAI()
+
+    # URLs données : run partiel, le reste du catalogue est conservé
+    stages, elapsed, timings = run_pipeline(urls or WATCH_URLS, scrape_workers, generate_workers, render_workers,
+                                            queue_size, scrape_interval, force, parse_workers, partial=bool(urls))
+    print_llm_stats()
+    print_pipeline_stats(stages, elapsed, timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline scraping -> génération -> rendu, en flux.")
+    parser.add_argument("urls", nargs="*", help="URLs à scraper (par défaut : WATCH_URLS)")
+    parser.add_argument("--scrape-workers", type=int, default=DEFAULT_SCRAPE_WORKERS)
+    parser.add_argument("--generate-workers", type=int, default=DEFAULT_GENERATE_WORKERS)
+    parser.add_argument("--render-workers", type=int, default=DEFAULT_RENDER_WORKERS)
+    parser.add_argument("--parse-workers", type=int, help="processus de parsing (défaut : nb de CPU)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="montres en attente au plus entre deux étapes")
+    parser.add_argument("--scrape-interval", type=float, default=DEFAULT_SCRAPE_INTERVAL,
+                        help="secondes au moins entre deux pages watchbase demandées")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ne pas lire ni écrire le cache des réponses du modèle")
+    parser.add_argument("--extension-mode", choices=["continuation", "rewrite"],
+                        help="complétion des articles trop courts (défaut : EXTENSION_MODE)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignorer le manifeste du build : tout régénérer (appels au modèle compris)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    with profiling_session(args):
+        main(args.urls, args.scrape_workers, args.generate_workers, args.render_workers, args.queue_size,
+             args.scrape_interval, use_cache=not args.no_cache, extension_mode=args.extension_mode,
+             force=args.force, parse_workers=args.parse_workers)
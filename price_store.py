@@ -0,0 +1,251 @@
+import os
+import numpy as np
+
+# Fichier colonnaire de l'historique des prix (à côté de all_watches.json)
+PRICE_STORE_FILENAME = "prices.npz"
+# Fenêtre de comparaison pour l'évolution sur un an
+YOY_DAYS = 365
+# Écart toléré entre le relevé de comparaison et (dernier relevé - YOY_DAYS) :
+# au-delà, pas d'évolution sur un an (plutôt qu'une évolution sur plusieurs années)
+YOY_TOLERANCE_DAYS = 31
+
+
+def catalog_key(watch):
+    """
+    Clé d'une montre dans le store : son URL source si connue,
+    sinon "marque|référence" (anciens exports).
+    """
+    return watch.get("url") or f"{watch.get('brand', '')}|{watch.get('reference', '')}"
+
+
+def parse_price(value):
+    """
+    Prix d'un point du graphique en float : nombre, ou chaîne avec
+    séparateurs de milliers ("1,000", "12 500") ; NaN si vide ou illisible.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return np.nan
+    try:
+        return float(value.replace(",", "").replace("\u202f", "").replace("\xa0", "").replace(" ", ""))
+    except ValueError:
+        return np.nan
+
+
+def parse_date(label):
+    """
+    Date d'un point du graphique ("2024-05-31") ; NaT si vide ou illisible.
+    """
+    try:
+        return np.datetime64(label or "NaT", "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+def extract_series(prices):
+    """
+    Convertit le JSON Chart.js d'une montre (labels + datasets[0].data, avec
+    des trous ''/None et des prix en chaînes) en deux tableaux typés triés
+    par date : (dates datetime64[D], valeurs float64), plus le libellé
+    du dataset ("New", ...). Les points illisibles sont écartés.
+    """
+    if not isinstance(prices, dict) or not prices.get("datasets"):
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64), ""
+    dataset = prices["datasets"][0]
+    labels = prices.get("labels", [])
+    data = dataset.get("data", [])
+    size = min(len(labels), len(data))
+
+    dates = np.array([parse_date(label) for label in labels[:size]], dtype="datetime64[D]")
+    values = np.array([parse_price(value) for value in data[:size]], dtype=np.float64)
+    keep = ~np.isnat(dates) & ~np.isnan(values)
+    dates, values = dates[keep], values[keep]
+    order = np.argsort(dates, kind="stable")
+    return dates[order], values[order], dataset.get("label", "")
+
+
+class PriceStore:
+    """
+    Historique des prix de tout le catalogue en colonnes (format CSR) :
+      - keys[i], labels[i] : montre i et libellé de sa série,
+      - dates / values : points de toutes les montres concaténés,
+        triés par date à l'intérieur de chaque montre,
+      - offsets[i]:offsets[i+1] : tranche des points de la montre i.
+    """
+
+    def __init__(self, keys, labels, offsets, dates, values):
+        self.keys = keys
+        self.labels = labels
+        self.offsets = offsets
+        self.dates = dates
+        self.values = values
+
+    @classmethod
+    def from_watches(cls, watches):
+        keys, labels, counts, all_dates, all_values = [], [], [], [], []
+        for watch in watches:
+            dates, values, label = extract_series(watch.get("prices"))
+            keys.append(catalog_key(watch))
+            labels.append(label)
+            counts.append(len(values))
+            all_dates.append(dates)
+            all_values.append(values)
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            np.array(keys, dtype=str),
+            np.array(labels, dtype=str),
+            offsets,
+            np.concatenate(all_dates) if all_dates else np.array([], dtype="datetime64[D]"),
+            np.concatenate(all_values) if all_values else np.array([], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["keys"], data["labels"], data["offsets"], data["dates"], data["values"])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, keys=self.keys, labels=self.labels, offsets=self.offsets,
+                 dates=self.dates, values=self.values)
+        os.replace(tmp_path, path)
+
+    def analytics(self):
+        """
+        Statistiques de prix de toutes les montres en une passe vectorisée.
+        Retourne un PriceAnalytics : get(clé) -> stats, None pour une montre sans prix.
+        """
+        starts, ends = self.offsets[:-1], self.offsets[1:]
+        counts = ends - starts
+        has_data = counts > 0
+        n = len(counts)
+        nan = np.full(n, np.nan)
+
+        latest_price = nan.copy()
+        latest_price[has_data] = self.values[ends[has_data] - 1]
+        latest_date = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+        latest_date[has_data] = self.dates[ends[has_data] - 1]
+
+        # Min / max par tranche (reduceat ne gère pas les tranches vides)
+        min_price, max_price = nan.copy(), nan.copy()
+        if has_data.any():
+            min_price[has_data] = np.minimum.reduceat(self.values, starts[has_data])
+            max_price[has_data] = np.maximum.reduceat(self.values, starts[has_data])
+
+        # Évolution sur un an : relevé le plus proche de (latest - 365 j), à
+        # YOY_TOLERANCE_DAYS près. Clé globale triée (montre, date) => un seul
+        # searchsorted pour tout le catalogue.
+        owner = np.repeat(np.arange(n), counts)
+        day_span = np.int64(1 << 32)
+        point_keys = owner * day_span + self.dates.astype(np.int64)
+        target_days = (latest_date - np.timedelta64(YOY_DAYS, "D")).astype(np.int64)
+        target_keys = np.arange(n) * day_span + target_days
+        yoy_change = nan.copy()
+        rows = np.flatnonzero(has_data)
+        if len(rows):
+            point_days = self.dates.astype(np.int64)
+            last = len(self.values) - 1
+            # Dernier relevé à la date cible ou avant, premier relevé après
+            before = np.searchsorted(point_keys, target_keys[rows], side="right") - 1
+            after = before + 1
+            gap_before = np.where(before >= starts[rows],
+                                  target_days[rows] - point_days[np.clip(before, 0, last)], np.inf)
+            gap_after = np.where(after < ends[rows],
+                                 point_days[np.clip(after, 0, last)] - target_days[rows], np.inf)
+            idx = np.where(gap_after < gap_before, after, before)
+            close = np.minimum(gap_before, gap_after) <= YOY_TOLERANCE_DAYS
+            rows, idx = rows[close], idx[close]
+            past = self.values[idx]
+            yoy_change[rows] = np.where(past > 0, (latest_price[rows] - past) / past, np.nan)
+
+        # Volatilité : écart-type des rendements logarithmiques entre deux relevés
+        volatility = nan.copy()
+        if len(self.values) > 1:
+            same_watch = owner[1:] == owner[:-1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns = np.diff(np.log(self.values))
+            valid = same_watch & np.isfinite(returns)
+            sums = np.bincount(owner[1:][valid], weights=returns[valid], minlength=n)
+            squares = np.bincount(owner[1:][valid], weights=returns[valid] ** 2, minlength=n)
+            counts_r = np.bincount(owner[1:][valid], minlength=n)
+            enough = counts_r > 1
+            mean = sums[enough] / counts_r[enough]
+            variance = squares[enough] / counts_r[enough] - mean ** 2
+            volatility[enough] = np.sqrt(np.maximum(variance, 0) * counts_r[enough] / (counts_r[enough] - 1))
+
+        return PriceAnalytics(self.keys, {
+            "label": self.labels,
+            "points": counts,
+            "latest_price": latest_price,
+            "latest_date": latest_date,
+            "min_price": min_price,
+            "max_price": max_price,
+            "yoy_change": yoy_change,
+            "volatility": volatility,
+        })
+
+
+class PriceAnalytics:
+    """
+    Statistiques de prix de tout le catalogue, gardées en colonnes (un
+    tableau numpy par statistique, clés triées pour la recherche) : get(clé)
+    construit le dict d'une seule montre à la demande, sans dict Python de
+    la taille du catalogue.
+    """
+
+    def __init__(self, keys, columns):
+        self.keys = keys
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.columns = columns
+
+    def _find(self, key):
+        # Clé en double : la dernière montre l'emporte (comme un dict)
+        pos = int(np.searchsorted(self.sorted_keys, key, side="right")) - 1
+        if pos >= 0 and self.sorted_keys[pos] == key:
+            return int(self.order[pos])
+        return None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i is None:
+            raise KeyError(key)
+        return self._stats(i)
+
+    def get(self, key, default=None):
+        i = self._find(key)
+        return default if i is None else self._stats(i)
+
+    def _stats(self, i):
+        """
+        Stats de la montre i, ou None si elle n'a aucun prix.
+        """
+        columns = self.columns
+        if not columns["points"][i]:
+            return None
+        yoy_change, volatility = columns["yoy_change"][i], columns["volatility"][i]
+        return {
+            "label": str(columns["label"][i]),
+            "points": int(columns["points"][i]),
+            "latest_price": float(columns["latest_price"][i]),
+            "latest_date": str(columns["latest_date"][i]),
+            "min_price": float(columns["min_price"][i]),
+            "max_price": float(columns["max_price"][i]),
+            "yoy_change": None if np.isnan(yoy_change) else float(yoy_change),
+            "volatility": None if np.isnan(volatility) else float(volatility),
+        }
+
+
+def format_price(value):
+    """
+    76500.0 -> "76500" ; 1234.5 -> "1234.50"
+    """
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.2f}"
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+import tracemalloc
+
+# Trace exportée au format Chrome (chrome://tracing, https://ui.perfetto.dev)
+PROFILE_TRACE_FILENAME = "profile_trace.json"
+# Au-delà, les étapes sont encore comptées dans le résumé mais plus tracées
+MAX_TRACE_EVENTS = 1_000_000
+# Lignes affichées par profil cProfile
+TOP_FUNCTIONS = 15
+
+
+class _Span:
+    """
+    Mesure d'une exécution d'étape (context manager renvoyé par Profiler.stage).
+    """
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.profile = None
+        self.memory = name in profiler.tracemalloc_stages
+
+    def __enter__(self):
+        self.profile = self.profiler._start_cprofile(self.name)
+        if self.memory:
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.cpu_start
+        memory = None
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory = (current - self.memory_start, peak - self.memory_start)
+        if self.profile is not None:
+            self.profiler._stop_cprofile(self.profile)
+        self.profiler._record(self.name, self.start, wall, cpu, memory, self.args)
+        return False
+
+
+class Profiler:
+    """
+    Temps par étape (mur et CPU du thread), pour tous les threads :
+    résumé par étape, trace Chrome de chaque exécution, et en option un
+    profil cProfile ou les allocations (tracemalloc) des étapes choisies.
+    Un seul profil cProfile est actif à la fois : une étape profilée qui
+    démarre pendant une autre (autre thread) n'est que chronométrée.
+    tracemalloc suit tout le processus : pic et solde mémoire d'une étape
+    incluent les allocations des threads qui tournent en même temps.
+    """
+
+    def __init__(self, cprofile_stages=(), tracemalloc_stages=(), max_events=MAX_TRACE_EVENTS):
+        self.cprofile_stages = set(cprofile_stages)
+        self.tracemalloc_stages = set(tracemalloc_stages)
+        self.max_events = max_events
+        self.totals = {}
+        self.events = []
+        self.dropped_events = 0
+        self.thread_names = {}
+        self.profiles = {name: cProfile.Profile() for name in self.cprofile_stages}
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        if self.tracemalloc_stages and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started_at = time.perf_counter()
+        self.cpu_started_at = time.process_time()
+
+    def stage(self, name, **args):
+        return _Span(self, name, args)
+
+    def _start_cprofile(self, name):
+        profile = self.profiles.get(name)
+        if profile is None or not self._cprofile_lock.acquire(blocking=False):
+            return None
+        profile.enable()
+        return profile
+
+    def _stop_cprofile(self, profile):
+        profile.disable()
+        self._cprofile_lock.release()
+
+    def _record(self, name, start, wall, cpu, memory, args):
+        thread = threading.current_thread()
+        with self._lock:
+            total = self.totals.setdefault(name, {"count": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0,
+                                                  "memory_net": 0, "memory_peak": 0})
+            total["count"] += 1
+            total["wall"] += wall
+            total["cpu"] += cpu
+            total["max"] = max(total["max"], wall)
+            if memory is not None:
+                total["memory_net"] += memory[0]
+                total["memory_peak"] = max(total["memory_peak"], memory[1])
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self.thread_names.setdefault(thread.ident, thread.name)
+            event_args = {"cpu_ms": round(cpu * 1000, 3)}
+            event_args.update(args)
+            self.events.append({
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": round((start - self.started_at) * 1e6, 1),
+                "dur": round(wall * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": event_args,
+            })
+
+    def print_summary(self):
+        wall = time.perf_counter() - self.started_at
+        cpu = time.process_time() - self.cpu_started_at
+        memory = bool(self.tracemalloc_stages)
+        header = f"\n{'étape':<18} {'appels':>7} {'mur (s)':>9} {'moyen (ms)':>11} {'max (ms)':>9} {'CPU (s)':>8}"
+        print(header + (f" {'pic mém. (Mo)':>14} {'net (Mo)':>9}" if memory else ""))
+        for name, total in sorted(self.totals.items(), key=lambda item: -item[1]["wall"]):
+            line = (f"{name:<18} {total['count']:>7} {total['wall']:>9.2f} "
+                    f"{total['wall'] / total['count'] * 1000:>11.1f} {total['max'] * 1000:>9.1f} {total['cpu']:>8.2f}")
+            if memory and name in self.tracemalloc_stages:
+                line += f" {total['memory_peak'] / (1024 * 1024):>14.1f} {total['memory_net'] / (1024 * 1024):>9.1f}"
+            print(line)
+        print(f"{'total (processus)':<18} {'':>7} {wall:>9.2f} {'':>11} {'':>9} {cpu:>8.2f}")
+        print("Étapes imbriquées ou parallèles (threads) : les durées ne s'additionnent pas au total.")
+
+    def write_trace(self, path):
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": ident, "args": {"name": name}}
+            for ident, name in self.thread_names.items()
+        ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp_path, path)
+        dropped = f" ({self.dropped_events} non tracée(s), MAX_TRACE_EVENTS atteint)" if self.dropped_events else ""
+        print(f"Trace : {path}, {len(self.events)} exécution(s) d'étapes{dropped} "
+              f"(chrome://tracing ou https://ui.perfetto.dev)")
+
+    def write_cprofiles(self, trace_path):
+        base = os.path.splitext(trace_path)[0]
+        for name, profile in self.profiles.items():
+            if not self.totals.get(name):
+                continue
+            path = f"{base}.{name}.prof"
+            profile.dump_stats(path)
+            print(f"\ncProfile de l'étape {name} ({path}, {TOP_FUNCTIONS} fonctions les plus coûteuses) :")
+            pstats.Stats(profile).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    def finish(self, trace_path=PROFILE_TRACE_FILENAME):
+        self.print_summary()
+        self.write_trace(trace_path)
+        self.write_cprofiles(trace_path)
+        if self.tracemalloc_stages:
+            tracemalloc.stop()
+
+
+# --------------------------------------------------------------------------
+# Profileur global : sans --profile, stage() ne mesure rien
+# --------------------------------------------------------------------------
+_profiler = None
+_null_stage = contextlib.nullcontext()
+
+
+def stage(name, **args):
+    """
+    Context manager à placer autour d'une étape (`args` : annotations de la
+    trace, ex. url=...). Sans profilage actif, ne coûte qu'un test.
+    """
+    if _profiler is None:
+        return _null_stage
+    return _profiler.stage(name, **args)
+
+
+def start_profiling(cprofile_stages=(), tracemalloc_stages=()):
+    global _profiler
+    _profiler = Profiler(cprofile_stages, tracemalloc_stages)
+    return _profiler
+
+
+def stop_profiling(trace_path=PROFILE_TRACE_FILENAME):
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.finish(trace_path)
+
+
+@contextlib.contextmanager
+def profiling_session(args):
+    """
+    Profilage du bloc selon les options de add_profiling_arguments (rien sans elles).
+    Le résumé et la trace sont écrits même si le bloc échoue.
+    """
+    cprofile_stages = args.profile_cprofile.split(",") if args.profile_cprofile else []
+    tracemalloc_stages = args.profile_memory.split(",") if args.profile_memory else []
+    if not (args.profile or cprofile_stages or tracemalloc_stages):
+        yield None
+        return
+    profiler = start_profiling(cprofile_stages, tracemalloc_stages)
+    try:
+        yield profiler
+    finally:
+        stop_profiling(args.profile_trace)
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="temps mur / CPU par étape : résumé en fin de run et trace Chrome")
+    parser.add_argument("--profile-trace", default=PROFILE_TRACE_FILENAME,
+                        help=f"fichier de la trace (défaut : {PROFILE_TRACE_FILENAME})")
+    parser.add_argument("--profile-cprofile", metavar="ÉTAPES",
+                        help="profil cProfile de ces étapes, séparées par des virgules (ex. parse,render_write)")
+    parser.add_argument("--profile-memory", metavar="ÉTAPES",
+                        help="allocations (tracemalloc) de ces étapes, séparées par des virgules")
@@ -0,0 +1,268 @@
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+from price_store import catalog_key
+
+# Voisins calculés (à côté de all_watches.json), réutilisés tant que le catalogue ne change pas
+RELATED_FILENAME = "related.sqlite"
+# Nombre de montres similaires liées depuis chaque page
+DEFAULT_K = 6
+# Lignes de la matrice de similarité calculées à la fois (mémoire : batch x nb de montres floats)
+DEFAULT_BATCH_SIZE = 512
+# À incrémenter quand l'encodage des caractéristiques change
+FEATURES_VERSION = "1"
+
+# Diamètre (mm) et prix (log10) encodés en classes « floues » : deux valeurs
+# proches activent les mêmes classes
+DIAMETER_BINS = np.arange(26.0, 53.0, 2.0)
+DIAMETER_SIGMA = 2.0
+PRICE_BINS = np.arange(3.0, 6.75, 0.25)
+PRICE_SIGMA = 0.25
+
+# Groupes de caractéristiques : (dimensions, poids). Les valeurs textuelles
+# sont hachées dans leurs dimensions (pas de vocabulaire à maintenir).
+FEATURE_GROUPS = {
+    "brand": (32, 3.0),
+    "family": (64, 3.0),
+    "material": (16, 1.5),
+    "complications": (64, 1.5),
+    "dial_color": (16, 1.0),
+    "diameter": (len(DIAMETER_BINS), 1.0),
+    "price": (len(PRICE_BINS), 1.5),
+}
+
+
+# --------------------------------------------------------------------------
+# Encodage des fiches
+# --------------------------------------------------------------------------
+def normalize_label(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def parse_diameter(text):
+    """
+    "41.90 mm" -> 41.9 ; None si absent.
+    """
+    match = re.search(r"\d+(?:[.,]\d+)?", str(text or ""))
+    return float(match.group(0).replace(",", ".")) if match else None
+
+
+def watch_features(watch, price_stats=None):
+    """
+    Caractéristiques d'une fiche : listes de valeurs (groupes textuels),
+    nombre ou None (diamètre, prix).
+    """
+    details = watch.get("movement", {}).get("details", "")
+    latest_price = price_stats["latest_price"] if price_stats else None
+    return {
+        "brand": [normalize_label(watch.get("brand"))],
+        "family": [f"{normalize_label(watch.get('brand'))}|{normalize_label(watch.get('family'))}"],
+        "material": normalize_label(watch.get("case", {}).get("material")).split(),
+        # "Hours, Minutes | Date, Day | Chronometer" -> une valeur par complication
+        "complications": [normalize_label(part) for part in re.split(r"[|,]", details) if part.strip()],
+        "dial_color": normalize_label(watch.get("dial", {}).get("color")).split(),
+        "diameter": parse_diameter(watch.get("case", {}).get("diameter")),
+        "price": float(np.log10(latest_price)) if latest_price and latest_price > 0 else None,
+    }
+
+
+def _hashed(values, dims):
+    vector = np.zeros(dims, dtype=np.float32)
+    for value in values:
+        if value:
+            vector[zlib.crc32(value.encode("utf-8")) % dims] += 1.0
+    return vector
+
+
+def _soft_bins(value, bins, sigma):
+    if value is None:
+        return np.zeros(len(bins), dtype=np.float32)
+    return np.exp(-((bins - value) ** 2) / (2 * sigma ** 2)).astype(np.float32)
+
+
+def encode_watch(watch, price_stats=None):
+    """
+    Vecteur de caractéristiques d'une fiche, de norme 1 : chaque groupe est
+    normalisé puis pondéré, le produit scalaire de deux vecteurs est leur
+    similarité cosinus.
+    """
+    features = watch_features(watch, price_stats)
+    parts = []
+    for group, (dims, weight) in FEATURE_GROUPS.items():
+        if group == "diameter":
+            part = _soft_bins(features[group], DIAMETER_BINS, DIAMETER_SIGMA)
+        elif group == "price":
+            part = _soft_bins(features[group], PRICE_BINS, PRICE_SIGMA)
+        else:
+            part = _hashed(features[group], dims)
+        norm = np.linalg.norm(part)
+        parts.append(part * (weight / norm) if norm > 0 else part)
+    vector = np.concatenate(parts)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+# --------------------------------------------------------------------------
+# Plus proches voisins
+# --------------------------------------------------------------------------
+def top_k_neighbors(vectors, k=DEFAULT_K, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Pour chaque ligne de `vectors` (normées), les k autres lignes les plus
+    similaires, triées : (indices int32, scores float32), chacun n x k.
+    Calcul exact par paquets de `batch_size` lignes (un produit matriciel
+    par paquet), sans jamais matérialiser la matrice n x n.
+    """
+    n = len(vectors)
+    k = min(k, n - 1)
+    neighbors = np.zeros((n, max(k, 0)), dtype=np.int32)
+    scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbors, scores
+    for start in range(0, n, batch_size):
+        end = min(start + batch_size, n)
+        sims = vectors[start:end] @ vectors.T
+        # Une montre n'est pas sa propre voisine
+        sims[np.arange(end - start), np.arange(start, end)] = -np.inf
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(sims, idx, axis=1)
+        order = np.argsort(-top, axis=1, kind="stable")
+        neighbors[start:end] = np.take_along_axis(idx, order, axis=1)
+        scores[start:end] = np.take_along_axis(top, order, axis=1)
+    return neighbors, scores
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS related (
+    key TEXT PRIMARY KEY,
+    links_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class RelatedIndex:
+    """
+    Montres similaires de tout le catalogue, sur disque (SQLite) : une ligne
+    par montre avec ses k voisines [(href, libellé)], lue à la demande par
+    links(). `fingerprint` identifie les données d'entrée du dernier calcul.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def fingerprint(self):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+        return row[0] if row else None
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM related").fetchone()[0]
+
+    def replace(self, keys, hrefs, labels, neighbors, fingerprint):
+        """
+        Remplace tout l'index (une transaction : un lecteur voit l'ancien ou le nouveau).
+        """
+        rows = ((key, json.dumps([[hrefs[j], labels[j]] for j in neighbors[i].tolist()], ensure_ascii=False))
+                for i, key in enumerate(keys))
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM related")
+                self.conn.executemany("INSERT OR REPLACE INTO related (key, links_json) VALUES (?, ?)", rows)
+                self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)",
+                                  (fingerprint,))
+
+    def links(self, key):
+        """
+        [(href, libellé)] des montres similaires, de la plus proche à la moins proche.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT links_json FROM related WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return []
+        return [(href, label) for href, label in json.loads(row[0])]
+
+    def close(self):
+        self.conn.close()
+
+
+def iter_encoded(watches, price_analytics, href_fn):
+    """
+    (clé, href, libellé, vecteur) de chaque fiche, au fil de l'eau.
+    """
+    for watch in watches:
+        key = catalog_key(watch)
+        label = f"{watch.get('brand', '')} {watch.get('name', '')}".strip()
+        yield key, href_fn(watch), label, encode_watch(watch, price_analytics.get(key))
+
+
+def catalog_fingerprint(watches, price_analytics, href_fn, k=DEFAULT_K):
+    """
+    Empreinte des fiches encodées, des pages et de k, calculée en flux
+    (une fiche en mémoire à la fois).
+    """
+    digest = hashlib.sha256(f"{FEATURES_VERSION}|{k}".encode("utf-8"))
+    for key, href, label, vector in iter_encoded(watches, price_analytics, href_fn):
+        digest.update("\0".join([key, href, label, ""]).encode("utf-8"))
+        digest.update(vector.tobytes())
+    return digest.hexdigest()
+
+
+def load_or_build(path, watches, price_analytics, href_fn, k=DEFAULT_K, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Retourne (RelatedIndex, recalculé ?). `watches()` donne un nouvel
+    itérateur sur le catalogue : une première passe en flux calcule
+    l'empreinte ; les voisins enregistrés dans `path` sont réutilisés si ni
+    les fiches encodées, ni les pages, ni k n'ont changé. Sinon une seconde
+    passe encode tout le catalogue (matrice n x dims) pour le calcul exact.
+    `href_fn(watch)` donne le lien de la page d'une montre.
+    """
+    fingerprint = catalog_fingerprint(watches(), price_analytics, href_fn, k)
+    index = RelatedIndex(path or ":memory:")
+    if index.fingerprint == fingerprint:
+        return index, False
+
+    keys, hrefs, labels, rows = [], [], [], []
+    for key, href, label, vector in iter_encoded(watches(), price_analytics, href_fn):
+        keys.append(key)
+        hrefs.append(href)
+        labels.append(label)
+        rows.append(vector)
+    vectors = np.stack(rows) if rows else np.zeros((0, sum(dims for dims, _ in FEATURE_GROUPS.values())), np.float32)
+    del rows
+    neighbors, _ = top_k_neighbors(vectors, k, batch_size)
+    index.replace(keys, hrefs, labels, neighbors, fingerprint)
+    return index, True
+
+
+if __name__ == "__main__":
+    import article_generation
+
+    parser = argparse.ArgumentParser(description="Calcul des montres similaires de tout le catalogue.")
+    parser.add_argument("--source", choices=["json", "jsonl", "sqlite"], default="json")
+    parser.add_argument("--show", help="afficher les voisines de cette montre (URL)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = article_generation.prepare_related_watches(args.source)
+    if index is not None:
+        print(f"{time.perf_counter() - start:.1f}s")
+        if args.show:
+            for href, label in index.links(args.show):
+                print(f"  {label} ({href})")
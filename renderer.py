@@ -0,0 +1,229 @@
+import os
+import re
+import html
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from price_store import PriceStore, catalog_key, format_price
+
+# Gabarits HTML, compilés une seule fois par processus
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+PAGE_TEMPLATE = "watch_page.html"
+SPEC_ROW_TEMPLATE = "spec_row.html"
+RELATED_SECTION_TEMPLATE = "related_section.html"
+RELATED_ITEM_TEMPLATE = "related_item.html"
+PAGE_TEMPLATES = (PAGE_TEMPLATE, SPEC_ROW_TEMPLATE, RELATED_SECTION_TEMPLATE, RELATED_ITEM_TEMPLATE)
+# Taille du tampon d'écriture des pages
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# {{ nom }} : valeur échappée ; {{{ nom }}} : HTML de confiance inséré tel quel
+PLACEHOLDER_RE = re.compile(r"\{\{\{\s*(\w+)\s*\}\}\}|\{\{\s*(\w+)\s*\}\}")
+
+# Fiche technique : (clé, libellé) des champs simples, puis du boîtier
+GENERAL_SPECS = [
+    ("brand", "Marque"),
+    ("family", "Famille"),
+    ("reference", "Référence"),
+    ("name", "Nom"),
+    ("produced", "Date de sortie / Production"),
+    ("limited", "Édition Limitée ?"),
+]
+CASE_SPECS = ["material", "glass", "back", "diameter", "height", "lug_width"]
+
+
+class Template:
+    """
+    Gabarit compilé en une liste de (texte littéral, nom de variable, brut ?).
+    Le rendu écrit les morceaux au fil de l'eau via `write` ; une variable
+    peut être une fonction `f(write)` qui écrit elle-même son contenu.
+    """
+
+    def __init__(self, source):
+        self.parts = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            raw_name, escaped_name = match.groups()
+            self.parts.append((source[position:match.start()], raw_name or escaped_name, raw_name is not None))
+            position = match.end()
+        self.parts.append((source[position:], None, False))
+
+    def render_to(self, write, context):
+        for literal, name, raw in self.parts:
+            write(literal)
+            if name is None:
+                continue
+            value = context[name]
+            if callable(value):
+                value(write)
+            elif raw:
+                write(value)
+            else:
+                write(html.escape(str(value)))
+
+    def render(self, context):
+        chunks = []
+        self.render_to(chunks.append, context)
+        return "".join(chunks)
+
+
+_templates = {}
+
+
+def load_template(name):
+    template = _templates.get(name)
+    if template is None:
+        with open(os.path.join(TEMPLATES_DIR, name), "r", encoding="utf-8") as f:
+            template = _templates[name] = Template(f.read())
+    return template
+
+
+def template_version(names=PAGE_TEMPLATES):
+    """
+    Empreinte des gabarits `names` (par défaut ceux des pages montres) :
+    change dès que l'un d'eux est modifié.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(TEMPLATES_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# --------------------------------------------------------------------------
+# Modèle de données de la fiche technique
+# --------------------------------------------------------------------------
+def spec_rows(watch, description_fr="", price_stats=None):
+    """
+    Lignes (libellé, valeur) de la fiche technique, dans l'ordre d'affichage.
+    `price_stats` est recalculé depuis watch["prices"] s'il n'est pas fourni.
+    """
+    rows = [(label, watch[key]) for key, label in GENERAL_SPECS if key in watch]
+
+    if "movement" in watch:
+        movement_info = watch["movement"]
+        rows.append(("Mouvement - Calibre", movement_info.get("caliber", "")))
+        rows.append(("Détails Mouvement", movement_info.get("details", "")))
+
+    if "case" in watch:
+        case_info = watch["case"]
+        rows.extend((case_key.capitalize(), case_info[case_key]) for case_key in CASE_SPECS if case_key in case_info)
+
+    if "dial" in watch:
+        dial_info = watch["dial"]
+        rows.append(("Cadran - Couleur", dial_info.get("color", "")))
+        rows.append(("Cadran - Indexes", dial_info.get("indexes", "")))
+
+    if watch.get("description", ""):
+        rows.append(("Description", description_fr))
+
+    if price_stats is None and "prices" in watch:
+        price_stats = PriceStore.from_watches([watch]).analytics()[catalog_key(watch)]
+    if price_stats:
+        rows.append(("Prix (le plus récent)",
+                     f"{format_price(price_stats['latest_price'])} (selon '{price_stats['label']}')"))
+        if price_stats["points"] > 1:
+            rows.append(("Fourchette de prix",
+                         f"{format_price(price_stats['min_price'])} - {format_price(price_stats['max_price'])}"))
+        if price_stats["yoy_change"] is not None:
+            rows.append(("Évolution sur un an", f"{price_stats['yoy_change'] * 100:+.1f} %"))
+    return rows
+
+
+def image_src(watch):
+    return watch.get("image_url") or watch.get("local_image_path") or "#"
+
+
+# --------------------------------------------------------------------------
+# Rendu
+# --------------------------------------------------------------------------
+def render_watch_page(write, watch, article_text, meta_data, price_stats=None, description_fr="", related=None):
+    """
+    Écrit la page d'une montre via `write` (fichier, liste...), morceau par morceau.
+    `related` : [(lien, libellé)] des montres similaires (section omise si vide).
+    """
+    row_template = load_template(SPEC_ROW_TEMPLATE)
+    related_item_template = load_template(RELATED_ITEM_TEMPLATE)
+
+    def write_rows(write):
+        for label, value in spec_rows(watch, description_fr, price_stats):
+            row_template.render_to(write, {"label": label, "value": value})
+
+    def write_related_items(write):
+        for href, label in related:
+            related_item_template.render_to(write, {"href": href, "label": label})
+
+    def write_related(write):
+        if related:
+            load_template(RELATED_SECTION_TEMPLATE).render_to(write, {"items": write_related_items})
+
+    load_template(PAGE_TEMPLATE).render_to(write, {
+        "seo_title": meta_data["seo_title"],
+        "meta_description": meta_data["meta_description"],
+        "h1": meta_data["h1"],
+        "spec_rows": write_rows,
+        "image_src": image_src(watch),
+        "article_html": article_text,
+        "related_section": write_related,
+    })
+
+
+def render_watch_page_string(watch, article_text, meta_data, price_stats=None, description_fr="", related=None):
+    chunks = []
+    render_watch_page(chunks.append, watch, article_text, meta_data, price_stats, description_fr, related)
+    return "".join(chunks)
+
+
+def write_watch_page(path, watch, article_text, meta_data, price_stats=None, description_fr="", related=None):
+    """
+    Rend la page directement dans le fichier (sans construire la chaîne
+    complète), via un fichier temporaire renommé à la fin : une page
+    n'est jamais visible à moitié écrite.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+            render_watch_page(f.write, watch, article_text, meta_data, price_stats, description_fr, related)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _write_pages(jobs):
+    for job in jobs:
+        write_watch_page(*job)
+    return len(jobs)
+
+
+def render_pages(jobs, workers=None, chunksize=32):
+    """
+    Rend un lot de pages sur un pool de processus. `jobs` : itérable de tuples
+    (path, watch, article_text, meta_data, price_stats, description_fr, related),
+    consommé au fur et à mesure (au plus 2 paquets de `chunksize` pages en
+    attente par processus). Retourne le nombre de pages écrites.
+    """
+    if workers == 1:
+        return sum(_write_pages([job]) for job in jobs)
+
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        max_pending = workers * 2
+        pending = set()
+        chunk = []
+        for job in jobs:
+            chunk.append(job)
+            if len(chunk) < chunksize:
+                continue
+            pending.add(executor.submit(_write_pages, chunk))
+            chunk = []
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += sum(future.result() for future in done)
+        if chunk:
+            pending.add(executor.submit(_write_pages, chunk))
+        count += sum(future.result() for future in pending)
+    return count
@@ -1,11 +1,24 @@
 import os
 import time
 import json
+import argparse
+import threading
 import requests
-from bs4 import BeautifulSoup
+
+from http_client import HttpClient
+from parsers import ParsePool, decode_html, parse_watch_page
+from fingerprints import FingerprintStore, new_changeset, write_changeset
+from image_store import ImageStore
+from page_archive import PAGE_ARCHIVE_FILENAME, PageArchive
+from catalog_stream import iter_json_array
+from jsonl_store import append_jsonl, export_jsonl_to_json, load_done_urls
+from price_store import PRICE_STORE_FILENAME, PriceStore
+from catalog_db import CATALOG_DB_FILENAME, CatalogDB
+from profiling import add_profiling_arguments, profiling_session, stage as profile_stage
 
 # Dossier de base où seront créés le sous-dossier d'images et le JSON
-BASE_SAVE_DIR = "/Users/simonazoulay/guide-montres"
+# (variable d'environnement GUIDE_MONTRES_DIR, sinon le dossier historique)
+BASE_SAVE_DIR = os.environ.get("GUIDE_MONTRES_DIR", "/Users/simonazoulay/guide-montres")
 # Sous-dossier pour ranger toutes les images
 IMAGES_SUBFOLDER = "images"
 
@@ -28,6 +41,92 @@ HEADERS = {
     )
 }
 
+# Backend de parsing : "auto" (lxml si installé), "lxml" ou "bs4"
+PARSER_BACKEND = "auto"
+
+# Empreintes persistantes (page, prix, image, fiche) et changeset du dernier run
+FINGERPRINTS_FILENAME = "fingerprints.json"
+CHANGESET_FILENAME = "changeset.json"
+# Sortie streaming (une fiche JSON par ligne)
+JSONL_FILENAME = "all_watches.jsonl"
+
+# Client HTTP partagé (pool keep-alive, timeouts, retries, revalidation ETag/Last-Modified)
+HTTP_CACHE_SUBFOLDER = "http_cache"
+http_client = HttpClient(headers=HEADERS, cache_dir=os.path.join(BASE_SAVE_DIR, HTTP_CACHE_SUBFOLDER))
+
+# Stockages d'images adressés par contenu, un par dossier
+image_stores = {}
+image_stores_lock = threading.Lock()
+
+# Pages brutes archivées (reparsing sans retéléchargement), ouvertes au premier appel
+_page_archive = None
+_page_archive_lock = threading.Lock()
+
+def get_page_archive():
+    global _page_archive
+    with _page_archive_lock:
+        if _page_archive is None:
+            os.makedirs(BASE_SAVE_DIR, exist_ok=True)
+            _page_archive = PageArchive(os.path.join(BASE_SAVE_DIR, PAGE_ARCHIVE_FILENAME))
+    return _page_archive
+
+def fetch_page(url):
+    """
+    Télécharge la page watchbase à l'URL donnée et retourne son HTML.
+    Lève une exception si le code HTTP n'est pas 200.
+    """
+    with profile_stage("fetch", url=url):
+        resp = http_client.get(url)
+    if resp.status_code != 200:
+        raise Exception(f"Erreur lors de la récupération de la page {url} (code {resp.status_code})")
+    return resp.text
+
+def fetch_raw_page(url):
+    """
+    Télécharge la page watchbase à l'URL donnée, l'archive et retourne ses
+    octets bruts (à parser avec parse_watch_html ou un ParsePool).
+    Lève une exception si le code HTTP n'est pas 200.
+    """
+    with profile_stage("fetch", url=url):
+        resp = http_client.get(url)
+    if resp.status_code != 200:
+        raise Exception(f"Erreur lors de la récupération de la page {url} (code {resp.status_code})")
+    get_page_archive().put(url, resp.content)
+    return resp.content
+
+def parse_watch_html(html, url):
+    """
+    Analyse le HTML (texte ou octets) d'une page watchbase (sans aucun accès réseau) et retourne
+    un tuple (watch_data, price_url) :
+      - watch_data : dictionnaire décrit dans `parse_watch`, avec "prices" vide
+      - price_url : URL du JSON d'historique des prix ("" si absente)
+    Le backend (lxml ou BeautifulSoup) est choisi par PARSER_BACKEND.
+    """
+    with profile_stage("parse", url=url):
+        watch_data, price_url = parse_watch_page(decode_html(html), url, backend=PARSER_BACKEND)
+    watch_data["url"] = url
+    return watch_data, price_url
+
+def fetch_prices(price_url):
+    """
+    Récupère le JSON d'historique des prix (format Chart.js).
+    Retourne le JSON parsé, ou [] en cas d'échec.
+    """
+    with profile_stage("price_fetch", url=price_url):
+        try:
+            price_resp = http_client.get(price_url)
+        except requests.RequestException as e:
+            print(f"Impossible de récupérer le JSON des prix depuis {price_url}: {e}")
+            return []
+        if price_resp.status_code == 200:
+            try:
+                return price_resp.json()
+            except Exception as e:
+                print(f"Impossible de parser les prix en JSON depuis {price_url}: {e}")
+        else:
+            print(f"Impossible de récupérer le JSON des prix (code {price_resp.status_code}).")
+        return []
+
 def parse_watch(url):
     """
     Scrape la page watchbase à l'URL donnée et retourne
@@ -41,183 +140,234 @@ def parse_watch(url):
       - image_url
       - prices (liste d’historique de prix)
     """
-    resp = requests.get(url, headers=HEADERS)
-    if resp.status_code != 200:
-        raise Exception(f"Erreur lors de la récupération de la page {url} (code {resp.status_code})")
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    watch_data = {}
-
-    # Récupération des tables principales
-    tables = soup.find_all("table", class_="info-table")
-    if not tables:
-        raise Exception(f"Impossible de trouver les tables d'info pour la page {url}")
-
-    # Table 0 : infos générales (brand, family, reference, etc.)
-    general_table = tables[0]
-    rows = general_table.find_all("tr")
-
-    brand = ""
-    family = ""
-    reference = ""
-    name_ = ""
-    movement_name = ""
-    movement_details = ""
-    produced = ""
-    limited = ""
-
-    for row in rows:
-        th = row.find("th")
-        td = row.find("td")
-        if not th or not td:
-            continue
-        label = th.get_text(strip=True).lower()
-        value = td.get_text(" ", strip=True)  # sépare les éventuelles sous-balises par un espace
-
-        if label == "brand:":
-            brand = value
-        elif label == "family:":
-            family = value
-        elif label == "reference:":
-            reference = value
-        elif label == "name:":
-            name_ = value
-        elif label == "movement:":
-            link = td.find("a")
-            div = td.find("div")
-            if link:
-                movement_name = link.get_text(strip=True)
-            if div:
-                movement_details = div.get_text(strip=True)
-        elif label == "produced:":
-            produced = value
-        elif label == "limited:":
-            limited = value
-
-    watch_data["brand"] = brand
-    watch_data["family"] = family
-    watch_data["reference"] = reference
-    watch_data["name"] = name_
-    watch_data["movement"] = {
-        "caliber": movement_name,
-        "details": movement_details
-    }
-    watch_data["produced"] = produced
-    watch_data["limited"] = limited
-
-    # Table 1 : Case
-    case_table = tables[1].find_all("tr") if len(tables) > 1 else []
-    case_info = {}
-    for row in case_table:
-        th = row.find("th")
-        td = row.find("td")
-        if not th or not td:
-            continue
-        label = th.get_text(strip=True).lower()
-        value = td.get_text(strip=True)
-        if label == "material:":
-            case_info["material"] = value
-        elif label == "glass:":
-            case_info["glass"] = value
-        elif label == "back:":
-            case_info["back"] = value
-        elif label == "diameter:":
-            case_info["diameter"] = value
-        elif label == "height:":
-            case_info["height"] = value
-        elif label == "lug width:":
-            case_info["lug_width"] = value
-
-    # Table 2 : Dial
-    dial_table = tables[2].find_all("tr") if len(tables) > 2 else []
-    dial_info = {}
-    for row in dial_table:
-        th = row.find("th")
-        td = row.find("td")
-        if not th or not td:
-            continue
-        label = th.get_text(strip=True).lower()
-        value = td.get_text(strip=True)
-        if label == "color:":
-            dial_info["color"] = value
-        elif label == "indexes:":
-            dial_info["indexes"] = value
-
-    watch_data["case"] = case_info
-    watch_data["dial"] = dial_info
-
-    # Description
-    description_div = soup.find("div", class_="watch-description")
-    description_text = ""
-    if description_div:
-        p_tag = description_div.find("p")
-        if p_tag:
-            description_text = p_tag.get_text(strip=True)
-
-    watch_data["description"] = description_text
-
-    # Image principale
-    main_image_div = soup.find("div", class_="watch-main-image")
-    image_url = ""
-    if main_image_div:
-        img_tag = main_image_div.find("img")
-        if img_tag and img_tag.get("src"):
-            image_url = img_tag["src"]
-    watch_data["image_url"] = image_url
-
-    # Historique des prix
-    watch_data["prices"] = []
-    pricechart_canvas = soup.find("canvas", {"id": "pricechart"})
-    if pricechart_canvas and pricechart_canvas.get("data-url"):
-        price_url = pricechart_canvas["data-url"]
-        price_resp = requests.get(price_url, headers=HEADERS)
-        if price_resp.status_code == 200:
-            try:
-                prices_json = price_resp.json()
-                watch_data["prices"] = prices_json
-            except Exception as e:
-                print(f"Impossible de parser les prix en JSON depuis {price_url}: {e}")
-        else:
-            print(f"Impossible de récupérer le JSON des prix (code {price_resp.status_code}).")
-
+    html = fetch_raw_page(url)
+    watch_data, price_url = parse_watch_html(html, url)
+    if price_url:
+        watch_data["prices"] = fetch_prices(price_url)
     return watch_data
 
+def get_image_store(images_folder):
+    """
+    Retourne (en le créant au besoin) le stockage d'images du dossier donné.
+    """
+    with image_stores_lock:
+        if images_folder not in image_stores:
+            os.makedirs(images_folder, exist_ok=True)
+            image_stores[images_folder] = ImageStore(images_folder)
+        return image_stores[images_folder]
+
 def save_image(image_url, images_folder, filename_prefix):
     """
-    Télécharge l'image depuis `image_url` vers le dossier `images_folder`
-    avec un nom de fichier préfixé par `filename_prefix`.
+    Télécharge l'image depuis `image_url` dans le stockage adressé par contenu
+    de `images_folder` (streaming, renommage atomique, déduplication).
+    `filename_prefix` (brand + référence) sert de clé dans le manifest.
     Retourne le chemin local de l'image si OK, sinon "".
     """
     if not image_url:
         return ""
 
-    # Crée le dossier des images s'il n'existe pas encore
-    os.makedirs(images_folder, exist_ok=True)
-
-    resp = requests.get(image_url, headers=HEADERS)
-    if resp.status_code != 200:
-        print(f"Impossible de télécharger l'image (HTTP {resp.status_code}): {image_url}")
+    try:
+        with profile_stage("image_save", url=image_url):
+            entry = get_image_store(images_folder).save(http_client, image_url, filename_prefix)
+    except Exception as e:
+        print(f"Impossible de télécharger l'image ({e}): {image_url}")
         return ""
 
-    # Récupère l'extension (par ex: .jpg ou .webp) depuis l'URL
-    basename = os.path.basename(image_url)
-    _, ext = os.path.splitext(basename)
-    if not ext:
-        # Si l'URL n'a pas d'extension, on force .jpg
-        ext = ".jpg"
+    return entry["path"]
 
-    # Construit le chemin local
-    image_filename = f"{filename_prefix}{ext}"
-    local_path = os.path.join(images_folder, image_filename)
+def build_file_prefix(watch_data, url):
+    """
+    Construit un préfixe de nom de fichier à partir de brand + référence.
+    """
+    brand_clean = watch_data["brand"].lower().replace(" ", "-").replace("&", "and").replace("'", "")
+    ref_clean = watch_data["reference"].lower().replace(" ", "-").replace("/", "-")
+    if not brand_clean:
+        brand_clean = "unknownbrand"
+    if not ref_clean:
+        # Si pas de référence, on utilise la dernière partie de l'URL
+        ref_clean = url.strip("/").split("/")[-1]
 
-    # Écriture en binaire
-    with open(local_path, "wb") as f:
-        f.write(resp.content)
+    return f"{brand_clean}_{ref_clean}"
 
-    return local_path
+def write_watches_json(all_watches_data):
+    """
+    Exporte toutes les montres dans un SEUL fichier JSON
+    ({"watches": [...]}) et retourne son chemin.
+    """
+    final_output_path = os.path.join(BASE_SAVE_DIR, "all_watches.json")
+    data_to_write = {
+        "watches": all_watches_data
+    }
 
-def main():
+    with open(final_output_path, "w", encoding="utf-8") as f:
+        json.dump(data_to_write, f, ensure_ascii=False, indent=4)
+
+    return final_output_path
+
+def load_previous_records():
+    """
+    Relit le all_watches.json du run précédent (s'il existe) et retourne
+    un dict {url: fiche}. Les fiches sans "url" (anciens exports) sont ignorées.
+    """
+    path = os.path.join(BASE_SAVE_DIR, "all_watches.json")
+    if not os.path.exists(path):
+        return {}
+    return {watch["url"]: watch for watch in iter_json_array(path) if watch.get("url")}
+
+class ScrapeResults:
+    """
+    Sorties communes à tous les modes de scraping (scraper.py, async_scraper.py,
+    pipeline.py, frontier.py) :
+      - add(), au fil de l'eau : fiche ajoutée à all_watches.jsonl (mode jsonl)
+        ou gardée en mémoire, catalog.sqlite, empreintes et changeset,
+      - finish(), à la fin : montres supprimées, all_watches.json, prices.npz
+        et changeset.json.
+    add() peut être appelée depuis plusieurs threads ; `lock` protège aussi
+    les autres accès de l'appelant à `catalog`.
+    """
+
+    def __init__(self, store, jsonl=False, resume=False):
+        self.store = store
+        self.changeset = new_changeset()
+        # Fiches indexées par URL (mode json uniquement)
+        self.records_by_url = {}
+        self.jsonl_path = os.path.join(BASE_SAVE_DIR, JSONL_FILENAME) if jsonl else None
+        self.jsonl_file = open(self.jsonl_path, "a" if resume else "w", encoding="utf-8") if jsonl else None
+        # Catalogue SQLite interrogé par le générateur
+        self.catalog = CatalogDB(os.path.join(BASE_SAVE_DIR, CATALOG_DB_FILENAME), check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def add(self, url, watch_data):
+        with self.lock, profile_stage("write", url=url):
+            if self.jsonl_file:
+                append_jsonl(self.jsonl_file, watch_data)
+            else:
+                self.records_by_url[url] = watch_data
+            self.catalog.upsert_watch(watch_data)
+            status = self.store.classify(url, watch_data)
+            self.changeset[status].append({"url": url, "reference": watch_data.get("reference", "")})
+
+    def carry_over(self, records_by_url):
+        """
+        Run partiel (quelques URLs seulement) : les fiches des autres montres
+        sont reprises telles quelles dans l'export, sans passer par le
+        changeset ni le catalogue (déjà à jour). Avant close().
+        """
+        with self.lock:
+            for url, watch_data in records_by_url.items():
+                if self.jsonl_file:
+                    append_jsonl(self.jsonl_file, watch_data)
+                else:
+                    self.records_by_url.setdefault(url, watch_data)
+
+    def close(self):
+        if self.jsonl_file:
+            self.jsonl_file.close()
+            self.jsonl_file = None
+
+    def finish(self, all_urls=None):
+        """
+        Écrit les sorties de fin de run et retourne le changeset. `all_urls` :
+        liste complète des URLs du catalogue, les URLs connues absentes sont
+        supprimées (une URL en échec pendant ce run n'en fait pas partie) ;
+        None : aucune suppression.
+        """
+        self.close()
+        # Changeset : seules les fiches ajoutées/modifiées seront régénérées en aval
+        if all_urls is not None:
+            self.changeset["removed"] = self.store.pop_removed(all_urls)
+        self.store.save()
+        removed_urls = [item["url"] for item in self.changeset["removed"]]
+        self.catalog.delete_watches(removed_urls)
+        self.catalog.close()
+        get_page_archive().remove(removed_urls)
+        changeset_path = os.path.join(BASE_SAVE_DIR, CHANGESET_FILENAME)
+        write_changeset(self.changeset, changeset_path)
+
+        # À la fin, on exporte toutes les montres dans un SEUL fichier JSON
+        with profile_stage("export"):
+            if self.jsonl_path:
+                final_output_path = os.path.join(BASE_SAVE_DIR, "all_watches.json")
+                count = export_jsonl_to_json(self.jsonl_path, final_output_path)
+                print(f"\n{count} montre(s) exportée(s) depuis {self.jsonl_path}")
+                watches = iter_json_array(final_output_path)
+            else:
+                final_output_path = write_watches_json(list(self.records_by_url.values()))
+                watches = self.records_by_url.values()
+
+            # Historique des prix en colonnes pour les analyses vectorisées
+            # (écrit après all_watches.json : le générateur le sait ainsi à jour)
+            price_store_path = os.path.join(BASE_SAVE_DIR, PRICE_STORE_FILENAME)
+            PriceStore.from_watches(watches).save(price_store_path)
+
+        print(f"\nFichier JSON global créé : {final_output_path}")
+        print(f"Historique des prix : {price_store_path}")
+        print(
+            f"Changeset ({changeset_path}) : {len(self.changeset['added'])} ajoutée(s), "
+            f"{len(self.changeset['changed'])} modifiée(s), {len(self.changeset['removed'])} supprimée(s), "
+            f"{len(self.changeset['unchanged'])} inchangée(s)"
+        )
+        return self.changeset
+
+def fetch_watch_page(url, store):
+    """
+    Télécharge (et archive) la page d'une montre ; retourne (octets, page modifiée ?)
+    d'après les empreintes du run précédent.
+    """
+    html = fetch_raw_page(url)
+    return html, store.update(url, "page", html)
+
+def reuse_previous_record(url, store, previous_data):
+    """
+    (fiche, price_url) du run précédent, pour une page inchangée : pas de re-parsing.
+    """
+    return dict(previous_data), store.get(url, "price_url") or ""
+
+def scrape_watch_incremental(url, store, previous_data, images_folder):
+    """
+    Scrape une montre en s'appuyant sur les empreintes du run précédent :
+      - page HTML identique => on réutilise la fiche précédente sans re-parser,
+      - le JSON des prix est toujours revalidé (il évolue indépendamment de la page),
+      - l'image n'est retéléchargée que si son URL a changé ou si le fichier manque.
+    """
+    html, page_changed = fetch_watch_page(url, store)
+    if not page_changed and previous_data:
+        watch_data, price_url = reuse_previous_record(url, store, previous_data)
+    else:
+        watch_data, price_url = parse_watch_html(html, url)
+        store.set(url, "price_url", price_url)
+    return complete_watch(url, watch_data, price_url, store, images_folder)
+
+def complete_watch(url, watch_data, price_url, store, images_folder):
+    """
+    Complète une fiche parsée (ou reprise) : JSON des prix revalidé, image
+    téléchargée si besoin. Retourne la fiche.
+    """
+    if price_url:
+        watch_data["prices"] = fetch_prices(price_url)
+        store.update(url, "prices", json.dumps(watch_data["prices"], sort_keys=True))
+
+    # L'image n'est retéléchargée que si son URL a changé (voir ImageStore.save)
+    file_prefix = build_file_prefix(watch_data, url)
+    watch_data["local_image_path"] = save_image(
+        image_url=watch_data["image_url"],
+        images_folder=images_folder,
+        filename_prefix=file_prefix
+    )
+    entry = get_image_store(images_folder).lookup(file_prefix)
+    if watch_data["local_image_path"] and entry:
+        store.set(url, "image", entry["sha256"])
+
+    return watch_data
+
+def main(output_format="json", resume=False):
+    """
+    output_format :
+      - "json"  : toutes les fiches sont écrites à la fin dans all_watches.json,
+      - "jsonl" : chaque fiche est ajoutée à all_watches.jsonl dès qu'elle est
+        prête (une ligne compacte, flush + fsync), puis exportée en JSON.
+    resume (mode jsonl) : saute les URLs déjà présentes dans le JSONL.
+    """
     # S’assure que le dossier de base existe
     os.makedirs(BASE_SAVE_DIR, exist_ok=True)
 
@@ -225,54 +375,104 @@ def main():
     images_folder = os.path.join(BASE_SAVE_DIR, IMAGES_SUBFOLDER)
     os.makedirs(images_folder, exist_ok=True)
 
-    # Liste pour stocker les données de toutes les montres
-    all_watches_data = []
-
-    for url in WATCH_URLS:
-        print(f"Scraping {url} ...")
-        try:
-            watch_data = parse_watch(url)
-        except Exception as e:
-            print(f"Échec du scraping pour {url} : {e}")
-            continue
-
-        # Construit un préfixe de nom de fichier à partir de brand + référence
-        brand_clean = watch_data["brand"].lower().replace(" ", "-").replace("&", "and").replace("'", "")
-        ref_clean = watch_data["reference"].lower().replace(" ", "-").replace("/", "-")
-        if not brand_clean:
-            brand_clean = "unknownbrand"
-        if not ref_clean:
-            # Si pas de référence, on utilise la dernière partie de l'URL
-            ref_clean = url.strip("/").split("/")[-1]
-
-        file_prefix = f"{brand_clean}_{ref_clean}"
-
-        # Téléchargement de l'image
-        local_image_path = save_image(
-            image_url=watch_data["image_url"],
-            images_folder=images_folder,
-            filename_prefix=file_prefix
-        )
-        # On stocke le chemin local dans le dict
-        watch_data["local_image_path"] = local_image_path
-
-        # On ajoute la montre à la liste globale
-        all_watches_data.append(watch_data)
-
-        # Petite pause (2s) pour éviter les requêtes trop rapides
-        time.sleep(2)
+    store = FingerprintStore(os.path.join(BASE_SAVE_DIR, FINGERPRINTS_FILENAME))
+    previous_records = load_previous_records()
+
+    # Mode streaming : fichier JSONL ouvert en ajout, reprise éventuelle
+    done_urls = set()
+    if output_format == "jsonl" and resume:
+        jsonl_path = os.path.join(BASE_SAVE_DIR, JSONL_FILENAME)
+        done_urls = load_done_urls(jsonl_path)
+        print(f"Reprise : {len(done_urls)} montre(s) déjà présente(s) dans {jsonl_path}")
+    results = ScrapeResults(store, jsonl=output_format == "jsonl", resume=resume)
+
+    try:
+        for url in WATCH_URLS:
+            if url in done_urls:
+                continue
+            print(f"Scraping {url} ...")
+            try:
+                watch_data = scrape_watch_incremental(url, store, previous_records.get(url), images_folder)
+            except Exception as e:
+                print(f"Échec du scraping pour {url} : {e}")
+                # On conserve la fiche précédente plutôt que de la perdre
+                if url in previous_records:
+                    results.add(url, previous_records[url])
+                continue
 
-    # À la fin, on exporte toutes les montres dans un SEUL fichier JSON
-    final_output_path = os.path.join(BASE_SAVE_DIR, "all_watches.json")
-    data_to_write = {
-        "watches": all_watches_data
-    }
+            results.add(url, watch_data)
 
-    with open(final_output_path, "w", encoding="utf-8") as f:
-        json.dump(data_to_write, f, ensure_ascii=False, indent=4)
+            # Petite pause (2s) pour éviter les requêtes trop rapides
+            time.sleep(2)
+    finally:
+        results.close()
 
-    print(f"\nFichier JSON global créé : {final_output_path}")
+    results.finish(WATCH_URLS)
     print("Terminé !")
 
+def reparse_archive(parse_workers=None):
+    """
+    Reparse toutes les pages archivées (pool de processus, aucun accès
+    réseau), par exemple après un changement de sélecteurs. Les prix et
+    l'image du run précédent sont conservés (l'image seulement si son URL
+    n'a pas changé). Réécrit all_watches.json, le catalogue, le changeset
+    et l'historique des prix (ScrapeResults), comme main().
+    """
+    archive = get_page_archive()
+    print(f"Reparsing de {archive.stats()['pages']} page(s) archivée(s) ...")
+    start = time.monotonic()
+
+    store = FingerprintStore(os.path.join(BASE_SAVE_DIR, FINGERPRINTS_FILENAME))
+    previous_records = load_previous_records()
+    results = ScrapeResults(store)
+    missing_images = 0
+    with ParsePool(parse_workers, PARSER_BACKEND) as pool:
+        for url, watch_data, price_url, error in pool.imap(archive.iter_pages()):
+            previous = previous_records.get(url)
+            if error is not None:
+                print(f"Échec du parsing pour {url} : {error}")
+                # On conserve la fiche précédente plutôt que de la perdre
+                if previous is None:
+                    continue
+                watch_data = previous
+            else:
+                previous = previous or {}
+                watch_data["prices"] = previous.get("prices", [])
+                if previous.get("image_url") == watch_data["image_url"]:
+                    watch_data["local_image_path"] = previous.get("local_image_path", "")
+                else:
+                    watch_data["local_image_path"] = ""
+                    missing_images += 1
+                store.set(url, "price_url", price_url)
+            results.add(url, watch_data)
+
+    # Aucune URL n'est supprimée : l'archive ne contient que les pages du catalogue
+    results.finish()
+    print(f"{len(results.records_by_url)} fiche(s) reparsée(s) en {time.monotonic() - start:.1f}s")
+    if missing_images:
+        print(f"{missing_images} image(s) dont l'URL a changé : relancer le scraping pour les télécharger")
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scraping des fiches watchbase.")
+    parser.add_argument("--output", choices=["json", "jsonl"], default="json",
+                        help="json : un fichier à la fin ; jsonl : une ligne par montre au fil de l'eau")
+    parser.add_argument("--resume", action="store_true",
+                        help="(jsonl) reprendre en sautant les URLs déjà présentes")
+    parser.add_argument("--export-json", action="store_true",
+                        help="convertir all_watches.jsonl en all_watches.json puis quitter")
+    parser.add_argument("--reparse", action="store_true",
+                        help="reparser toutes les pages archivées, sans retélécharger")
+    parser.add_argument("--parse-workers", type=int,
+                        help="(--reparse) processus de parsing (défaut : nb de CPU)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    if args.export_json:
+        count = export_jsonl_to_json(os.path.join(BASE_SAVE_DIR, JSONL_FILENAME),
+                                     os.path.join(BASE_SAVE_DIR, "all_watches.json"))
+        print(f"{count} montre(s) exportée(s)")
+    elif args.reparse:
+        with profiling_session(args):
+            reparse_archive(args.parse_workers)
+    else:
+        with profiling_session(args):
+            main(output_format=args.output, resume=args.resume)
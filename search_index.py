@@ -0,0 +1,413 @@
+import os
+import re
+import json
+import gzip
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import unicodedata
+from collections import defaultdict
+from urllib.parse import quote
+
+import article_generation
+from article_generation import catalog_path, get_build_manifest
+from catalog_stream import iter_catalog
+from catalog_db import CatalogDB
+from price_store import catalog_key
+from renderer import TEMPLATES_DIR, load_template
+
+# Index de recherche (à côté de all_watches.json) : documents et listes inversées
+SEARCH_INDEX_FILENAME = "search_index.sqlite"
+# Fichiers servis au navigateur, dans OUTPUT_DIR
+SEARCH_SUBDIR = "search"
+SEARCH_SCRIPT = "search.js"
+# Un fragment de l'index par préfixe de N caractères des termes
+SHARD_PREFIX_LENGTH = 2
+# Fiches résumées par fragment de documents
+DOC_SHARD_SIZE = 500
+# Ordre des champs d'un document dans les fragments de documents
+DOC_FIELDS = ["title", "href", "brand", "family", "reference"]
+# Champs indexés de chaque page
+INDEXED_FIELDS = ["brand", "family", "reference", "name", "caliber", "material", "title", "description"]
+MIN_TOKEN_LENGTH = 2
+STOPWORDS = {
+    "au", "aux", "avec", "ce", "ces", "dans", "de", "des", "du", "elle", "en", "et", "il", "la", "le", "les",
+    "leur", "ou", "par", "pas", "plus", "pour", "qui", "que", "sa", "se", "ses", "son", "sur", "un", "une",
+    "and", "the", "of", "with",
+}
+# Pages de listes à facettes, dans OUTPUT_DIR
+BRANDS_PAGE = "marques.html"
+LISTING_PAGE_TEMPLATE = "listing_page.html"
+LISTING_ITEM_TEMPLATE = "listing_item.html"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    doc_hash TEXT NOT NULL,
+    doc_json TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    family TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_facet ON docs (brand, family);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (token, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+
+# --------------------------------------------------------------------------
+# Documents et termes
+# --------------------------------------------------------------------------
+def normalize_text(text):
+    """
+    Minuscules, sans accents : « Söhne » -> « sohne ».
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9]+", normalize_text(text))
+            if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS]
+
+
+def slugify(text):
+    return "-".join(re.findall(r"[a-z0-9]+", normalize_text(text))) or "inconnu"
+
+
+def extract_doc(watch, path, meta_data):
+    """
+    Données indexées d'une page : fiche (marque, famille, référence, nom,
+    calibre, matériau) et SEO généré (H1, meta description).
+    """
+    return {
+        "title": meta_data.get("h1") or f"{watch.get('brand', '')} {watch.get('name', '')}",
+        "href": quote(os.path.basename(path)),
+        "brand": watch.get("brand", ""),
+        "family": watch.get("family", ""),
+        "reference": watch.get("reference", ""),
+        "name": watch.get("name", ""),
+        "caliber": watch.get("movement", {}).get("caliber", ""),
+        "material": watch.get("case", {}).get("material", ""),
+        "description": meta_data.get("meta_description", ""),
+    }
+
+
+def doc_tokens(doc):
+    """
+    Termes distincts d'un document ; la référence est aussi indexée d'un
+    seul tenant (« 15202st-oo-0944st-01 » -> « 15202stoo0944st01 »).
+    """
+    tokens = set()
+    for field in INDEXED_FIELDS:
+        tokens.update(tokenize(doc[field]))
+    compact_reference = "".join(re.findall(r"[a-z0-9]+", normalize_text(doc["reference"])))
+    if len(compact_reference) >= MIN_TOKEN_LENGTH:
+        tokens.add(compact_reference)
+    return tokens
+
+
+def shard_prefix(token):
+    return token[:SHARD_PREFIX_LENGTH]
+
+
+def brand_page(brand):
+    return f"marque_{slugify(brand)}.html"
+
+
+def family_page(brand, family):
+    return f"famille_{slugify(brand)}_{slugify(family)}.html"
+
+
+# --------------------------------------------------------------------------
+# Écriture des fichiers statiques
+# --------------------------------------------------------------------------
+def _atomic_write(path, data):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_json_asset(path, payload):
+    """
+    Écrit `path` et sa version précompressée `path`.gz (servie telle quelle
+    par le serveur statique, ex. gzip_static de nginx).
+    """
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _atomic_write(path, data)
+    _atomic_write(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def remove_json_asset(path):
+    for name in (path, f"{path}.gz"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def delta_encode(ids):
+    """
+    [3, 4, 9] -> [3, 1, 5] : des petits entiers, plus compacts en JSON.
+    """
+    return [doc_id - previous for doc_id, previous in zip(ids, [0] + ids[:-1])]
+
+
+class SearchIndex:
+    """
+    Index de recherche incrémental : un document par page (clé catalog_key),
+    listes inversées terme -> ids de documents. sync() ne touche que les
+    documents modifiés et note les fragments, pages de facettes et
+    fragments de documents à réécrire ; write() ne réécrit que ceux-là.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.dirty_prefixes = set()
+        self.dirty_doc_shards = set()
+        self.dirty_facets = set()
+
+    def _mark(self, doc_id, doc_json, tokens):
+        doc = json.loads(doc_json)
+        self.dirty_prefixes.update(shard_prefix(token) for token in tokens)
+        self.dirty_doc_shards.add(doc_id // DOC_SHARD_SIZE)
+        self.dirty_facets.add((doc["brand"], doc["family"]))
+
+    def _old_tokens(self, doc_id):
+        return [row[0] for row in self.conn.execute("SELECT token FROM postings WHERE doc_id = ?", (doc_id,))]
+
+    def sync(self, docs):
+        """
+        Met l'index en phase avec `docs` ({clé: document}, toutes les pages
+        du site). Retourne (ajoutés ou modifiés, supprimés).
+        """
+        updated = removed = 0
+        with self.conn:
+            known = {key: (doc_id, doc_hash, doc_json) for key, doc_id, doc_hash, doc_json
+                     in self.conn.execute("SELECT key, id, doc_hash, doc_json FROM docs")}
+            for key, doc in docs.items():
+                doc_json = json.dumps(doc, ensure_ascii=False, sort_keys=True)
+                doc_hash = hashlib.sha256(doc_json.encode("utf-8")).hexdigest()
+                previous = known.get(key)
+                if previous is not None and previous[1] == doc_hash:
+                    continue
+                if previous is not None:
+                    doc_id = previous[0]
+                    self._mark(doc_id, previous[2], self._old_tokens(doc_id))
+                    self.conn.execute("UPDATE docs SET doc_hash = ?, doc_json = ?, brand = ?, family = ? WHERE id = ?",
+                                      (doc_hash, doc_json, doc["brand"], doc["family"], doc_id))
+                    self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                else:
+                    doc_id = self.conn.execute(
+                        "INSERT INTO docs (key, doc_hash, doc_json, brand, family) VALUES (?, ?, ?, ?, ?)",
+                        (key, doc_hash, doc_json, doc["brand"], doc["family"])
+                    ).lastrowid
+                tokens = doc_tokens(doc)
+                self.conn.executemany("INSERT INTO postings (token, doc_id) VALUES (?, ?)",
+                                      [(token, doc_id) for token in tokens])
+                self._mark(doc_id, doc_json, tokens)
+                updated += 1
+
+            for key in known.keys() - docs.keys():
+                doc_id, _, doc_json = known[key]
+                self._mark(doc_id, doc_json, self._old_tokens(doc_id))
+                self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+                removed += 1
+        return updated, removed
+
+    def mark_all_dirty(self):
+        """
+        Tout réécrire (premier build, ou fichiers de sortie supprimés).
+        """
+        self.dirty_prefixes.update(shard_prefix(row[0]) for row in self.conn.execute("SELECT DISTINCT token FROM postings"))
+        self.dirty_doc_shards.update(row[0] // DOC_SHARD_SIZE for row in self.conn.execute("SELECT id FROM docs"))
+        self.dirty_facets.update(self.conn.execute("SELECT DISTINCT brand, family FROM docs"))
+
+    # ----------------------------------------------------------------------
+    # Fichiers servis au navigateur
+    # ----------------------------------------------------------------------
+    def write(self, output_dir):
+        """
+        Réécrit les fragments, fragments de documents et pages de facettes
+        marqués, puis search/index.json. Retourne le nombre de fichiers écrits.
+        """
+        search_dir = os.path.join(output_dir, SEARCH_SUBDIR)
+        os.makedirs(os.path.join(search_dir, "docs"), exist_ok=True)
+        written = 0
+
+        for prefix in sorted(self.dirty_prefixes):
+            postings = defaultdict(list)
+            for token, doc_id in self.conn.execute(
+                "SELECT token, doc_id FROM postings WHERE token >= ? AND token < ? ORDER BY token, doc_id",
+                (prefix, prefix + "\x7f")
+            ):
+                postings[token].append(doc_id)
+            shard_path = os.path.join(search_dir, f"{prefix}.json")
+            if postings:
+                write_json_asset(shard_path, {token: delta_encode(ids) for token, ids in postings.items()})
+                written += 1
+            else:
+                remove_json_asset(shard_path)
+
+        for shard in sorted(self.dirty_doc_shards):
+            rows = self.conn.execute("SELECT id, doc_json FROM docs WHERE id >= ? AND id < ?",
+                                     (shard * DOC_SHARD_SIZE, (shard + 1) * DOC_SHARD_SIZE)).fetchall()
+            shard_path = os.path.join(search_dir, "docs", f"{shard}.json")
+            if rows:
+                payload = {}
+                for doc_id, doc_json in rows:
+                    doc = json.loads(doc_json)
+                    payload[str(doc_id)] = [doc[field] for field in DOC_FIELDS]
+                write_json_asset(shard_path, payload)
+                written += 1
+            else:
+                remove_json_asset(shard_path)
+
+        written += self.write_facets(output_dir)
+
+        shards = sorted({shard_prefix(row[0]) for row in self.conn.execute("SELECT DISTINCT token FROM postings")})
+        write_json_asset(os.path.join(search_dir, "index.json"), {
+            "version": 1,
+            "prefix_length": SHARD_PREFIX_LENGTH,
+            "min_token_length": MIN_TOKEN_LENGTH,
+            "stopwords": sorted(STOPWORDS),
+            "doc_shard_size": DOC_SHARD_SIZE,
+            "doc_fields": DOC_FIELDS,
+            "shards": shards,
+            "documents": self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+        })
+        shutil.copyfile(os.path.join(TEMPLATES_DIR, SEARCH_SCRIPT), os.path.join(search_dir, SEARCH_SCRIPT))
+
+        self.dirty_prefixes.clear()
+        self.dirty_doc_shards.clear()
+        self.dirty_facets.clear()
+        return written
+
+    def write_facets(self, output_dir):
+        """
+        Pages de liste par marque (familles) et par famille (montres),
+        et la page des marques si une marque a changé.
+        """
+        written = 0
+        for brand, family in sorted(self.dirty_facets):
+            docs = sorted((json.loads(row[0]) for row in self.conn.execute(
+                "SELECT doc_json FROM docs WHERE brand = ? AND family = ?", (brand, family))),
+                key=lambda doc: doc["title"])
+            path = os.path.join(output_dir, family_page(brand, family))
+            if docs:
+                items = [(doc["href"], doc["title"], doc["reference"]) for doc in docs]
+                write_listing(path, f"{brand} {family}", f"{len(docs)} montre(s) de la famille {family} ({brand})",
+                              items)
+                written += 1
+            elif os.path.exists(path):
+                os.remove(path)
+
+        for brand in sorted({brand for brand, _ in self.dirty_facets}):
+            families = self.conn.execute(
+                "SELECT family, COUNT(*) FROM docs WHERE brand = ? GROUP BY family ORDER BY family", (brand,)).fetchall()
+            path = os.path.join(output_dir, brand_page(brand))
+            if families:
+                items = [(quote(family_page(brand, family)), family or "Autres", f"{count} montre(s)")
+                         for family, count in families]
+                write_listing(path, brand, f"Les familles de montres {brand}", items)
+                written += 1
+            elif os.path.exists(path):
+                os.remove(path)
+
+        if self.dirty_facets:
+            brands = self.conn.execute("SELECT brand, COUNT(*) FROM docs GROUP BY brand ORDER BY brand").fetchall()
+            items = [(quote(brand_page(brand)), brand or "Autres", f"{count} montre(s)") for brand, count in brands]
+            write_listing(os.path.join(output_dir, BRANDS_PAGE), "Toutes les marques",
+                          "Les marques du guide des montres de luxe", items)
+            written += 1
+        return written
+
+    def stats(self):
+        return {
+            "documents": self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+            "terms": self.conn.execute("SELECT COUNT(DISTINCT token) FROM postings").fetchone()[0],
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def write_listing(path, h1, intro, items):
+    """
+    Page de liste (gabarits listing_page / listing_item) : `items` est une
+    liste de (lien, libellé, détail).
+    """
+    item_template = load_template(LISTING_ITEM_TEMPLATE)
+
+    def write_items(write):
+        for href, label, detail in items:
+            item_template.render_to(write, {"href": href, "label": label, "detail": detail})
+
+    page = load_template(LISTING_PAGE_TEMPLATE).render({
+        "title": f"{h1} - Guide des montres de luxe",
+        "meta_description": intro,
+        "h1": h1,
+        "intro": intro,
+        "home_href": BRANDS_PAGE,
+        "items": write_items,
+    })
+    _atomic_write(path, page.encode("utf-8"))
+
+
+# --------------------------------------------------------------------------
+# Étape de build
+# --------------------------------------------------------------------------
+def collect_docs(watches):
+    """
+    {clé: document} des montres dont la page est construite (d'après le
+    manifeste du build), sans relire les pages HTML.
+    """
+    pages = {key: (path, meta_data) for key, path, meta_data in get_build_manifest().iter_pages()}
+    docs = {}
+    for watch in watches:
+        key = catalog_key(watch)
+        if key in pages and os.path.exists(pages[key][0]):
+            docs[key] = extract_doc(watch, *pages[key])
+    return docs
+
+
+def build_search_index(watches, output_dir=None, rebuild=False):
+    """
+    Met à jour l'index de recherche et les pages de facettes de `output_dir`
+    (OUTPUT_DIR par défaut) ; seuls les fichiers touchés par des pages
+    ajoutées, modifiées ou supprimées sont réécrits.
+    """
+    output_dir = output_dir or article_generation.OUTPUT_DIR
+    index_path = os.path.join(os.path.dirname(article_generation.JSON_PATH), SEARCH_INDEX_FILENAME)
+    index = SearchIndex(index_path)
+    updated, removed = index.sync(collect_docs(watches))
+    if rebuild or not os.path.exists(os.path.join(output_dir, SEARCH_SUBDIR, "index.json")):
+        index.mark_all_dirty()
+    written = index.write(output_dir)
+    stats = index.stats()
+    index.close()
+    print(f"Index de recherche : {stats['documents']} page(s), {stats['terms']} terme(s) ; "
+          f"{updated} ajoutée(s)/modifiée(s), {removed} supprimée(s), {written} fichier(s) réécrit(s)")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index de recherche fragmenté et pages par marque / famille.")
+    parser.add_argument("--source", choices=["json", "jsonl", "sqlite"], default="json",
+                        help="json : all_watches.json ; jsonl : all_watches.jsonl ; sqlite : catalog.sqlite")
+    parser.add_argument("--rebuild", action="store_true", help="réécrire tous les fichiers de l'index")
+    args = parser.parse_args()
+    if args.source == "sqlite":
+        catalog = CatalogDB(article_generation.CATALOG_DB_PATH)
+        build_search_index(catalog.iter_watches(), rebuild=args.rebuild)
+        catalog.close()
+    else:
+        build_search_index(iter_catalog(catalog_path(args.source)), rebuild=args.rebuild)
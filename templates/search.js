@@ -0,0 +1,66 @@
+// Recherche côté client sur l'index fragmenté écrit par search_index.py :
+// seuls index.json, les fragments des termes de la requête et les
+// fragments de documents des résultats affichés sont téléchargés.
+// Usage : searchWatches("royal oak acier").then(results => ...)
+(function () {
+  var base = document.currentScript ? document.currentScript.src.replace(/[^/]*$/, "") : "search/";
+  var cache = {};
+
+  function load(path) {
+    if (!cache[path]) {
+      cache[path] = fetch(base + path).then(function (r) { return r.ok ? r.json() : {}; });
+    }
+    return cache[path];
+  }
+
+  // Même découpage que search_index.tokenize : les mots vides ne sont pas indexés
+  function tokenize(text, meta) {
+    var normalized = text.normalize("NFKD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
+    var stopwords = new Set(meta.stopwords || []);
+    return (normalized.match(/[a-z0-9]+/g) || []).filter(function (t) {
+      return t.length >= meta.min_token_length && !stopwords.has(t);
+    });
+  }
+
+  function decode(deltas) {
+    var ids = [], current = 0;
+    deltas.forEach(function (d) { current += d; ids.push(current); });
+    return ids;
+  }
+
+  // Ids des documents d'un terme ; le dernier terme de la requête sert de préfixe
+  function postings(meta, token, isPrefix) {
+    var prefix = token.slice(0, meta.prefix_length);
+    if (meta.shards.indexOf(prefix) < 0) return Promise.resolve(new Set());
+    return load(prefix + ".json").then(function (shard) {
+      var ids = new Set();
+      Object.keys(shard).forEach(function (term) {
+        if (term === token || (isPrefix && term.indexOf(token) === 0)) {
+          decode(shard[term]).forEach(function (id) { ids.add(id); });
+        }
+      });
+      return ids;
+    });
+  }
+
+  window.searchWatches = function (query, limit) {
+    limit = limit || 20;
+    return load("index.json").then(function (meta) {
+      var tokens = tokenize(query, meta);
+      if (!tokens.length) return [];
+      return Promise.all(tokens.map(function (t, i) { return postings(meta, t, i === tokens.length - 1); }))
+        .then(function (sets) {
+          var ids = Array.from(sets[0]).filter(function (id) {
+            return sets.every(function (s) { return s.has(id); });
+          }).sort(function (a, b) { return a - b; }).slice(0, limit);
+          return Promise.all(ids.map(function (id) {
+            return load("docs/" + Math.floor(id / meta.doc_shard_size) + ".json").then(function (docs) {
+              var doc = {};
+              meta.doc_fields.forEach(function (field, i) { doc[field] = docs[id][i]; });
+              return doc;
+            });
+          }));
+        });
+    });
+  };
+})();
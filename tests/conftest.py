@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import copy
+import tempfile
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Les modules lisent GUIDE_MONTRES_DIR à l'import : dossier jetable pour la session
+os.environ["GUIDE_MONTRES_DIR"] = tempfile.mkdtemp(prefix="guide_montres_tests_")
+# Les faux serveurs écoutent en local : jamais de proxy
+os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Dossier des données propre au test : chemins d'article_generation
+    redirigés vers tmp_path, stockages ouverts à la demande remis à zéro.
+    """
+    import article_generation
+
+    for name in dir(article_generation):
+        value = getattr(article_generation, name)
+        if name.endswith("_PATH") and isinstance(value, str):
+            monkeypatch.setattr(article_generation, name, str(tmp_path / os.path.basename(value)))
+    monkeypatch.setattr(article_generation, "OUTPUT_DIR", str(tmp_path / "output_pages"))
+    for name in ("_llm_cache", "_ledger", "_translation_memo", "_build_manifest", "_related_index"):
+        monkeypatch.setattr(article_generation, name, None)
+    os.makedirs(article_generation.OUTPUT_DIR)
+    yield tmp_path
+    for name in ("_llm_cache", "_ledger", "_translation_memo", "_build_manifest", "_related_index"):
+        store = getattr(article_generation, name)
+        if store is not None:
+            store.close()
+
+
+@pytest.fixture
+def make_watches():
+    """
+    make_watches(n) : n fiches distinctes (URL, nom, référence) tirées des
+    fiches de all_watches.json.
+    """
+    with open(os.path.join(REPO_DIR, "all_watches.json"), "r", encoding="utf-8") as f:
+        base = json.load(f)["watches"]
+
+    def make(count):
+        watches = []
+        for i in range(count):
+            watch = copy.deepcopy(base[i % len(base)])
+            watch["url"] = f"https://watchbase.com/tests/{i}"
+            watch["name"] = f"{watch['name']} N{i}"
+            watch["reference"] = f"{watch['reference']}-{i}"
+            watches.append(watch)
+        return watches
+
+    return make
+
+
+@pytest.fixture
+def fake_llm():
+    """
+    URL de base d'un faux serveur OpenAI (benchmarks/fake_openai_server.py).
+    """
+    from benchmarks import fake_openai_server
+
+    server, base_url = fake_openai_server.start_in_thread(latency=0.05, article_words=400)
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def save_dir(data_dir, monkeypatch):
+    """
+    Dossier des scrapers (BASE_SAVE_DIR) = dossier des données du test :
+    all_watches.json, catalogue, empreintes et archive au même endroit que
+    pour article_generation.
+    """
+    import scraper
+    import async_scraper
+    import frontier
+    import pipeline
+
+    for module in (scraper, async_scraper, frontier, pipeline):
+        monkeypatch.setattr(module, "BASE_SAVE_DIR", str(data_dir))
+    monkeypatch.setattr(pipeline, "OUTPUT_DIR", str(data_dir / "output_pages"))
+    monkeypatch.setattr(scraper, "_page_archive", None)
+    monkeypatch.setattr(scraper, "image_stores", {})
+    yield data_dir
+    if scraper._page_archive is not None:
+        scraper._page_archive.close()
@@ -0,0 +1,94 @@
+import os
+import json
+from types import SimpleNamespace
+
+import pytest
+from openai import OpenAI
+
+import article_generation
+from benchmarks.fake_openai_server import fake_completion
+from price_store import catalog_key
+
+# Marqueur des fiches dont la continuation n'apporte aucune section
+FAIL_MARKER = "CONTINUATION-VIDE"
+
+
+class ScriptedClient:
+    """
+    Client OpenAI synchrone qui répond comme le faux serveur (fake_completion),
+    sauf aux continuations des articles marqués FAIL_MARKER : réponse vide.
+    """
+
+    def __init__(self):
+        self.chat = self.completions = self.with_raw_response = self
+        self.rejected_prompts = []
+
+    def create(self, model, messages):
+        prompt = messages[0]["content"]
+        text = fake_completion(prompt, 250)
+        if FAIL_MARKER in prompt:
+            if "Écris UNIQUEMENT les nouvelles sections" in prompt:
+                self.rejected_prompts.append(prompt)
+                text = ""
+            else:
+                # Marqueur repris dans la fin de l'article, envoyée avec la continuation
+                text += f"\n<p>{FAIL_MARKER}</p>"
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4,
+                                total_tokens=(len(prompt) + len(text)) // 4)
+        response = SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return SimpleNamespace(parse=lambda: response, retries_taken=0)
+
+
+@pytest.fixture
+def llm_client(fake_llm, monkeypatch):
+    monkeypatch.setattr(article_generation, "client", OpenAI(base_url=fake_llm, api_key="fake"), raising=False)
+    # Le premier jet du faux modèle suffit : pas de complétion
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 100)
+
+
+def write_catalog(watches):
+    with open(article_generation.JSON_PATH, "w", encoding="utf-8") as f:
+        json.dump({"watches": watches}, f, ensure_ascii=False)
+
+
+def test_main_without_filters_or_changeset_collects_removed_pages(data_dir, llm_client, make_watches):
+    watches = make_watches(3)
+    write_catalog(watches)
+    assert not os.path.exists(article_generation.CHANGESET_PATH)
+
+    article_generation.main()
+
+    pages = {watch["url"]: article_generation.page_filename(watch) for watch in watches}
+    assert all(os.path.exists(path) for path in pages.values())
+
+    # Montre retirée du catalogue complet : sa page est supprimée sans changeset
+    write_catalog(watches[:2])
+    article_generation.main()
+
+    assert not os.path.exists(pages[watches[2]["url"]])
+    assert all(os.path.exists(pages[watch["url"]]) for watch in watches[:2])
+    manifest = article_generation.get_build_manifest()
+    assert {key for key, _, _ in manifest.iter_pages()} == {catalog_key(watch) for watch in watches[:2]}
+
+
+def test_rejected_continuation_skips_the_watch_and_is_not_cached(data_dir, make_watches, monkeypatch):
+    client = ScriptedClient()
+    monkeypatch.setattr(article_generation, "client", client, raising=False)
+    # Premier jet de 246 mots : une continuation par article
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 300)
+    watches = make_watches(3)
+    watches[1]["name"] += f" {FAIL_MARKER}"
+    write_catalog(watches)
+
+    article_generation.main()
+
+    written = [os.path.exists(article_generation.page_filename(watch)) for watch in watches]
+    assert written == [True, False, True]
+    assert len(client.rejected_prompts) == 1
+    cache = article_generation.get_llm_cache()
+    assert cache.get(article_generation.MODEL, article_generation.PROMPT_VERSION, client.rejected_prompts[0]) is None
+
+    # Run suivant : seule la montre en échec est retentée, sa continuation redemandée
+    article_generation.main()
+
+    assert len(client.rejected_prompts) == 2
@@ -0,0 +1,113 @@
+import os
+import json
+import asyncio
+import threading
+
+import pytest
+from openai import AsyncOpenAI
+
+import article_generation
+import async_generation
+from llm_cache import LLMCache
+from price_store import catalog_key
+
+# Marqueur des fiches dont l'article échoue (présent dans le prompt de l'article)
+FAIL_MARKER = "ÉCHEC-SIMULÉ"
+
+
+class StubClient:
+    """
+    Client asynchrone vers le faux serveur OpenAI, qui compte les appels en
+    cours et fait échouer ceux dont le prompt contient FAIL_MARKER.
+    """
+
+    def __init__(self, base_url):
+        self.client = AsyncOpenAI(base_url=base_url, api_key="fake", max_retries=0)
+        self.chat = self.completions = self.with_raw_response = self
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if any(FAIL_MARKER in message["content"] for message in kwargs["messages"]):
+                raise Exception("réponse du modèle en erreur")
+            return await self.client.chat.completions.with_raw_response.create(**kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def short_articles(monkeypatch):
+    # Le premier jet du faux modèle suffit : pas de complétion
+    monkeypatch.setattr(async_generation, "MIN_WORDS", 100)
+
+
+def generate(watches, client, concurrency):
+    return asyncio.run(async_generation.generate_all(watches, {}, concurrency=concurrency, client=client))
+
+
+def ledger_records():
+    with open(article_generation.LEDGER_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_generate_all_bounds_concurrency_and_isolates_failures(data_dir, fake_llm, short_articles, make_watches):
+    watches = make_watches(8)
+    watches[3]["name"] += f" {FAIL_MARKER}"
+    client = StubClient(fake_llm)
+
+    count, failures = generate(watches, client, concurrency=3)
+
+    assert client.max_in_flight == 3
+    # La montre en échec n'empêche pas les autres d'aller au bout
+    assert count == 7
+    assert [watch for watch, _ in failures] == [watches[3]]
+    pages = [name for name in os.listdir(article_generation.OUTPUT_DIR) if name.endswith(".html")]
+    assert len(pages) == 7
+
+    generated = [watch for i, watch in enumerate(watches) if i != 3]
+    manifest = article_generation.get_build_manifest()
+    assert {key for key, _, _ in manifest.iter_pages()} == {catalog_key(watch) for watch in generated}
+
+    records = ledger_records()
+    for stage in ("article", "seo"):
+        assert {record["watch"] for record in records if record["stage"] == stage} == \
+            {catalog_key(watch) for watch in generated}
+
+
+def test_generate_all_skips_pages_up_to_date_in_manifest(data_dir, fake_llm, short_articles, make_watches):
+    watches = make_watches(4)
+    count, failures = generate(watches, StubClient(fake_llm), concurrency=2)
+    assert (count, failures) == (4, [])
+
+    client = StubClient(fake_llm)
+    count, failures = generate(watches, client, concurrency=2)
+
+    assert (count, failures) == (0, [])
+    assert client.calls == 0
+
+
+def test_generate_all_keeps_disk_work_off_the_event_loop(data_dir, fake_llm, short_articles, make_watches,
+                                                        monkeypatch):
+    threads = {}
+
+    def tracked(name, func):
+        def wrapper(*args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(async_generation, "write_page", tracked("write_page", async_generation.write_page))
+    monkeypatch.setattr(async_generation, "record_page", tracked("record_page", async_generation.record_page))
+    monkeypatch.setattr(LLMCache, "put", tracked("cache_put", LLMCache.put))
+
+    count, failures = generate(make_watches(3), StubClient(fake_llm), concurrency=3)
+
+    assert (count, failures) == (3, [])
+    # asyncio.run fait tourner la boucle dans le thread principal
+    assert set(threads) == {"write_page", "record_page", "cache_put"}
+    assert threading.main_thread().ident not in set().union(*threads.values())
@@ -0,0 +1,182 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import async_scraper
+import http_client
+from benchmarks import fake_watchbase_server
+
+
+@pytest.fixture
+def watchbase():
+    """
+    Faux serveur watchbase qui note l'heure d'arrivée de chaque requête ;
+    `failures` : {chemin: (statut, en-têtes)} renvoyés à la première requête.
+    """
+    def start(latency=0.0, failures=None):
+        server = fake_watchbase_server.make_server(latency=latency)
+        lock = threading.Lock()
+        server.arrivals = []
+        server.failed = []
+        pending_failures = dict(failures or {})
+
+        class TrackingHandler(server.RequestHandlerClass):
+            def do_GET(self):
+                with lock:
+                    server.arrivals.append(time.monotonic())
+                    failure = pending_failures.pop(self.path, None)
+                    if failure is not None:
+                        server.failed.append(time.monotonic())
+                if failure is not None:
+                    status, headers = failure
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+        server.RequestHandlerClass = TrackingHandler
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def scrape(urls, **options):
+    return asyncio.run(async_scraper.scrape_all(urls, parse_workers=1, **options))
+
+
+def test_scrape_all_respects_host_rate(watchbase):
+    server, base_url = watchbase()
+    urls = fake_watchbase_server.catalog_urls(base_url, 8)
+    rate, burst = 20.0, 2
+
+    watches = scrape(urls, rate=rate, burst=burst, max_in_flight=16)
+
+    assert len(watches) == len(urls)
+    # Page, prix et image de chaque montre : un seul hôte, un seul seau
+    arrivals = sorted(server.arrivals)
+    assert len(arrivals) == 3 * len(urls)
+    for i, arrival in enumerate(arrivals[burst:], start=burst):
+        assert arrival - arrivals[0] >= (i - burst + 1) / rate - 0.05
+
+
+def test_retries_take_a_token_from_the_host_bucket(watchbase, monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    urls_count = 4
+    server, base_url = watchbase(failures={f"/watch/{i}": (503, {}) for i in range(urls_count)})
+    urls = fake_watchbase_server.catalog_urls(base_url, urls_count)
+    rate, burst = 20.0, 2
+
+    watches = scrape(urls, rate=rate, burst=burst, max_in_flight=16)
+
+    assert len(watches) == len(urls)
+    # Les nouvelles tentatives comptent dans le débit de l'hôte
+    arrivals = sorted(server.arrivals)
+    assert len(arrivals) == 4 * len(urls)
+    for i, arrival in enumerate(arrivals[burst:], start=burst):
+        assert arrival - arrivals[0] >= (i - burst + 1) / rate - 0.05
+
+
+def test_retry_after_pauses_the_whole_host(watchbase):
+    server, base_url = watchbase(failures={"/watch/0": (429, {"Retry-After": "1"})})
+    urls = fake_watchbase_server.catalog_urls(base_url, 8)
+
+    watches = scrape(urls, rate=20.0, burst=1, max_in_flight=16)
+
+    assert len(watches) == len(urls)
+    # Aucune requête vers l'hôte pendant le Retry-After (sauf celles déjà en vol)
+    [failed_at] = server.failed
+    assert not [arrival for arrival in server.arrivals if failed_at + 0.2 < arrival < failed_at + 0.9]
+    assert max(server.arrivals) >= failed_at + 0.9
+
+
+def test_scrape_all_caps_requests_in_flight(watchbase, monkeypatch):
+    _, base_url = watchbase(latency=0.05)
+    urls = fake_watchbase_server.catalog_urls(base_url, 6)
+    # Compté côté client : le serveur voit une requête finir après l'envoi de sa réponse
+    lock = threading.Lock()
+    calls = {"in_flight": 0, "max": 0}
+
+    def tracked(func):
+        def wrapper(*args, **kwargs):
+            with lock:
+                calls["in_flight"] += 1
+                calls["max"] = max(calls["max"], calls["in_flight"])
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    calls["in_flight"] -= 1
+        return wrapper
+
+    for name in ("fetch_raw_page", "fetch_prices", "save_image"):
+        monkeypatch.setattr(async_scraper, name, tracked(getattr(async_scraper, name)))
+
+    watches = scrape(urls, rate=1000.0, burst=1000, max_in_flight=3)
+
+    assert len(watches) == len(urls)
+    assert calls["max"] == 3
+
+
+def test_scrape_all_returns_complete_records_in_order(watchbase):
+    server, base_url = watchbase()
+    urls = fake_watchbase_server.catalog_urls(base_url, 8)
+
+    watches = scrape(urls, rate=1000.0, burst=1000, max_in_flight=4)
+
+    assert [watch["url"] for watch in watches] == urls
+    for watch in watches:
+        assert watch["brand"] and watch["reference"]
+        assert watch["prices"]
+        assert watch["local_image_path"]
+    assert server.stats["watch"] == server.stats["prices"] == server.stats["images"] == len(urls)
+
+
+def test_scrape_all_skips_failed_watches(watchbase):
+    server, base_url = watchbase()
+    urls = fake_watchbase_server.catalog_urls(base_url, 3) + [f"{base_url}/missing/0"]
+
+    watches = scrape(urls, rate=1000.0, burst=1000, max_in_flight=4)
+
+    assert [watch["url"] for watch in watches] == urls[:3]
+
+
+class RecordingPool:
+    """
+    Pool de parsing factice : note la taille de chaque paquet envoyé.
+    """
+
+    def __init__(self, chunksize):
+        self.chunksize = chunksize
+        self.batches = []
+
+    def submit(self, pages):
+        self.batches.append(len(pages))
+        future = Future()
+        future.set_result([(url, {"html": html}, "", None) for url, html in pages])
+        return future
+
+
+def test_parse_batcher_sends_pages_in_batches():
+    pool = RecordingPool(chunksize=4)
+
+    async def parse_all():
+        parser = async_scraper.ParseBatcher(pool, delay=0.01)
+        return await asyncio.gather(*(parser.parse(f"url{i}", f"page{i}") for i in range(10)))
+
+    results = asyncio.run(parse_all())
+
+    # Deux paquets pleins, le reste envoyé au bout du délai
+    assert pool.batches == [4, 4, 2]
+    assert [(url, watch_data["html"]) for url, watch_data, _, _ in results] == \
+        [(f"url{i}", f"page{i}") for i in range(10)]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from openai import OpenAI
+
+import article_generation
+import batch_generation
+from price_store import catalog_key
+from renderer import render_pages
+
+# Marqueur des fiches dont l'article échoue dans le lot (présent dans son prompt)
+FAIL_MARKER = "ÉCHEC-SIMULÉ"
+
+
+class FailingClient:
+    """
+    Client OpenAI synchrone vers le faux serveur, en échec sur les prompts
+    qui contiennent FAIL_MARKER.
+    """
+
+    def __init__(self, base_url):
+        self.client = OpenAI(base_url=base_url, api_key="fake", max_retries=0)
+        self.chat = self.completions = self
+        self.prompts = []
+
+    def create(self, model, messages):
+        self.prompts.append(messages[0]["content"])
+        if FAIL_MARKER in messages[0]["content"]:
+            raise Exception("réponse du modèle en erreur")
+        return self.client.chat.completions.create(model=model, messages=messages)
+
+
+@pytest.fixture
+def batch_dir(data_dir, monkeypatch):
+    monkeypatch.setattr(batch_generation, "BATCH_DIR", str(data_dir / "batches"))
+    # Article du premier jet trop court : lots d'extensions avant le SEO
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 600)
+    return data_dir / "batches"
+
+
+def test_run_batches_then_render_pages_skips_the_failed_item(batch_dir, fake_llm, make_watches):
+    watches = make_watches(4)
+    watches[2]["name"] += f" {FAIL_MARKER}"
+    client = FailingClient(fake_llm)
+    backend = batch_generation.LocalBatchBackend(str(batch_dir / "local"), client)
+
+    batch_generation.run_batches(lambda: iter(watches), backend, poll_interval=0)
+
+    # Le prompt en échec n'est soumis qu'une fois
+    assert sum(FAIL_MARKER in prompt for prompt in client.prompts) == 1
+    assert not os.path.exists(batch_generation.state_path())
+
+    failures = []
+    count = render_pages(batch_generation.page_jobs(iter(watches), {}, failures=failures), workers=1)
+    article_generation.get_build_manifest().commit()
+
+    assert count == 3
+    assert failures == [watches[2]]
+    generated = [watch for i, watch in enumerate(watches) if i != 2]
+    pages = sorted(name for name in os.listdir(article_generation.OUTPUT_DIR) if name.endswith(".html"))
+    assert pages == sorted(os.path.basename(article_generation.page_filename(watch)) for watch in generated)
+    for watch in generated:
+        with open(article_generation.page_filename(watch), "r", encoding="utf-8") as f:
+            assert article_generation.count_words(f.read()) >= 600
+    generated_keys = {catalog_key(watch) for watch in generated}
+    assert {key for key, _, _ in article_generation.get_build_manifest().iter_pages()} == generated_keys
+
+    # Toutes les autres réponses sont en cache : un nouveau run ne resoumet que la montre en échec
+    client.prompts.clear()
+    batch_generation.run_batches(lambda: iter(watches), backend, poll_interval=0,
+                                 needs_generation=lambda watch: catalog_key(watch) not in generated_keys)
+    assert client.prompts and all(FAIL_MARKER in prompt for prompt in client.prompts)
@@ -0,0 +1,92 @@
+import io
+import json
+import urllib.request
+from contextlib import redirect_stdout
+
+import pytest
+from openai import OpenAI
+
+from benchmarks import fake_openai_server, fake_watchbase_server, run_benchmarks
+from parsers import PARSER_BACKENDS
+
+
+@pytest.fixture
+def watchbase():
+    server, base_url = fake_watchbase_server.start_in_thread()
+    yield server, base_url
+    server.shutdown()
+
+
+def fetch(url):
+    with urllib.request.urlopen(url) as resp:
+        return resp.read()
+
+
+def test_fake_watchbase_serves_a_distinct_deterministic_catalog(watchbase):
+    server, base_url = watchbase
+    fixtures = len(server.RequestHandlerClass.fixtures)
+    parse = PARSER_BACKENDS["bs4"]
+
+    urls = fake_watchbase_server.catalog_urls(base_url, fixtures + 2)
+    parsed = [parse(fetch(url).decode("utf-8"), url) for url in urls]
+    watches = [watch for watch, _ in parsed]
+
+    assert len({watch["reference"] for watch in watches}) == len(urls)
+    assert watches[fixtures]["reference"] == f"{watches[0]['reference']}-{fixtures}"
+    assert fetch(urls[1]) == fetch(urls[1])
+    assert watches[1]["image_url"].startswith(f"{base_url}/images/")
+    image = fetch(watches[1]["image_url"])
+    assert len(image) == fake_watchbase_server.IMAGE_BYTES
+    assert image != fetch(watches[2]["image_url"])
+    price_url = parsed[fixtures][1]
+    assert price_url == f"{base_url}/prices/{fixtures}"
+    assert json.loads(fetch(price_url)) == json.loads(fetch(price_url))
+    assert server.stats == {"watch": fixtures + 4, "prices": 2, "images": 2,
+                            "bytes": server.stats["bytes"]}
+
+
+def test_fake_llm_is_deterministic_and_streams_the_same_text():
+    server, base_url = fake_openai_server.start_in_thread(article_words=500)
+    try:
+        client = OpenAI(base_url=base_url, api_key="fake", max_retries=0)
+        messages = [{"role": "user", "content": "Rédige l'article de la montre X"}]
+
+        first = client.chat.completions.create(model="fake", messages=messages)
+        second = client.chat.completions.create(model="fake", messages=messages)
+        stream = client.chat.completions.create(model="fake", messages=messages, stream=True,
+                                                stream_options={"include_usage": True})
+        chunks = list(stream)
+    finally:
+        server.shutdown()
+
+    text = first.choices[0].message.content
+    assert text == second.choices[0].message.content
+    assert text.count("<h2>") == 2
+    assert "".join(chunk.choices[0].delta.content for chunk in chunks if chunk.choices) == text
+    assert chunks[-1].usage.completion_tokens == first.usage.completion_tokens > 0
+    assert server.stats["requests"] == 3
+
+
+def test_quick_suite_writes_comparable_results(tmp_path, monkeypatch):
+    monkeypatch.setitem(run_benchmarks.QUICK, "parser_repeat", 1)
+    monkeypatch.setitem(run_benchmarks.QUICK, "render_pages", 10)
+    output = str(tmp_path / "results.json")
+
+    with redirect_stdout(io.StringIO()):
+        run_benchmarks.main(quick=True, sizes=[10], output=output)
+    with open(output, "r", encoding="utf-8") as f:
+        report = json.load(f)
+
+    assert report["quick"] is True
+    assert set(report["environment"]) >= {"git_commit", "python", "cpu_count"}
+    measures = run_benchmarks.flatten(report["benchmarks"])
+    assert measures["parser.pages_per_sec.bs4"] > 0
+    assert measures["render.pages_per_sec.stream"] > 0
+    assert measures["pipeline.10.http.watch"] == 20
+    assert sum(value for name, value in measures.items() if name.endswith(".failures")) == 0
+
+    printed = io.StringIO()
+    with redirect_stdout(printed):
+        run_benchmarks.compare(output, report["benchmarks"])
+    assert "parser.pages_per_sec.bs4" in printed.getvalue()
+    assert "x1.00" in printed.getvalue()
@@ -0,0 +1,81 @@
+import pytest
+
+from catalog_db import CatalogDB
+from price_store import catalog_key
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    db = CatalogDB(str(tmp_path / "catalog.sqlite"))
+    yield db
+    db.close()
+
+
+def keys(watches):
+    return [catalog_key(watch) for watch in watches]
+
+
+def test_watches_round_trip_through_tables(catalog, make_watches):
+    watches = make_watches(6)
+    for watch in watches:
+        catalog.upsert_watch(watch)
+
+    assert list(catalog.iter_watches()) == watches
+    assert list(catalog.iter_urls()) == keys(watches)
+    # Une ligne de prix par point valide de la série
+    prices = catalog.conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+    assert prices > 0
+
+
+def test_iter_watches_filters(catalog, make_watches):
+    watches = make_watches(12)
+    for watch in watches:
+        catalog.upsert_watch(watch)
+    brand = watches[1]["brand"]
+    catalog.conn.execute("UPDATE watches SET updated_at = '2020-01-01T00:00:00'")
+    catalog.conn.execute("UPDATE watches SET updated_at = '2025-06-01T00:00:00' WHERE url = ?",
+                         (catalog_key(watches[5]),))
+    catalog.conn.commit()
+
+    assert keys(catalog.iter_watches(brand=brand)) == keys(w for w in watches if w["brand"] == brand)
+    assert keys(catalog.iter_watches(brand=brand, family=watches[1]["family"])) == \
+        keys(w for w in watches if w["brand"] == brand and w["family"] == watches[1]["family"])
+    assert keys(catalog.iter_watches(reference=watches[7]["reference"])) == keys([watches[7]])
+    assert keys(catalog.iter_watches(changed_since="2025-01-01")) == keys([watches[5]])
+
+
+def test_pending_follows_content_changes(catalog, make_watches):
+    watches = make_watches(3)
+    for watch in watches:
+        catalog.upsert_watch(watch)
+    assert keys(catalog.iter_watches(pending=True)) == keys(watches)
+
+    for watch in watches:
+        catalog.mark_generated(watch)
+    assert list(catalog.iter_watches(pending=True)) == []
+
+    # Même contenu : ni updated_at ni l'état « à générer » ne bougent
+    before = catalog.conn.execute("SELECT updated_at FROM watches WHERE url = ?", (catalog_key(watches[0]),)).fetchone()[0]
+    catalog.upsert_watch(dict(watches[0], local_image_path="/ailleurs.jpg"))
+    after = catalog.conn.execute("SELECT updated_at FROM watches WHERE url = ?", (catalog_key(watches[0]),)).fetchone()[0]
+    assert after == before
+    assert list(catalog.iter_watches(pending=True)) == []
+
+    changed = dict(watches[1], description="Nouvelle description")
+    catalog.upsert_watch(changed)
+    assert list(catalog.iter_watches(pending=True)) == [changed]
+
+
+def test_delete_watches_cascades(catalog, make_watches):
+    watches = make_watches(3)
+    for watch in watches:
+        catalog.upsert_watch(watch)
+
+    catalog.delete_watches([catalog_key(watches[0])])
+
+    assert catalog.urls() == set(keys(watches[1:]))
+    for table in ("movements", "cases", "dials"):
+        assert catalog.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 2
+    orphans = catalog.conn.execute(
+        "SELECT COUNT(*) FROM prices WHERE watch_id NOT IN (SELECT id FROM watches)").fetchone()[0]
+    assert orphans == 0
@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from catalog_stream import iter_json_array
+
+WATCHES = [
+    {"brand": "Omega", "price": 2.5e3, "diameter": 41.5, "year": 12345, "ratio": -1.25e-3},
+    {"brand": "Rolex", "prices": [10, 7250.75, 3e2], "water_resistance": 300, "limited": False},
+]
+# Nombres décodés seuls (hors d'une fiche) : clés ignorées, tableaux de nombres
+DOCUMENT = {"version": 2.5e3, "watches": WATCHES, "scores": [12345.25, -7, 2.5e3, 1e-05, 0], "count": 12345}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_numbers_cut_at_a_chunk_boundary_are_decoded_whole(tmp_path, chunk_size, indent):
+    path = tmp_path / "all_watches.json"
+    path.write_text(json.dumps(DOCUMENT, indent=indent), encoding="utf-8")
+
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == WATCHES
+    assert list(iter_json_array(str(path), key="scores", chunk_size=chunk_size)) == DOCUMENT["scores"]
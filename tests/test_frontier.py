@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+import frontier
+from frontier import MAX_ATTEMPTS, Frontier, classify_url, shard_of
+
+
+def reference_urls(count):
+    return [f"https://watchbase.com/rolex/submariner/ref-{i}" for i in range(count)]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "frontier.sqlite")
+
+
+def test_add_deduplicates_and_assigns_stable_shards(db_path):
+    crawl = Frontier(db_path, num_shards=3)
+    urls = reference_urls(12)
+
+    assert crawl.add([(url, "reference") for url in urls]) == 12
+    assert crawl.add([(url, "reference") for url in urls[:5]] + [("https://watchbase.com/rolex", "brand")]) == 1
+
+    claimed = {}
+    for shard in range(3):
+        claimed[shard] = crawl.claim(shard, batch_size=100)
+        assert all(shard_of(url, 3) == shard for url, _, _ in claimed[shard])
+    assert sorted(url for rows in claimed.values() for url, _, _ in rows) == \
+        sorted(urls + ["https://watchbase.com/rolex"])
+    crawl.close()
+
+
+def test_claim_serves_references_before_listings(db_path):
+    crawl = Frontier(db_path)
+    crawl.add([("https://watchbase.com/rolex", "brand")], depth=0)
+    crawl.add([("https://watchbase.com/rolex/submariner", "family")], depth=1)
+    crawl.add([(url, "reference") for url in reference_urls(2)], depth=2)
+
+    kinds = [kind for _, kind, _ in crawl.claim(batch_size=10)]
+
+    assert kinds == ["reference", "reference", "family", "brand"]
+    crawl.close()
+
+
+def test_concurrent_claims_never_hand_out_a_url_twice(db_path):
+    urls = reference_urls(200)
+    setup = Frontier(db_path)
+    setup.add([(url, "reference") for url in urls])
+    setup.close()
+    claimed = []
+    lock = threading.Lock()
+
+    def worker():
+        # Une connexion par worker, comme des processus de shard distincts
+        crawl = Frontier(db_path)
+        while True:
+            rows = crawl.claim(batch_size=7)
+            if not rows:
+                break
+            with lock:
+                claimed.extend(url for url, _, _ in rows)
+        crawl.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(urls)
+
+
+def test_failed_urls_are_retried_up_to_max_attempts(db_path):
+    crawl = Frontier(db_path)
+    [url] = reference_urls(1)
+    crawl.add([(url, "reference")])
+
+    for _ in range(MAX_ATTEMPTS):
+        assert [row[0] for row in crawl.claim()] == [url]
+        crawl.mark_failed(url)
+
+    assert crawl.claim() == []
+    assert crawl.stats() == {"failed": 1}
+    assert crawl.is_exhausted()
+    crawl.close()
+
+
+def test_stale_claims_are_requeued(db_path, monkeypatch):
+    crawl = Frontier(db_path)
+    [url] = reference_urls(1)
+    crawl.add([(url, "reference")])
+    crawl.claim()
+    assert crawl.claim() == [] and not crawl.is_exhausted()
+
+    monkeypatch.setattr(frontier, "STALE_CLAIM_SECONDS", -1)
+    crawl.requeue_stale()
+
+    assert [row[0] for row in crawl.claim()] == [url]
+    crawl.close()
+
+
+def test_frontier_refuses_another_shard_count_or_host(db_path, monkeypatch):
+    Frontier(db_path, num_shards=2).close()
+
+    with pytest.raises(ValueError):
+        Frontier(db_path, num_shards=3)
+
+    monkeypatch.setattr(frontier.socket, "gethostname", lambda: "autre-machine")
+    with pytest.raises(Exception, match="appartient à la machine"):
+        Frontier(db_path, num_shards=2)
+
+
+def test_classify_url():
+    assert classify_url("https://watchbase.com/rolex") == "brand"
+    assert classify_url("https://watchbase.com/rolex/submariner") == "family"
+    assert classify_url("https://watchbase.com/rolex/submariner/116610ln") == "reference"
+    assert classify_url("https://watchbase.com/caliber/rolex") is None
+    assert classify_url("https://example.com/rolex") is None
@@ -0,0 +1,108 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+from http_client import HttpClient
+
+BODY = b"<html>page watchbase</html>"
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def server():
+    """
+    Serveur HTTP/1.1 local : /page avec ETag (304 si If-None-Match
+    correspond), /flaky en 503 sur ses deux premières requêtes, /down
+    toujours en 503. Note les requêtes et les connexions (ports clients).
+    """
+    state = {"requests": [], "ports": set(), "flaky": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with lock:
+                state["requests"].append((self.path, dict(self.headers)))
+                state["ports"].add(self.client_address[1])
+            if self.path == "/page":
+                if self.headers.get("If-None-Match") == ETAG:
+                    self.reply(304, headers={"ETag": ETAG})
+                else:
+                    self.reply(200, BODY, {"ETag": ETAG, "Content-Type": "text/html; charset=utf-8"})
+            elif self.path == "/flaky":
+                with lock:
+                    state["flaky"] += 1
+                    failing = state["flaky"] <= 2
+                if failing:
+                    self.reply(503)
+                else:
+                    self.reply(200, BODY)
+            elif self.path == "/down":
+                self.reply(503)
+            else:
+                self.reply(404)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield state
+    httpd.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.001)
+
+
+def test_revalidation_serves_unchanged_page_from_cache(server, tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path))
+
+    first = client.get(f"{server['url']}/page")
+    second = client.get(f"{server['url']}/page")
+
+    assert (first.status_code, first.from_cache) == (200, False)
+    assert (second.status_code, second.from_cache, second.content) == (200, True, BODY)
+    assert "If-None-Match" not in server["requests"][0][1]
+    assert server["requests"][1][1]["If-None-Match"] == ETAG
+
+
+def test_transient_errors_are_retried(server, tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path), max_retries=4)
+
+    resp = client.get(f"{server['url']}/flaky")
+
+    assert (resp.status_code, resp.content) == (200, BODY)
+    assert [path for path, _ in server["requests"]] == ["/flaky"] * 3
+
+
+def test_last_response_returned_once_retries_are_exhausted(server, tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path), max_retries=2)
+
+    resp = client.get(f"{server['url']}/down")
+
+    assert resp.status_code == 503
+    assert len(server["requests"]) == 3
+
+
+def test_connections_are_kept_alive(server, tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path))
+
+    for _ in range(5):
+        assert client.get(f"{server['url']}/page", revalidate=False).status_code == 200
+
+    assert len(server["requests"]) == 5
+    assert len(server["ports"]) == 1
@@ -0,0 +1,90 @@
+import os
+import hashlib
+
+import pytest
+
+from image_store import MANIFEST_FILENAME, TMP_SUBFOLDER, ImageStore
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeHttpClient:
+    """
+    Sert des images en mémoire ({url: octets}) et compte les téléchargements.
+    """
+
+    def __init__(self, images):
+        self.images = images
+        self.downloads = []
+
+    def get(self, url, revalidate=True, stream=False):
+        self.downloads.append(url)
+        if url not in self.images:
+            return FakeResponse(404, b"")
+        return FakeResponse(200, self.images[url])
+
+
+PNG = b"\x89PNG" + bytes(range(256)) * 600
+OTHER = b"\x89PNG" + b"autre image" * 100
+
+
+@pytest.fixture
+def images_folder(tmp_path):
+    return str(tmp_path / "images")
+
+
+def test_identical_images_are_stored_once(images_folder):
+    client = FakeHttpClient({"https://cdn/a.png": PNG, "https://cdn/b.png": PNG, "https://cdn/c.png": OTHER})
+    store = ImageStore(images_folder)
+    os.makedirs(images_folder)
+
+    first = store.save(client, "https://cdn/a.png", "rolex_1")
+    second = store.save(client, "https://cdn/b.png", "rolex_2")
+    third = store.save(client, "https://cdn/c.png", "rolex_3")
+
+    assert first["path"] == second["path"] != third["path"]
+    assert first["sha256"] == hashlib.sha256(PNG).hexdigest()
+    assert first["path"].endswith(os.path.join(first["sha256"][:2], f"{first['sha256']}.png"))
+    with open(first["path"], "rb") as f:
+        assert f.read() == PNG
+    blobs = [name for _, _, names in os.walk(images_folder) for name in names if name.endswith(".png")]
+    assert len(blobs) == 2
+    assert os.listdir(os.path.join(images_folder, TMP_SUBFOLDER)) == []
+
+
+def test_known_image_is_not_downloaded_again_and_manifest_survives_restart(images_folder):
+    client = FakeHttpClient({"https://cdn/a.png": PNG})
+    os.makedirs(images_folder)
+    entry = ImageStore(images_folder).save(client, "https://cdn/a.png", "rolex_1")
+    # Crash pendant l'écriture d'une ligne du manifest
+    with open(os.path.join(images_folder, MANIFEST_FILENAME), "a", encoding="utf-8") as f:
+        f.write('{"watch": "rolex_2", "ima')
+
+    store = ImageStore(images_folder)
+
+    assert store.save(client, "https://cdn/a.png", "rolex_1") == entry
+    assert client.downloads == ["https://cdn/a.png"]
+    assert store.lookup("rolex_2") is None
+
+
+def test_failed_download_leaves_no_file(images_folder):
+    client = FakeHttpClient({})
+    store = ImageStore(images_folder)
+    os.makedirs(images_folder)
+
+    with pytest.raises(Exception, match="HTTP 404"):
+        store.save(client, "https://cdn/absente.png", "rolex_1")
+
+    assert store.lookup("rolex_1") is None
+    assert os.listdir(os.path.join(images_folder, TMP_SUBFOLDER)) == []
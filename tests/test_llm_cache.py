@@ -0,0 +1,88 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import article_generation
+from llm_cache import LLMCache, cache_key
+
+
+class CountingClient:
+    """
+    Client OpenAI synchrone minimal : répond « réponse N » et compte les appels.
+    """
+
+    def __init__(self):
+        self.chat = self.completions = self.with_raw_response = self
+        self.prompts = []
+
+    def create(self, model, messages):
+        self.prompts.append(messages[0]["content"])
+        text = f"réponse {len(self.prompts)}"
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+        response = SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return SimpleNamespace(parse=lambda: response, retries_taken=0)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite")
+
+
+def test_key_ignores_formatting_but_not_model_or_version():
+    prompt = "Rédige l'article.\nRéférence : 140.029\n"
+    assert cache_key("m", "v1", prompt) == cache_key("m", "v1", f"\n  {prompt}".replace("\n", "  \r\n"))
+    assert cache_key("m", "v1", prompt) != cache_key("m", "v2", prompt)
+    assert cache_key("m", "v1", prompt) != cache_key("autre", "v1", prompt)
+
+
+def test_entries_persist_across_reopen(cache_path):
+    cache = LLMCache(cache_path)
+    cache.put("m", "v1", "prompt A", "réponse A")
+    cache.put("m", "v1", "prompt B", "réponse B")
+    cache.delete("m", "v1", "prompt B")
+    cache.close()
+
+    cache = LLMCache(cache_path)
+    assert cache.get("m", "v1", "prompt A") == "réponse A"
+    assert cache.get("m", "v1", "prompt B") is None
+    assert cache.get("m", "v2", "prompt A") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 2)
+    cache.close()
+
+
+def test_evict_drops_old_then_least_recently_used(cache_path):
+    cache = LLMCache(cache_path, max_age_days=30, max_bytes=25)
+    for name in ("ancien", "a", "b", "c"):
+        cache.put("m", "v1", name, "x" * 10)
+    with cache.conn:
+        cache.conn.execute("UPDATE completions SET last_used_at = ? WHERE key = ?",
+                           (time.time() - 60 * 86400, cache_key("m", "v1", "ancien")))
+        cache.conn.execute("UPDATE completions SET last_used_at = last_used_at - 10 WHERE key = ?",
+                           (cache_key("m", "v1", "b"),))
+    # « a » relu : c'est « b » le moins récemment utilisé
+    cache.get("m", "v1", "a")
+
+    assert cache.evict() == 2
+
+    assert cache.get("m", "v1", "ancien") is None
+    assert cache.get("m", "v1", "b") is None
+    assert cache.get("m", "v1", "a") == cache.get("m", "v1", "c") == "x" * 10
+    cache.close()
+
+
+def test_complete_serves_known_prompts_from_cache(data_dir, monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(article_generation, "client", client, raising=False)
+
+    first = article_generation.complete("Traduis en français ce texte: Black dial", stage="translation")
+    again = article_generation.complete("  Traduis en français ce texte: Black dial\n", stage="translation")
+
+    assert first == again == "réponse 1"
+    assert len(client.prompts) == 1
+
+    # Nouvelle version des prompts : la réponse est redemandée
+    monkeypatch.setattr(article_generation, "PROMPT_VERSION", article_generation.PROMPT_VERSION + "-bis")
+    assert article_generation.complete("Traduis en français ce texte: Black dial", stage="translation") == "réponse 2"
+    assert len(client.prompts) == 2
@@ -0,0 +1,104 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import article_generation
+from benchmarks.fake_openai_server import fake_completion
+from jsonl_store import iter_jsonl
+from llm_ledger import Ledger, build_report, call_cost
+
+
+class FakeClient:
+    """
+    Client OpenAI synchrone qui répond comme le faux serveur, avec un usage
+    proportionnel à la longueur des textes.
+    """
+
+    def __init__(self):
+        self.chat = self.completions = self.with_raw_response = self
+
+    def create(self, model, messages):
+        prompt = messages[0]["content"]
+        text = fake_completion(prompt, 250)
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4,
+                                total_tokens=(len(prompt) + len(text)) // 4)
+        response = SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return SimpleNamespace(parse=lambda: response, retries_taken=1)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(str(tmp_path / "llm_ledger.jsonl"))
+    yield ledger
+    ledger.close()
+
+
+def watch(brand, reference):
+    return {"url": f"https://watchbase.com/{brand}/{reference}", "brand": brand, "reference": reference}
+
+
+def test_report_aggregates_latency_tokens_cost_and_extension_rounds(ledger):
+    a, b = watch("Rolex", "A"), watch("Omega", "B")
+    for i in range(10):
+        ledger.record("seo", "gpt-4o", a, prompt_tokens=0, completion_tokens=0, latency=float(i + 1))
+    ledger.record("article", "gpt-4o", a, prompt_tokens=1000, completion_tokens=3000, latency=2.0)
+    ledger.record("extension_1", "gpt-4o", a, prompt_tokens=4000, completion_tokens=1000, latency=1.0)
+    ledger.record("extension_2", "gpt-4o", a, prompt_tokens=5000, completion_tokens=1000, latency=1.0)
+    ledger.record("article", "gpt-4o", b, prompt_tokens=1000, completion_tokens=1000, batch=True, latency=3600.0)
+    ledger.record("article", "gpt-4o", b, cached=True)
+    ledger.record("translation", "modèle-maison", None, prompt_tokens=10, completion_tokens=10, latency=0.5)
+    ledger.close()
+
+    report = build_report(iter_jsonl(ledger.path))
+
+    seo = report["stages"]["seo"]
+    assert (seo["calls"], seo["p50_latency"], seo["p95_latency"]) == (10, 5.5, pytest.approx(9.55))
+    # Appels batch et hits de cache hors latences
+    article = report["stages"]["article"]
+    assert (article["calls"], article["cached"], article["p50_latency"]) == (3, 1, 2.0)
+    assert report["stages"]["extension"]["calls"] == 2
+    assert report["extension_rounds"] == {0: 1, 2: 1}
+    assert report["pages"] == 2
+    assert report["tokens_per_page"] == (15000 + 2000) / 2
+
+    cost_a = call_cost("gpt-4o", 10000, 5000)
+    cost_b = call_cost("gpt-4o", 1000, 1000) * 0.5
+    assert report["cost_per_brand"]["Rolex"] == pytest.approx(cost_a)
+    assert report["cost_per_brand"]["Omega"] == pytest.approx(cost_b)
+    assert report["cost_per_page"] == pytest.approx((cost_a + cost_b) / 2)
+    assert report["unknown_models"] == ["modèle-maison"]
+
+
+def test_reopen_after_torn_line_appends_cleanly(ledger):
+    ledger.record("article", "gpt-4o", watch("Rolex", "A"), prompt_tokens=1, completion_tokens=2)
+    ledger.close()
+    with open(ledger.path, "a", encoding="utf-8") as f:
+        f.write('{"stage": "seo", "mod')
+
+    reopened = Ledger(ledger.path)
+    reopened.record("seo", "gpt-4o", watch("Rolex", "A"))
+    reopened.close()
+
+    with open(ledger.path, "r", encoding="utf-8") as f:
+        stages = [json.loads(line)["stage"] for line in f]
+    assert stages == ["article", "seo"]
+
+
+def test_every_generation_call_is_recorded(data_dir, monkeypatch):
+    monkeypatch.setattr(article_generation, "client", FakeClient(), raising=False)
+    # Premier jet de 246 mots : une continuation
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 300)
+    item = dict(watch("Rolex", "126610LN"), name="Submariner")
+
+    article_text = article_generation.generate_article_text(item, verbose=False)
+    article_generation.generate_seo_and_h1(article_text, item)
+    article_generation.generate_seo_and_h1(article_text, item)
+    article_generation.get_ledger().close()
+
+    records = list(iter_jsonl(article_generation.LEDGER_PATH))
+    assert [(r["stage"], r["cached"]) for r in records] == \
+        [("article", False), ("extension_1", False), ("seo", False), ("seo", True)]
+    assert {(r["watch"], r["brand"], r["reference"]) for r in records} == \
+        {("https://watchbase.com/Rolex/126610LN", "Rolex", "126610LN")}
+    assert all(r["prompt_tokens"] > 0 and r["retries"] == 1 for r in records if not r["cached"])
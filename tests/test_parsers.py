@@ -0,0 +1,52 @@
+import os
+import glob
+import json
+
+import pytest
+
+from benchmarks.make_fixtures import PAGES_DIR
+from parsers import PARSER_BACKENDS, parse_raw_pages
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, "*.html")))
+
+
+def read_page(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module")
+def catalog_by_reference():
+    with open(os.path.join(REPO_DIR, "all_watches.json"), "r", encoding="utf-8") as f:
+        return {watch["reference"]: watch for watch in json.load(f)["watches"]}
+
+
+@pytest.mark.skipif("lxml" not in PARSER_BACKENDS, reason="lxml absent")
+@pytest.mark.parametrize("path", FIXTURE_PAGES, ids=os.path.basename)
+def test_backends_agree_on_fixture_pages(path):
+    html = read_page(path)
+
+    assert PARSER_BACKENDS["lxml"](html, path) == PARSER_BACKENDS["bs4"](html, path)
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_fixture_pages_parse_to_catalog_records(backend, catalog_by_reference):
+    for path in FIXTURE_PAGES:
+        watch_data, price_url = PARSER_BACKENDS[backend](read_page(path), path)
+
+        # Fixtures tirées des fiches de all_watches.json (prix téléchargés à part)
+        expected = catalog_by_reference[watch_data["reference"]]
+        assert {field: expected[field] for field in watch_data if field != "prices"} == \
+            {field: value for field, value in watch_data.items() if field != "prices"}
+        assert price_url.endswith(os.path.splitext(os.path.basename(path))[0])
+
+
+def test_parse_raw_pages_isolates_unreadable_pages():
+    path = FIXTURE_PAGES[0]
+    pages = [("https://watchbase.com/vide", b"<html></html>"), (path, read_page(path).encode("utf-8"))]
+
+    [(_, empty, _, error), (url, watch_data, price_url, ok)] = parse_raw_pages(pages)
+
+    assert empty is None and "tables d'info" in error
+    assert ok is None and watch_data["url"] == url == path and price_url
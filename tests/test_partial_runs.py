@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from openai import OpenAI
+
+import article_generation
+import async_scraper
+import pipeline
+from benchmarks import fake_watchbase_server
+from catalog_db import CatalogDB
+from catalog_stream import iter_json_array
+from fingerprints import FingerprintStore
+from scraper import CATALOG_DB_FILENAME, FINGERPRINTS_FILENAME
+
+
+@pytest.fixture
+def watchbase_urls():
+    server, base_url = fake_watchbase_server.start_in_thread()
+    yield fake_watchbase_server.catalog_urls(base_url, 4)
+    server.shutdown()
+
+
+def catalog_state(save_dir):
+    exported = [watch["url"] for watch in iter_json_array(str(save_dir / "all_watches.json"))]
+    catalog = CatalogDB(str(save_dir / CATALOG_DB_FILENAME))
+    catalog_urls = set(catalog.urls())
+    catalog.close()
+    fingerprints = set(FingerprintStore(str(save_dir / FINGERPRINTS_FILENAME)).entries)
+    return exported, catalog_urls, fingerprints
+
+
+def test_async_scraper_run_on_some_urls_keeps_the_rest_of_the_catalog(save_dir, watchbase_urls):
+    options = {"rate": 1000.0, "burst": 1000, "parse_workers": 1}
+    async_scraper.main(watchbase_urls, **options)
+    before = catalog_state(save_dir)
+
+    async_scraper.main(watchbase_urls[:1], **options)
+
+    exported, catalog_urls, fingerprints = catalog_state(save_dir)
+    assert sorted(exported) == sorted(before[0]) == sorted(watchbase_urls)
+    assert catalog_urls == fingerprints == set(watchbase_urls)
+    with open(save_dir / "changeset.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["removed"] == []
+
+
+def test_pipeline_run_on_some_urls_keeps_pages_of_other_watches(save_dir, watchbase_urls, fake_llm, monkeypatch):
+    monkeypatch.setattr(article_generation, "client", OpenAI(base_url=fake_llm, api_key="fake"), raising=False)
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 100)
+    options = {"scrape_interval": 0.0, "parse_workers": 1}
+    pipeline.run_pipeline(watchbase_urls, **options)
+    pages = {key for key, _, _ in article_generation.get_build_manifest().iter_pages()}
+    assert pages == set(watchbase_urls)
+
+    pipeline.run_pipeline(watchbase_urls[:1], partial=True, **options)
+
+    assert {key for key, _, _ in article_generation.get_build_manifest().iter_pages()} == pages
+    exported, catalog_urls, fingerprints = catalog_state(save_dir)
+    assert sorted(exported) == sorted(watchbase_urls)
+    assert catalog_urls == fingerprints == set(watchbase_urls)
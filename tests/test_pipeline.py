@@ -0,0 +1,49 @@
+import queue
+
+from pipeline import _DONE, Stage
+
+
+def run_stage(func, items, batch_size):
+    inbox, outbox = queue.Queue(), queue.Queue()
+    # Tous les éléments sont en file avant le départ : un seul paquet
+    for item in items:
+        inbox.put(item)
+    inbox.put(_DONE)
+    stage = Stage("test", func, 1, inbox, outbox, batch_size=batch_size)
+    stage.start()
+    stage.join()
+    emitted = []
+    item = outbox.get()
+    while item is not _DONE:
+        emitted.append(item)
+        item = outbox.get()
+    return stage, emitted
+
+
+def test_failed_batch_is_replayed_item_by_item():
+    batches = []
+
+    def func(items, emit):
+        batches.append(list(items))
+        if 3 in items:
+            raise Exception("élément invalide")
+        for item in items:
+            emit(item * 10)
+
+    stage, emitted = run_stage(func, list(range(6)), batch_size=6)
+
+    assert batches == [list(range(6))] + [[i] for i in range(6)]
+    assert emitted == [0, 10, 20, 40, 50]
+    assert (stage.items, stage.failures) == (6, 1)
+
+
+def test_single_item_failure_is_counted_once():
+    def func(item, emit):
+        if item == 1:
+            raise Exception("élément invalide")
+        emit(item)
+
+    stage, emitted = run_stage(func, [0, 1, 2], batch_size=1)
+
+    assert emitted == [0, 2]
+    assert (stage.items, stage.failures) == (3, 1)
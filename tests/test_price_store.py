@@ -0,0 +1,47 @@
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from price_store import PriceStore, extract_series
+
+
+def chart(points, label="New"):
+    return {"labels": [date for date, _ in points], "datasets": [{"label": label, "data": [p for _, p in points]}]}
+
+
+def test_extract_series_skips_malformed_points():
+    prices = chart([("2024-03-01", "1,000"), ("2024-01-01", "abc"), ("2024-02-01", 900),
+                    ("2024-04-01", ""), ("bad date", "950"), ("2024-05-01", "1 250.5")])
+
+    dates, values, label = extract_series(prices)
+
+    assert dates.tolist() == list(np.array(["2024-02-01", "2024-03-01", "2024-05-01"], dtype="datetime64[D]"))
+    assert values.tolist() == [900.0, 1000.0, 1250.5]
+    assert label == "New"
+
+
+def test_analytics_yoy_change_and_volatility():
+    watches = [
+        {"url": "a", "prices": chart([("2023-01-10", "1,000"), ("2023-07-01", "1100"),
+                                      ("2024-01-01", "1,200"), ("2024-01-15", "1250")])},
+        # Aucun relevé à un an près de YOY_TOLERANCE_DAYS : pas d'évolution sur un an
+        {"url": "b", "prices": chart([("2020-01-01", "500"), ("2024-01-01", "800")])},
+        {"url": "c", "prices": chart([("2024-01-01", "n/a")])},
+    ]
+
+    analytics = PriceStore.from_watches(watches).analytics()
+
+    stats = analytics["a"]
+    assert stats["points"] == 4
+    assert (stats["latest_price"], stats["latest_date"]) == (1250.0, "2024-01-15")
+    assert (stats["min_price"], stats["max_price"]) == (1000.0, 1250.0)
+    assert stats["yoy_change"] == pytest.approx(0.25)
+    returns = [math.log(b / a) for a, b in [(1000, 1100), (1100, 1200), (1200, 1250)]]
+    assert stats["volatility"] == pytest.approx(statistics.stdev(returns))
+
+    assert analytics["b"]["yoy_change"] is None
+    assert analytics["b"]["volatility"] is None
+    assert analytics["c"] is None
+    assert analytics.get("inconnue") is None
@@ -0,0 +1,87 @@
+import os
+import json
+import argparse
+import threading
+
+import pytest
+from openai import OpenAI
+
+import article_generation
+import profiling
+
+
+def session_args(tmp_path, *argv):
+    parser = argparse.ArgumentParser()
+    profiling.add_profiling_arguments(parser)
+    return parser.parse_args([*argv, "--profile-trace", str(tmp_path / "trace.json")])
+
+
+def load_trace(tmp_path):
+    with open(tmp_path / "trace.json", "r", encoding="utf-8") as f:
+        return json.load(f)["traceEvents"]
+
+
+def test_stage_is_a_no_op_without_profiling(tmp_path):
+    with profiling.profiling_session(session_args(tmp_path)) as profiler:
+        with profiling.stage("parse"):
+            pass
+    assert profiler is None
+    assert not os.path.exists(tmp_path / "trace.json")
+
+
+def test_session_times_stages_of_all_threads_even_on_failure(tmp_path, capsys):
+    def work():
+        for i in range(3):
+            with profiling.stage("parse", url=f"https://watchbase.com/{i}"):
+                sum(range(10000))
+
+    with pytest.raises(ValueError):
+        with profiling.profiling_session(session_args(tmp_path, "--profile")) as profiler:
+            threads = [threading.Thread(target=work, name=f"scraper-{i}") for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with profiling.stage("render"):
+                raise ValueError("étape en échec")
+
+    assert profiler.totals["parse"]["count"] == 6
+    assert profiler.totals["render"]["count"] == 1
+    assert profiling.stage("parse") is profiling._null_stage
+    events = load_trace(tmp_path)
+    spans = [event for event in events if event["ph"] == "X"]
+    assert sorted(event["name"] for event in spans) == ["parse"] * 6 + ["render"]
+    assert all(event["dur"] >= 0 and "cpu_ms" in event["args"] for event in spans)
+    thread_names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert {"scraper-0", "scraper-1"} <= thread_names
+    assert "parse" in capsys.readouterr().out
+
+
+def test_cprofile_and_memory_capture_for_chosen_stages(tmp_path):
+    args = session_args(tmp_path, "--profile-cprofile", "render", "--profile-memory", "render")
+    with profiling.profiling_session(args) as profiler:
+        with profiling.stage("render"):
+            kept = [bytearray(1024) for _ in range(1000)]
+        with profiling.stage("parse"):
+            pass
+
+    assert profiler.totals["render"]["memory_peak"] >= 1024 * 1000
+    assert profiler.totals["parse"]["memory_peak"] == 0
+    assert os.path.exists(tmp_path / "trace.render.prof")
+    assert not os.path.exists(tmp_path / "trace.parse.prof")
+    del kept
+
+
+def test_generation_stages_are_timed(data_dir, fake_llm, make_watches, tmp_path, monkeypatch):
+    monkeypatch.setattr(article_generation, "client", OpenAI(base_url=fake_llm, api_key="fake"), raising=False)
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 100)
+    with open(article_generation.JSON_PATH, "w", encoding="utf-8") as f:
+        json.dump({"watches": make_watches(2)}, f, ensure_ascii=False)
+
+    with profiling.profiling_session(session_args(tmp_path, "--profile")) as profiler:
+        article_generation.main()
+
+    assert profiler.totals["llm.article"]["count"] == 2
+    assert profiler.totals["llm.seo"]["count"] == 2
+    assert profiler.totals["render_write"]["count"] == 2
+    assert {"load", "llm.translation"} <= set(profiler.totals)
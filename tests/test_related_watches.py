@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from price_store import catalog_key
+from related_watches import encode_watch, load_or_build, top_k_neighbors
+
+
+def brute_force(vectors, k):
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    order = np.argsort(-sims, axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(sims, order, axis=1)
+
+
+@pytest.mark.parametrize("n,k,batch_size", [(50, 5, 7), (50, 5, 512), (13, 20, 4), (1, 3, 2)])
+def test_top_k_matches_brute_force(n, k, batch_size):
+    rng = np.random.default_rng(n + k)
+    vectors = rng.normal(size=(n, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    neighbors, scores = top_k_neighbors(vectors, k, batch_size)
+
+    expected_neighbors, expected_scores = brute_force(vectors, min(k, n - 1))
+    assert neighbors.shape == (n, min(k, n - 1))
+    np.testing.assert_array_equal(neighbors, expected_neighbors)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_same_family_and_case_is_closer(make_watches):
+    base, same_family, other = make_watches(3)
+    same_family.update(brand=base["brand"], family=base["family"], case=dict(base["case"]))
+    other.update(brand="Autre marque", family="Autre famille", case={"material": "Titanium", "diameter": "48 mm"})
+
+    vectors = [encode_watch(watch) for watch in (base, same_family, other)]
+
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1.0)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_index_is_cached_until_the_catalog_changes(tmp_path, make_watches):
+    watches = make_watches(8)
+    path = str(tmp_path / "related.sqlite")
+
+    def href(watch):
+        return f"/{watch['reference']}.html"
+
+    index, built = load_or_build(path, lambda: iter(watches), {}, href, k=3)
+    assert built
+    assert index.count() == 8
+    for watch in watches:
+        links = index.links(catalog_key(watch))
+        assert len(links) == 3
+        assert href(watch) not in [link for link, _ in links]
+    index.close()
+
+    index, built = load_or_build(path, lambda: iter(watches), {}, href, k=3)
+    assert not built
+    index.close()
+
+    index, built = load_or_build(path, lambda: iter(watches[:5]), {}, href, k=3)
+    assert built
+    assert index.count() == 5
+    assert index.links(catalog_key(watches[6])) == []
+    index.close()
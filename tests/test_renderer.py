@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from renderer import Template, render_pages, render_watch_page_string, write_watch_page
+
+META = {"seo_title": "Titre <SEO>", "meta_description": "Meta \"description\"", "h1": "H1 & co"}
+ARTICLE = "<h2>Histoire</h2>\n<p>Un texte.</p>"
+
+
+def test_template_escapes_values_unless_triple_braces():
+    template = Template("<p>{{ text }}</p>{{{ html }}}<ul>{{ items }}</ul>")
+
+    rendered = template.render({
+        "text": "<b>&</b>",
+        "html": "<i>ok</i>",
+        "items": lambda write: [write(f"<li>{i}</li>") for i in range(2)],
+    })
+
+    assert rendered == "<p>&lt;b&gt;&amp;&lt;/b&gt;</p><i>ok</i><ul><li>0</li><li>1</li></ul>"
+
+
+def test_page_escapes_catalog_values_and_keeps_article_html(make_watches):
+    watch = make_watches(1)[0]
+    watch["name"] = "<script>alert(1)</script>"
+
+    page = render_watch_page_string(watch, ARTICLE, META, description_fr="Cadran <noir>",
+                                    related=[("/b.html", "Autre & montre")])
+
+    assert "<script>" not in page
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in page
+    assert "Cadran &lt;noir&gt;" in page
+    assert "<title>Titre &lt;SEO&gt;</title>" in page
+    assert ARTICLE in page
+    assert "Autre &amp; montre" in page
+    assert "Autre &amp; montre" not in render_watch_page_string(watch, ARTICLE, META)
+
+
+def test_streamed_file_matches_string_render_and_failures_keep_the_old_page(tmp_path, make_watches):
+    watch = make_watches(1)[0]
+    path = str(tmp_path / "page.html")
+
+    write_watch_page(path, watch, ARTICLE, META, description_fr="Cadran noir")
+
+    with open(path, "r", encoding="utf-8") as f:
+        expected = f.read()
+    assert expected == render_watch_page_string(watch, ARTICLE, META, description_fr="Cadran noir")
+
+    # Rendu interrompu (h1 manquant) : ni page tronquée ni fichier temporaire
+    with pytest.raises(KeyError):
+        write_watch_page(path, watch, ARTICLE + "<p>v2</p>", {"seo_title": "x", "meta_description": "y"})
+    with open(path, "r", encoding="utf-8") as f:
+        assert f.read() == expected
+    assert os.listdir(tmp_path) == ["page.html"]
+
+
+def test_render_pages_on_process_pool(tmp_path, make_watches):
+    watches = make_watches(7)
+    jobs = [(str(tmp_path / f"{i}.html"), watch, f"<p>Article {i}</p>", META, None, "", None)
+            for i, watch in enumerate(watches)]
+
+    assert render_pages(iter(jobs), workers=2, chunksize=2) == 7
+
+    for path, watch, article, meta, _, _, _ in jobs:
+        with open(path, "r", encoding="utf-8") as f:
+            assert f.read() == render_watch_page_string(watch, article, meta)
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import scraper
+from benchmarks import fake_watchbase_server
+from catalog_stream import iter_json_array
+from jsonl_store import iter_jsonl, load_done_urls
+
+
+@pytest.fixture
+def watchbase(monkeypatch):
+    server, base_url = fake_watchbase_server.start_in_thread()
+    # Pas de pause entre deux montres
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    yield server, fake_watchbase_server.catalog_urls(base_url, 4)
+    server.shutdown()
+
+
+def test_load_done_urls_drops_a_truncated_last_line(tmp_path):
+    path = tmp_path / "all_watches.jsonl"
+    path.write_text('{"url":"a"}\n{"url":"b"}\n{"url":"c","bra', encoding="utf-8")
+
+    assert load_done_urls(str(path)) == {"a", "b"}
+    assert path.read_text(encoding="utf-8") == '{"url":"a"}\n{"url":"b"}\n'
+
+
+def test_jsonl_resume_after_truncation_scrapes_only_the_missing_watches(save_dir, watchbase, monkeypatch):
+    server, urls = watchbase
+    monkeypatch.setattr(scraper, "WATCH_URLS", urls[:2])
+    scraper.main(output_format="jsonl")
+    jsonl_path = save_dir / scraper.JSONL_FILENAME
+    # Crash pendant l'écriture de la troisième fiche
+    with open(jsonl_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"url": urls[2], "brand": "Rolex"})[:20])
+    server.reset_stats()
+
+    monkeypatch.setattr(scraper, "WATCH_URLS", urls)
+    scraper.main(output_format="jsonl", resume=True)
+
+    assert server.stats["watch"] == 2
+    assert [record["url"] for record in iter_jsonl(str(jsonl_path))] == urls
+    exported = list(iter_json_array(str(save_dir / "all_watches.json")))
+    assert [watch["url"] for watch in exported] == urls
+    assert all(watch["brand"] and watch["prices"] for watch in exported)
@@ -0,0 +1,102 @@
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from search_index import SEARCH_SUBDIR, SearchIndex, doc_tokens, extract_doc, tokenize
+
+# Charge templates/search.js dans node (fetch servi depuis le dossier search/)
+# et affiche les href trouvés pour chaque requête
+NODE_HARNESS = """
+const fs = require("fs"), path = require("path");
+const dir = process.argv[1], queries = JSON.parse(process.argv[2]);
+global.window = {};
+global.document = {currentScript: null};
+global.fetch = function (url) {
+  const file = path.join(dir, url.replace(/^search\\//, ""));
+  if (!fs.existsSync(file)) return Promise.resolve({ok: false});
+  return Promise.resolve({ok: true, json: () => Promise.resolve(JSON.parse(fs.readFileSync(file, "utf8")))});
+};
+eval(fs.readFileSync(path.join(dir, "search.js"), "utf8"));
+Promise.all(queries.map(q => window.searchWatches(q, 100)))
+  .then(results => console.log(JSON.stringify(results.map(docs => docs.map(doc => doc.href)))));
+"""
+
+
+@pytest.fixture
+def docs(make_watches):
+    docs = {}
+    for i, watch in enumerate(make_watches(6)):
+        kind = "Montre de plongée" if i % 2 else "Montre habillée"
+        meta_data = {"h1": f"{kind} {watch['brand']} {watch['name']}",
+                     "meta_description": f"Tout sur la {watch['name']} : prix et caractéristiques."}
+        docs[watch["url"]] = extract_doc(watch, f"/site/{watch['brand']}_{i}.html", meta_data)
+    return docs
+
+
+def read_asset(output_dir, name):
+    path = os.path.join(output_dir, SEARCH_SUBDIR, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def python_search(docs, query):
+    """
+    Référence côté Python : tous les termes de la requête, le dernier en préfixe.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    hrefs = []
+    for doc in docs.values():
+        terms = doc_tokens(doc)
+        if all(token in terms for token in tokens[:-1]) and any(term.startswith(tokens[-1]) for term in terms):
+            hrefs.append(doc["href"])
+    return hrefs
+
+
+def test_sync_rewrites_only_touched_files_and_drops_removed_pages(tmp_path, docs):
+    index = SearchIndex(str(tmp_path / "search_index.sqlite"))
+    output_dir = str(tmp_path / "site")
+    assert index.sync(docs) == (len(docs), 0)
+    index.write(output_dir)
+    assert "zeitwerk" in read_asset(output_dir, "ze.json")
+
+    assert index.sync(docs) == (0, 0)
+    assert index.write(output_dir) == 0
+
+    keys = list(docs)
+    updated = dict(docs)
+    del updated[keys[0]]
+    updated[keys[1]] = dict(docs[keys[1]], title="Royal Oak Jumbo Squelette")
+    assert index.sync(updated) == (1, 1)
+    assert index.write(output_dir) > 0
+
+    # Le seul document qui portait « zeitwerk » est supprimé : son fragment aussi
+    assert read_asset(output_dir, "ze.json") is None
+    assert "squelette" in read_asset(output_dir, "sq.json")
+    assert index.stats()["documents"] == len(docs) - 1
+    assert {doc[1] for doc in read_asset(output_dir, "docs/0.json").values()} == \
+        {doc["href"] for doc in updated.values()}
+    index.close()
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node absent")
+def test_search_js_tokenizes_like_python(tmp_path, docs):
+    index = SearchIndex(str(tmp_path / "search_index.sqlite"))
+    output_dir = str(tmp_path / "site")
+    index.sync(docs)
+    index.write(output_dir)
+    index.close()
+    queries = ["montre de plongée", "Montre DE la Söhne", "rolex day", "de la", "tout sur la octo", "gold tour"]
+
+    result = subprocess.run(["node", "-e", NODE_HARNESS, os.path.join(output_dir, SEARCH_SUBDIR),
+                             json.dumps(queries)], capture_output=True, text=True, check=True)
+
+    found = json.loads(result.stdout)
+    assert found == [python_search(docs, query) for query in queries]
+    assert found[0] and found[1]
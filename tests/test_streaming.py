@@ -0,0 +1,90 @@
+import json
+import random
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import article_generation
+from article_generation import LiveWordCount, count_words, seo_excerpt
+from benchmarks.fake_openai_server import fake_article
+
+ARTICLE = fake_article(3000, "flux")
+
+
+def fragments(text, seed):
+    rng = random.Random(seed)
+    start = 0
+    while start < len(text):
+        size = rng.randint(1, 12)
+        yield text[start:start + size]
+        start += size
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class StreamingClient:
+    """
+    Client OpenAI synchrone : l'article arrive en flux (fragments de taille
+    aléatoire) et ne se termine qu'une fois la requête SEO reçue, ou après
+    un délai ; le SEO répond un JSON fixe.
+    """
+
+    def __init__(self):
+        self.chat = self.completions = self.with_raw_response = self
+        self.seo_prompts = []
+        self.seo_received = threading.Event()
+        self.seo_before_end = None
+
+    def create(self, model, messages, stream=False, stream_options=None):
+        prompt = messages[0]["content"]
+        if stream:
+            return SimpleNamespace(parse=lambda: self.stream_article(), retries_taken=0)
+        self.seo_prompts.append(prompt)
+        self.seo_received.set()
+        text = json.dumps({"seo_title": "Titre", "meta_description": "Meta", "h1": "H1"})
+        usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+        response = SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return SimpleNamespace(parse=lambda: response, retries_taken=0)
+
+    def stream_article(self):
+        parts = list(fragments(ARTICLE, 0))
+        for part in parts[:-1]:
+            yield chunk(part)
+        self.seo_before_end = self.seo_received.wait(timeout=5)
+        yield chunk(parts[-1])
+        yield chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=3000, total_tokens=3010))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_live_word_count_matches_count_words(seed):
+    text = ARTICLE + "  fin\n\tdu   texte "
+    counter = LiveWordCount()
+    for part in fragments(text, seed):
+        counter.feed(part)
+    assert counter.words == count_words(text)
+
+
+def test_seo_excerpt_stops_at_first_section_past_the_threshold():
+    excerpt = seo_excerpt(ARTICLE, min_words=900)
+    assert excerpt == ARTICLE[:ARTICLE.index("<h2>Section 5 ")].rstrip()
+    assert seo_excerpt(ARTICLE[:ARTICLE.index("<h2>Section 5 ")], min_words=900) is None
+
+
+def test_streaming_starts_seo_before_the_article_ends(data_dir, monkeypatch):
+    client = StreamingClient()
+    monkeypatch.setattr(article_generation, "client", client, raising=False)
+    monkeypatch.setattr(article_generation, "MIN_WORDS", 100)
+    watch = {"url": "https://watchbase.com/tests/flux", "brand": "Marque", "name": "Montre",
+             "reference": "REF-1", "description": ""}
+
+    article_text, meta_data = article_generation.generate_page_parts_streaming(watch)
+
+    assert article_text == ARTICLE
+    assert meta_data == {"seo_title": "Titre", "meta_description": "Meta", "h1": "H1"}
+    assert client.seo_before_end
+    # Prompt SEO déterministe (découpage du flux sans effet) : il reste en cache
+    assert client.seo_prompts == [article_generation.build_seo_prompt(seo_excerpt(ARTICLE))]
@@ -0,0 +1,23 @@
+from translation import TranslationMemo, translate_descriptions
+
+
+def test_descriptions_sharing_a_key_are_translated_once_and_all_filled(tmp_path):
+    memo = TranslationMemo(str(tmp_path / "translations.sqlite"))
+    descriptions = ["A  steel watch.", "A steel watch.", "A steel watch.\n", "A gold watch."]
+    prompts = []
+
+    def complete(prompt, stage, watch):
+        prompts.append(prompt)
+        return '{"0": "Une montre en acier.", "1": "Une montre en or."}'
+
+    translations = translate_descriptions(descriptions, memo, complete, lambda description: description)
+
+    assert len(prompts) == 1
+    assert translations == {
+        "A  steel watch.": "Une montre en acier.",
+        "A steel watch.": "Une montre en acier.",
+        "A steel watch.\n": "Une montre en acier.",
+        "A gold watch.": "Une montre en or.",
+    }
+    assert memo.get_many(descriptions) == translations
+    memo.close()
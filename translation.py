@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Mémo persistant des traductions (à côté de all_watches.json)
+TRANSLATION_MEMO_FILENAME = "translations.sqlite"
+# Nombre maximal de descriptions par requête groupée
+TRANSLATION_BATCH_SIZE = 50
+# Taille maximale (caractères) des descriptions d'une requête groupée
+TRANSLATION_BATCH_CHARS = 30000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    model TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def normalize_description(text):
+    return " ".join(text.split())
+
+
+def description_key(text):
+    return hashlib.sha256(normalize_description(text).encode("utf-8")).hexdigest()
+
+
+class TranslationMemo:
+    """
+    Traductions déjà obtenues, indexées par description normalisée :
+    une description partagée par plusieurs montres n'est traduite qu'une fois,
+    et jamais deux fois d'une exécution à l'autre.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, description):
+        with self._lock:
+            row = self.conn.execute("SELECT translation FROM translations WHERE key = ?",
+                                    (description_key(description),)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, descriptions):
+        """
+        {description: traduction} pour celles déjà connues (toutes les
+        descriptions de même clé normalisée reçoivent la traduction).
+        """
+        keys = {}
+        for description in descriptions:
+            keys.setdefault(description_key(description), []).append(description)
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            # Par paquets (limite du nombre de paramètres SQLite)
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                for key, translation in rows:
+                    for description in keys[key]:
+                        found[description] = translation
+        return found
+
+    def put_many(self, translations, model=None):
+        now = time.time()
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO translations (key, source, translation, model, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(description_key(source), source, translation, model, now)
+                     for source, translation in translations.items()]
+                )
+
+    def close(self):
+        self.conn.close()
+
+
+# --------------------------------------------------------------------------
+# Requêtes groupées
+# --------------------------------------------------------------------------
+def pending_descriptions(descriptions, memo):
+    """
+    Descriptions distinctes (ordre de première apparition) absentes du mémo ;
+    une seule par clé normalisée, les autres recevant la même traduction.
+    """
+    unique = {}
+    for description in descriptions:
+        if description:
+            unique.setdefault(description_key(description), description)
+    unique = list(unique.values())
+    known = memo.get_many(unique)
+    return [description for description in unique if description not in known]
+
+
+def chunk_descriptions(descriptions, batch_size=TRANSLATION_BATCH_SIZE, batch_chars=TRANSLATION_BATCH_CHARS):
+    """
+    Découpe en paquets d'au plus `batch_size` descriptions et `batch_chars` caractères.
+    """
+    chunk, size = [], 0
+    for description in descriptions:
+        if chunk and (len(chunk) >= batch_size or size + len(description) > batch_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(description)
+        size += len(description)
+    if chunk:
+        yield chunk
+
+
+def build_batch_translation_prompt(descriptions):
+    """
+    Un seul prompt pour plusieurs descriptions, identifiées par "0", "1", ...
+    """
+    items = json.dumps({str(i): description for i, description in enumerate(descriptions)},
+                       ensure_ascii=False, indent=1)
+    return f"""Traduis en français les textes ci-dessous (descriptions de montres, en anglais).
+Renvoie UNIQUEMENT un objet JSON avec exactement les mêmes clés,
+chaque valeur étant la traduction française du texte de même clé,
+sans commentaire ni phrase supplémentaire.
+
+Textes :
+{items}
+"""
+
+
+def parse_batch_translation(descriptions, response_text):
+    """
+    {description: traduction} d'après la réponse JSON ; les clés absentes
+    ou invalides sont simplement omises (à retraduire une par une).
+    """
+    text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", response_text or "")
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        print("ERREUR parse JSON traduction groupée, repli description par description")
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    results = {}
+    for i, description in enumerate(descriptions):
+        translation = parsed.get(str(i))
+        if isinstance(translation, str) and translation.strip():
+            results[description] = translation.strip()
+    return results
+
+
+def translate_descriptions(descriptions, memo, complete_fn, single_prompt_fn, model=None):
+    """
+    Étape de traduction : traduit en requêtes groupées les descriptions
+    distinctes absentes du mémo (repli une par une pour celles que la
+    réponse groupée n'a pas rendues), les range dans le mémo et retourne
+    {description: traduction} pour toutes les descriptions demandées.
+    """
+    for chunk in chunk_descriptions(pending_descriptions(descriptions, memo)):
+        results = parse_batch_translation(chunk, complete_fn(build_batch_translation_prompt(chunk), "translation", None))
+        for description in chunk:
+            if description not in results:
+                results[description] = complete_fn(single_prompt_fn(description), "translation", None).strip()
+        memo.put_many(results, model)
+    return memo.get_many([description for description in descriptions if description])